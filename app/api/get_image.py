@@ -1,64 +1,170 @@
-import os
-from http.client import HTTPException
-from io import BytesIO
+from typing import Optional
 
 from PIL import Image, ImageFilter
-from fastapi import APIRouter, Path as PathParam
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Path as PathParam
+from fastapi.responses import FileResponse
 from pathlib import Path
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common import http_cache
+from app.common.image_codec import (
+    EXT_CODECS, OutputCodec, OutputFormat, encode_pil, negotiate_codec
+)
+from app.common.storage import get_storage
+from app.common.variant_cache import Variant, variant_cache
+from app.db.database import get_db
+from app.db.models import TargetImages, ProcessedImages
 
 router = APIRouter()
 
-def proc_image(
+# 이미지 종류별 (경로, 저장소 종류, mime, url_id, file_hash, 생성일) 컬럼
+IMAGE_COLUMNS = {
+    "target": (
+        TargetImages.file_path,
+        TargetImages.file_path_type,
+        TargetImages.mime_type,
+        TargetImages.url_id,
+        TargetImages.file_hash,
+        TargetImages.created_at,
+    ),
+    "marked": (
+        ProcessedImages.marked_file_path,
+        ProcessedImages.marked_file_type,
+        ProcessedImages.marked_file_mime_type,
+        ProcessedImages.url_id,
+        ProcessedImages.file_hash,
+        ProcessedImages.created_at,
+    ),
+    "sliced": (
+        ProcessedImages.sliced_file_path,
+        ProcessedImages.sliced_file_type,
+        ProcessedImages.sliced_file_mime_type,
+        ProcessedImages.url_id,
+        ProcessedImages.file_hash,
+        ProcessedImages.created_at,
+    ),
+}
+
+def render_variant(
         file_path: Path,
         blur: int = 0,
         width: int = 0,
-        height: int = 0
+        height: int = 0,
+        fmt: OutputFormat = OutputFormat(),
+) -> Variant:
+    """blur/resize 적용 후 인코딩 (thread pool 에서 실행됨)"""
+    with Image.open(file_path) as img:
+        if blur > 0:
+            img = img.filter(ImageFilter.GaussianBlur(blur))
+        if width > 0 and height > 0:
+            img = img.resize((width, height))
+
+        data = encode_pil(img, fmt)
+
+    return Variant(data, fmt.media_type)
+
+async def proc_image(
+        request: Request,
+        db: AsyncSession,
+        kind: str,
+        image_id: str,
+        blur: int = 0,
+        width: int = 0,
+        height: int = 0,
+        codec: Optional[OutputCodec] = None,
+        quality: Optional[int] = None,
 ):
+    path_col, type_col, mime_col, url_id_col, hash_col, created_col = IMAGE_COLUMNS[kind]
+    query = (select(path_col, type_col, mime_col, hash_col, created_col)
+             .where(url_id_col == image_id)
+             .limit(1))
+    row = (await db.execute(query)).first()
+    if row is None:
+        raise HTTPException(404)
+
+    file_path, file_type, mime_type, file_hash, created_at = row
+    file_path = get_storage(file_type).local_path(file_path)
     if not file_path.exists():
         raise HTTPException(404)
 
-    if blur == 0 and width == 0 and height == 0:
-        return FileResponse(file_path, media_type="image/png")
+    # codec/quality 를 명시하지 않은 원본 요청은 저장된 파일 그대로 응답
+    is_original = (blur == 0 and width == 0 and height == 0
+                   and codec is None and quality is None)
+    if is_original:
+        etag = http_cache.make_etag(file_hash, kind)
+    else:
+        fallback = EXT_CODECS.get(file_path.suffix.lstrip(".").lower(), "png")
+        fmt_kwargs = {"quality": quality} if quality is not None else {}
+        fmt = OutputFormat(
+            negotiate_codec(request.headers.get("accept"), codec, fallback),
+            **fmt_kwargs,
+        )
+        etag = http_cache.make_etag(file_hash, kind, blur, width, height, fmt.key)
+
+    headers = http_cache.cache_headers(etag, created_at)
+    if not is_original and codec is None:
+        headers["Vary"] = "Accept"
+
+    if http_cache.is_not_modified(request.headers, etag, created_at):
+        return http_cache.not_modified_response(headers)
 
-    img = Image.open(file_path)
-    if blur > 0:
-        img = img.filter(ImageFilter.GaussianBlur(blur))
-    if width > 0 and height > 0:
-        img = img.resize((width, height))
+    if is_original:
+        # Range, Content-Length 는 FileResponse 에서 처리
+        return FileResponse(file_path, media_type=mime_type, headers=headers)
 
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
+    key = variant_cache.make_key(
+        f"{kind}:{file_hash}", blur, width, height, fmt.key
+    )
+    variant = await variant_cache.get_or_render(
+        key, lambda: render_variant(file_path, blur, width, height, fmt)
+    )
 
-    return StreamingResponse(buf, media_type="image/png")
+    return http_cache.bytes_response(
+        request, variant.data, variant.media_type, headers
+    )
 
 @router.get("/target/{image_id}")
 async def get_image(
+        request: Request,
         image_id: str = PathParam(),
         blur: int = 0,
         width: int = 0,
-        height: int = 0
+        height: int = 0,
+        codec: Optional[OutputCodec] = Query(None, alias="format"),
+        quality: Optional[int] = Query(None, ge=1, le=100),
+        db: AsyncSession = Depends(get_db),
 ):
-    path = Path(os.getenv("SAVED_IMG_DIR")) / "eimg" / f"{image_id}.png"
-    return proc_image(path, blur, width, height)
+    return await proc_image(
+        request, db, "target", image_id, blur, width, height, codec, quality
+    )
 
 @router.get("/marked/{image_id}")
 async def get_marked_image(
+        request: Request,
         image_id: str = PathParam(),
         blur: int = 0,
         width: int = 0,
-        height: int = 0
+        height: int = 0,
+        codec: Optional[OutputCodec] = Query(None, alias="format"),
+        quality: Optional[int] = Query(None, ge=1, le=100),
+        db: AsyncSession = Depends(get_db),
 ):
-    path = Path(os.getenv("SAVED_IMG_DIR")) / "marked" / f"{image_id}.jpg"
-    return proc_image(path, blur, width, height)
+    return await proc_image(
+        request, db, "marked", image_id, blur, width, height, codec, quality
+    )
 
 @router.get("/sliced/{image_id}")
 async def get_sliced_image(
+        request: Request,
         image_id: str = PathParam(),
         blur: int = 0,
         width: int = 0,
-        height: int = 0
+        height: int = 0,
+        codec: Optional[OutputCodec] = Query(None, alias="format"),
+        quality: Optional[int] = Query(None, ge=1, le=100),
+        db: AsyncSession = Depends(get_db),
 ):
-    path = Path(os.getenv("SAVED_IMG_DIR")) / "sliced" / f"{image_id}.jpg"
-    return proc_image(path, blur, width, height)
\ No newline at end of file
+    return await proc_image(
+        request, db, "sliced", image_id, blur, width, height, codec, quality
+    )
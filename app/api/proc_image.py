@@ -1,120 +1,919 @@
-import hashlib
-import os
+import asyncio
+import collections
+import dataclasses
+import datetime
+import json
+import logging
+import time
 import uuid
-from pathlib import Path
-from typing import List
+from typing import List, Optional
+from urllib.parse import urlparse
 
-import aiofiles
-import cv2
-from fastapi import APIRouter, UploadFile, Depends, HTTPException
+import httpx
+from fastapi import APIRouter, UploadFile, Depends, File, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool
 
+from app.common import cancellation, scheduler, settings, spatial_prior, target_index
+from app.common.metrics import StageTimer
 from app.common.depends import depends_tags
-from app.common.depends.depends_image import valid_image_depends
+from app.common.depends.depends_profile import profile_depends
+from app.common.depends.depends_sched import SchedParams, sched_depends
+from app.common.depends.depends_timeout import budget_depends, timeout_depends
+from app.common.depends.depends_image import (
+    OutputFormatParams, output_format_depends, valid_image_depends
+)
+from app.common.image_codec import encode_many, sniff_image
 from app.common.schema import ProcessedImageResponse, ProcessedImageListResponse
-from app.db.database import get_db
+from app.common.storage import StoredFile, get_storage
+from app.db.database import get_db, session
 
-from app.modules.ImageAutoEditor import mark_and_slice_image, MatcherBuilder
-from app.db.models import SourceImages, TargetImages, ProcessedImages
+from app.modules.ImageAutoEditor import (
+    MatcherBuilder, draw_marks, erase_matches, find_matches, find_matches_batch,
+    find_matches_budgeted, iter_matches,
+)
+from app.modules.ImageAutoEditor.common import profiling, timing
+from app.modules.ImageAutoEditor.common.cancel import Cancelled, CancelToken
+from app.modules.ImageAutoEditor.common.types import BudgetResult
+from app.modules.ImageAutoEditor.common.utils import load_img
+from app.modules.ImageAutoEditor.helper import PrefilterStats
+from app.modules.ImageAutoEditor.common.remote import get_fetcher
+from app.modules.ImageAutoEditor.common.utils import is_remote
+from app.db.models import ProcessingJobs, SourceImages, TargetImages, ProcessedImages
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# process 전체 prefilter 통계 (/prefilter-stats)
+prefilter_stats = PrefilterStats()
+
+def target_source(path: str, file_type: str) -> str:
+    """matching 에 넘길 target 경로 (url 은 그대로 넘겨서 worker 에서 fetch)"""
+    if file_type == "url":
+        return path
+    return str(get_storage(file_type).local_path(path))
+
+
+async def query_targets(db: AsyncSession, tags: List[str]):
+    """태그에 해당하는 활성 target (id, file_hash, file_path, file_path_type)"""
+    query = (select(TargetImages.id, TargetImages.file_hash,
+                    TargetImages.file_path, TargetImages.file_path_type)
+             .where(TargetImages.is_active)
+             .where(TargetImages.tags.contains(tags)))
+    result = await db.execute(query)
+    return result.all()
+
+
+async def build_matcher(db: AsyncSession, target_rows):
+    """
+    /remove 의 matcher 구성
+
+    Returns:
+        (MatcherBuilder, target 경로, TargetImages.id, SpatialPrior 목록 | None)
+    """
+    target_imgs = [
+        target_source(path, file_type) for _, _, path, file_type in target_rows
+    ]
+
+    mbuilder = MatcherBuilder() \
+        .set_config("early_stop", True) \
+        .set_tm_matcher(0.9, "TM_CCOEFF_NORMED")
+
+    if settings.SIFT_TARGET_INDEX:
+        await target_index.ensure_indexed(db, target_rows)
+        mbuilder.set_sift_index_matcher(
+            0.9, target_index.index_path(), min_match_count=1000
+        )
+    else:
+        mbuilder.set_sift_matcher(0.9, min_match_count=1000)
+
+    mbuilder.set_adaptive_order(
+        settings.MATCHER_STATS_PATH, reorder=settings.ADAPTIVE_MATCHER_ORDER
+    )
+
+    if settings.PREFILTER_METHOD:
+        mbuilder.set_prefilter(
+            settings.PREFILTER_MIN_SCORE,
+            settings.PREFILTER_METHOD,
+            shadow=settings.PREFILTER_SHADOW,
+        )
+
+    target_ids = [row[0] for row in target_rows]
+    priors = None
+    if settings.SPATIAL_PRIOR:
+        mbuilder.set_spatial_prior(coverage=settings.SPATIAL_PRIOR_COVERAGE)
+        prior_map = await spatial_prior.load_priors(db, target_ids)
+        priors = [prior_map.get(tid) for tid in target_ids]
+
+    return mbuilder, target_imgs, target_ids, priors
+
+
+def merge_builder_stats(mbuilder: MatcherBuilder) -> None:
+    """prefilter / spatial prior 통계를 process 전체 통계에 합침"""
+    if mbuilder.prefilter is not None:
+        logger.info("prefilter: %s", mbuilder.prefilter.stats.as_dict())
+        prefilter_stats.merge(mbuilder.prefilter.stats)
+    if mbuilder.prior_config is not None:
+        logger.info("spatial prior: %s", mbuilder.prior_stats.as_dict())
+        spatial_prior.prior_stats.merge(mbuilder.prior_stats)
+
+
+def processed_values(proc_img: ProcessedImages) -> dict:
+    """ProcessedImages -> insert 값 (id, created_at 은 DB 에서 생성)"""
+    return {
+        column.key: getattr(proc_img, column.key)
+        for column in ProcessedImages.__table__.columns
+        if column.key not in ("id", "created_at")
+    }
+
+
+async def render_results(
+        org_file: StoredFile,
+        matches: list,
+        target_ids: List[int],
+        out_params: OutputFormatParams,
+        timer: StageTimer,
+) -> ProcessedImages:
+    """매칭 영역 제거/표시 이미지 인코딩, 저장 - 추가할 ProcessedImages"""
+    storage = get_storage()
+    org_file_path = storage.local_path(org_file.path)
+
+    with timer.stage("decode"):
+        org_img = load_img(str(org_file_path))
+    with timer.stage("render"):
+        sliced = erase_matches(org_img, matches, inpaint=False)
+        marked = draw_marks(org_img, matches)
+
+    # 결과 이미지 인코딩 - sliced, marked 동시에
+    out_fmt = out_params.resolve(org_file_path.suffix.lstrip("."))
+    with timer.stage("encode"):
+        sliced_data, marked_data = await encode_many([sliced, marked], out_fmt)
+
+    with timer.stage("store"):
+        sliced_file = await storage.save_bytes("sliced", sliced_data, out_fmt.extension)
+        marked_file = await storage.save_bytes("marked", marked_data, out_fmt.extension)
+
+    return ProcessedImages(
+        marked_file_path=marked_file.path,
+        marked_file_type=marked_file.file_type,
+        marked_file_size=marked_file.file_size,
+        marked_file_mime_type=out_fmt.media_type,
+        sliced_file_path=sliced_file.path,
+        sliced_file_type=sliced_file.file_type,
+        sliced_file_size=sliced_file.file_size,
+        sliced_file_mime_type=out_fmt.media_type,
+        file_hash=org_file.file_hash,
+        url_id=str(uuid.uuid4()),
+        match_data=spatial_prior.match_data(
+            org_img.shape[1], org_img.shape[0], matches, target_ids
+        ),
+    )
+
+
+def source_row(
+        org_file: StoredFile,
+        original_filename: Optional[str],
+        mime_type: str,
+        tags: List[str],
+) -> SourceImages:
+    return SourceImages(
+        file_path=org_file.path,
+        file_path_type=org_file.file_type,
+        file_size=org_file.file_size,
+        mime_type=mime_type,
+        file_hash=org_file.file_hash,
+        original_filename=original_filename,
+        tags=tags,
+    )
+
+
+async def save_sources(db: AsyncSession, rows: List[SourceImages], files: List[StoredFile]):
+    """
+    원본 row 저장 - 실패하면 저장소에서 올린 참조 수를 되돌림
+    (같은 원본이 이미 있으면 save_* 에서 참조 수만 올라가므로 지우지 않으면 남음)
+    """
+    try:
+        db.add_all(rows)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        await release_files(files)
+        raise
+
+
+async def release_files(files: List[StoredFile]):
+    storage = get_storage()
+    for stored in files:
+        try:
+            await storage.delete(stored.path)
+        except OSError:
+            logger.exception("failed to release %s", stored.path)
+
+
+def new_job(source_id: int, tags: List[str], out_params: OutputFormatParams, job_type: str = "remove"):
+    return ProcessingJobs(
+        source_image_id=source_id,
+        job_type=job_type,
+        status="processing",
+        request_params={"tags": tags, **dataclasses.asdict(out_params)},
+        started_at=datetime.datetime.now(datetime.timezone.utc),
+    )
+
+
+async def remove_objects(
+        request: Request,
+        db: AsyncSession,
+        tags: List[str],
+        org_file: StoredFile,
+        original_filename: Optional[str],
+        mime_type: str,
+        out_params: OutputFormatParams,
+        timer: StageTimer,
+        profile: Optional[profiling.ProfileMode] = None,
+        timeout: Optional[float] = None,
+        budget: Optional[float] = None,
+        workers: int = 1,
+):
+    """
+    원본 저장 이후 공통 처리 - matching, 결과 저장
+    처리 결과와 단계 별 시간은 ProcessingJobs 에 기록함
+
+    Args:
+        profile: 매칭 과정을 profiling 해서 ProcessingJobs.result_data.profile 에 저장
+        timeout: 매칭 제한 시간 (초) - 지나거나 연결이 끊기면 매칭을 멈춤
+        budget: 매칭 시간 예산 (초) - 예산 안에서 가능한 만큼 매칭하고 결과에 partial 표시
+        workers: 매칭 worker process 수 (scheduler 에서 할당받은 slot)
+    """
+    org_file_path = get_storage().local_path(org_file.path)
+
+    # orgfile - db save
+    db_img = source_row(org_file, original_filename, mime_type, tags)
+    with timer.stage("db_commit"):
+        await save_sources(db, [db_img], [org_file])
+        await db.refresh(db_img)
+
+    job = new_job(db_img.id, tags, out_params)
+
+    # target img - get path
+    with timer.stage("target_query"):
+        target_rows = await query_targets(db, tags)
+    mbuilder, target_imgs, target_ids, priors = await build_matcher(db, target_rows)
+
+    token = CancelToken(timeout)
+
+    def match():
+        # python 3.11 까지 cProfile 은 enable 한 thread 만 기록하므로 매칭하는 thread 에서 capture
+        with timing.collect(timer.collector), profiling.capture(profile) as prof:
+            if budget is not None:
+                return find_matches_budgeted(
+                    str(org_file_path),
+                    target_imgs,
+                    mbuilder,
+                    budget,
+                    multi_process_count=workers,
+                    priors=priors,
+                    token=token,
+                ), prof
+            return BudgetResult(find_matches(
+                str(org_file_path),
+                target_imgs,
+                mbuilder,
+                multi_process_count=workers,
+                priors=priors,
+                token=token,
+            )), prof
+
+    try:
+        with timer.stage("match"):
+            matched, prof = await cancellation.run(request, token, match)
+    except Cancelled as e:
+        timer.collect_engine()
+        cancellation.record(timer.endpoint, e)
+        await finish_job(db, job, timer, "cancelled", error_message=str(e))
+        raise cancellation.http_error(e)
+    timer.collect_engine()
+
+    matches = matched.matches
+
+    result_data = {}
+    if prof is not None:
+        result_data["profile"] = await save_profile(prof)
+    if budget is not None:
+        result_data["budget"] = {
+            "seconds": budget,
+            "partial": matched.partial,
+            "skipped": len(matched.skipped),
+        }
+
+    merge_builder_stats(mbuilder)
+
+    if len(matches) == 0:
+        await finish_job(
+            db, job, timer, "failed", result_data=result_data, error_message="No match"
+        )
+        raise HTTPException(status_code=400, detail="No match")
+
+    db_proc_img = await render_results(org_file, matches, target_ids, out_params, timer)
+
+    db.add(db_proc_img)
+    await db.flush()
+    await finish_job(
+        db, job, timer, "completed",
+        result_data={
+            **result_data,
+            "processed_image_id": db_proc_img.id,
+            "matches": len(matches),
+        },
+    )
+
+    if budget is not None:
+        return {"status": "ok", "partial": matched.partial}
+    return {"status": "ok"}
+
+
+async def save_profile(prof: profiling.Profile) -> dict:
+    """profile 결과 파일 저장 - ProcessingJobs.result_data.profile"""
+    data, ext = prof.dump()
+    stored = await get_storage().save_bytes("profile", data, ext)
+    return {
+        "mode": prof.mode,
+        "path": stored.path,
+        "file_type": stored.file_type,
+        "file_size": stored.file_size,
+        "workers": len(prof.workers),
+    }
+
+
+async def finish_job(
+        db: AsyncSession,
+        job: ProcessingJobs,
+        timer: StageTimer,
+        status: str,
+        result_data: Optional[dict] = None,
+        error_message: Optional[str] = None,
+):
+    """ProcessingJobs 완료 기록 (같은 session 의 다른 변경과 함께 commit)"""
+    job.status = status
+    job.completed_at = datetime.datetime.now(datetime.timezone.utc)
+    job.processing_duration_ms = timer.elapsed_ms
+    job.error_message = error_message
+    result_data = dict(result_data or {})
+    timings = timer.as_dict()
+    if timings is not None:
+        result_data["timings"] = timings
+    job.result_data = result_data or None
+
+    with timer.stage("db_commit"):
+        db.add(job)
+        await db.commit()
+    timer.finish(status)
+
 @router.post("/remove")
 async def proc_image(
+        request: Request,
         tags: List[str] = Depends(depends_tags.tags_str_depends),
         file: UploadFile = Depends(valid_image_depends),
+        out_params: OutputFormatParams = Depends(output_format_depends),
+        profile: Optional[profiling.ProfileMode] = Depends(profile_depends),
+        timeout: Optional[float] = Depends(timeout_depends),
+        budget: Optional[float] = Depends(budget_depends),
+        sched: SchedParams = Depends(sched_depends),
         db: AsyncSession = Depends(get_db)
 ):
     """
     image proc
     """
+    timer = StageTimer("remove")
 
-    # orgfile - make upload dir
-    upload_dir = Path(os.getenv("SAVED_IMG_DIR")) / "oimg"
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    with timer.stage("queue"):
+        lease = await scheduler.admit(sched.priority, sched.tenant)
+    async with lease:
+        # orgfile - write
+        file_ext = file.filename.split(".")[-1].lower()
+        with timer.stage("upload"):
+            org_file = await get_storage().save_upload("oimg", file, file_ext)
 
-    # orgfile - write
-    file_ext = file.filename.split(".")[-1].lower()
-    org_fileid = uuid.uuid4()
-    org_filename = f"{org_fileid}.{file_ext}"
-    org_file_path = upload_dir / org_filename
+        return await remove_objects(
+            request, db, tags, org_file, file.filename, file.content_type, out_params,
+            timer, profile, timeout, budget, lease.slots,
+        )
 
-    hash_sha256 = hashlib.sha256()
-    async with aiofiles.open(org_file_path, "wb") as out:
-        while True:
-            chunk = await file.read(1024**2)
-            if not chunk:
-                break
+@router.post("/remove-url")
+async def proc_image_url(
+        request: Request,
+        url: str,
+        tags: List[str] = Depends(depends_tags.tags_str_depends),
+        out_params: OutputFormatParams = Depends(output_format_depends),
+        profile: Optional[profiling.ProfileMode] = Depends(profile_depends),
+        timeout: Optional[float] = Depends(timeout_depends),
+        budget: Optional[float] = Depends(budget_depends),
+        sched: SchedParams = Depends(sched_depends),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    image proc - 원본을 url (http, https, s3) 로 받음
+    """
+    if not is_remote(url):
+        raise HTTPException(status_code=400, detail="Invalid url.")
 
-            hash_sha256.update(chunk)
-            await out.write(chunk)
+    timer = StageTimer("remove_url")
+    try:
+        with timer.stage("upload"):
+            data = await get_fetcher().fetch(url)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to fetch image: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # orgfile - db save
-    db_img = SourceImages(
-        file_path=str(org_file_path.absolute()),
-        file_path_type="local",
-        file_size=file.size,
-        mime_type=file.content_type,
-        file_hash=hash_sha256.hexdigest(),
-        original_filename=file.filename,
-        tags=tags,
-    )
+    if len(data) > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {settings.MAX_FILE_SIZE / (1024 * 1024):.1f}MB",
+        )
 
-    db.add(db_img)
-    await db.commit()
-    await db.refresh(db_img)
+    try:
+        file_ext, mime_type = sniff_image(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if file_ext not in settings.ALLOWED_IMG_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed types: {', '.join(settings.ALLOWED_IMG_EXTENSIONS)}",
+        )
 
-    # target img - get path
-    query = (select(TargetImages.file_path)
-             .where(TargetImages.is_active)
-             .where(TargetImages.tags.contains(tags)))
-    result = await db.execute(query)
-    target_imgs = result.scalars().all()
+    with timer.stage("queue"):
+        lease = await scheduler.admit(sched.priority, sched.tenant)
+    async with lease:
+        with timer.stage("upload"):
+            org_file = await get_storage().save_bytes("oimg", data, file_ext)
+        filename = urlparse(url).path.rsplit("/", 1)[-1] or None
 
-    mbuilder = MatcherBuilder() \
-        .set_config("early_stop", True) \
-        .set_tm_matcher(0.9, "TM_CCOEFF_NORMED") \
-        .set_sift_matcher(0.9, min_match_count=1000)
-
-    sliced, marked = mark_and_slice_image(
-        original_img=str(org_file_path),
-        target_imgs=list(target_imgs),
-        mbuilder=mbuilder,
-        inpaint=False,
-        multi_process_count=os.cpu_count()
+        return await remove_objects(
+            request, db, tags, org_file, filename, mime_type, out_params, timer,
+            profile, timeout, budget, lease.slots,
+        )
+
+def sse(event: str, data: dict) -> str:
+    """Server-Sent Events 한 건"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/remove-stream")
+async def proc_image_stream(
+        request: Request,
+        tags: List[str] = Depends(depends_tags.tags_str_depends),
+        file: UploadFile = Depends(valid_image_depends),
+        out_params: OutputFormatParams = Depends(output_format_depends),
+        timeout: Optional[float] = Depends(timeout_depends),
+        sched: SchedParams = Depends(sched_depends),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    image proc - 진행 상황을 Server-Sent Events 로 전달
+
+        event: start   {"total"}
+        event: match   {"target_id", "done", "total", "matches"}  (target 하나가 끝날 때마다)
+        event: result  {"status": ok | no_match, "url_id", "marked_url", "sliced_url", "matches"}
+        event: error   {"reason": disconnect | deadline}  (매칭 취소)
+
+    연결이 끊기거나 제한 시간이 지나면 남은 target 은 매칭하지 않음
+    """
+    timer = StageTimer("remove_stream")
+    storage = get_storage()
+
+    with timer.stage("queue"):
+        lease = await scheduler.admit(sched.priority, sched.tenant)
+    try:
+        file_ext = file.filename.split(".")[-1].lower()
+        with timer.stage("upload"):
+            org_file = await storage.save_upload("oimg", file, file_ext)
+
+        db_img = source_row(org_file, file.filename, file.content_type, tags)
+        with timer.stage("db_commit"):
+            await save_sources(db, [db_img], [org_file])
+
+        with timer.stage("target_query"):
+            target_rows = await query_targets(db, tags)
+        mbuilder, target_imgs, target_ids, priors = await build_matcher(db, target_rows)
+    except BaseException:
+        lease.release()
+        raise
+    job = new_job(db_img.id, tags, out_params, job_type="remove_stream")
+    token = CancelToken(timeout)
+
+    async def stream():
+        """
+        매칭 진행 (SSE)
+        연결이 끊기거나 오류로 중간에 끝나면 job 을 cancelled / failed 로 기록
+        """
+        try:
+            total = len(target_imgs)
+            yield sse("start", {"total": total})
+
+            matches = []
+            # 단계마다 다른 thread 에서 실행되므로 단계별로 이 요청의 기록에 모음
+            engine = timing.collecting(timer.collector, iter_matches(
+                str(storage.local_path(org_file.path)),
+                target_imgs,
+                mbuilder,
+                multi_process_count=lease.slots,
+                priors=priors,
+                token=token,
+            ))
+            finished = False
+            try:
+                async with cancellation.watching(request, token):
+                    with timer.stage("match"):
+                        done = 0
+                        async for idx, res in iterate_in_threadpool(engine):
+                            done += 1
+                            matches.extend(res)
+                            yield sse("match", {
+                                "target_id": target_ids[idx],
+                                "done": done,
+                                "total": total,
+                                "matches": spatial_prior.match_items(res, target_ids),
+                            })
+                finished = True
+            except Cancelled as e:
+                finished = True
+                timer.collect_engine()
+                cancellation.record(timer.endpoint, e)
+                async with session() as sess:
+                    await finish_job(sess, job, timer, "cancelled", error_message=str(e))
+                yield sse("error", {"reason": e.reason})
+                return
+            finally:
+                if not finished:
+                    cancellation.close(timer.endpoint, engine, token)
+                    timer.collect_engine()
+            timer.collect_engine()
+            merge_builder_stats(mbuilder)
+
+            async with session() as sess:
+                if len(matches) == 0:
+                    await finish_job(sess, job, timer, "failed", error_message="No match")
+                    yield sse("result", {"status": "no_match"})
+                    return
+
+                db_proc_img = await render_results(
+                    org_file, matches, target_ids, out_params, timer
+                )
+                sess.add(db_proc_img)
+                await sess.flush()
+                await finish_job(
+                    sess, job, timer, "completed",
+                    result_data={"processed_image_id": db_proc_img.id, "matches": len(matches)},
+                )
+
+            url_id = db_proc_img.url_id
+            yield sse("result", {
+                "status": "ok",
+                "url_id": url_id,
+                "marked_url": str(request.url_for("get_marked_image", image_id=url_id)),
+                "sliced_url": str(request.url_for("get_sliced_image", image_id=url_id)),
+                "matches": len(matches),
+            })
+        except (asyncio.CancelledError, GeneratorExit):
+            if job.completed_at is None:
+                # task 가 cancel 된 상태라 기록은 shield 해서 끝까지 실행
+                await asyncio.shield(abort_job("cancelled", token.reason or "disconnect"))
+            raise
+        except Exception as e:
+            if job.completed_at is None:
+                await asyncio.shield(abort_job("failed", str(e)))
+            raise
+
+    async def abort_job(status: str, error_message: str):
+        async with session() as sess:
+            await finish_job(sess, job, timer, status, error_message=error_message)
+
+    return StreamingResponse(
+        scheduler.hold(lease, stream()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(lease.release),
     )
 
-    if sliced is None or marked is None:
-        raise HTTPException(status_code=400, detail="No match")
 
-    output_sliced_dir = Path(os.getenv("SAVED_IMG_DIR")) / "sliced"
-    output_marked_dir = Path(os.getenv("SAVED_IMG_DIR")) / "marked"
-    output_sliced_file = output_sliced_dir / org_filename
-    output_marked_file = output_marked_dir / org_filename
-    output_sliced_dir.mkdir(parents=True, exist_ok=True)
-    output_marked_dir.mkdir(parents=True, exist_ok=True)
-    cv2.imwrite(str(output_sliced_file), sliced)
-    cv2.imwrite(str(output_marked_file), marked)
-
-    db_proc_img = ProcessedImages(
-        marked_file_path=str(output_marked_file.absolute()),
-        marked_file_type="local",
-        marked_file_size=marked.size,
-        marked_file_mime_type=file.content_type,
-        sliced_file_path=str(output_sliced_file.absolute()),
-        sliced_file_type="local",
-        sliced_file_size=sliced.size,
-        sliced_file_mime_type=file.content_type,
-        file_hash=hash_sha256.hexdigest(),
-        url_id=str(org_fileid),
+@router.post("/remove-batch")
+async def proc_image_batch(
+        request: Request,
+        files: List[UploadFile] = File(...),
+        tags: List[str] = Depends(depends_tags.tags_str_depends),
+        out_params: OutputFormatParams = Depends(output_format_depends),
+        timeout: Optional[float] = Depends(timeout_depends),
+        sched: SchedParams = Depends(sched_depends),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    image proc - 원본 여러 개 (scheduler 우선순위는 항상 batch)
+
+    target 목록과 matcher 는 한 번만 준비하고 원본 단위로 worker 에 나눠서 처리함.
+    결과는 끝나는 순서대로 한 줄씩 (application/x-ndjson) - 매칭된 원본은 BATCH_INSERT_SIZE 단위로
+    저장한 뒤에 응답함
+        {"index", "filename", "status", "url_id", "matches"}
+        status: ok | no_match | error | exists (이미 처리된 원본) | duplicate (같은 요청에 중복)
+                | cancelled (제한 시간이 지나거나 연결이 끊겨서 매칭하지 않음)
+    마지막 줄은 {"summary": {status: 개수}}
+    """
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files. Maximum is {settings.BATCH_MAX_FILES}",
+        )
+    for file in files:
+        valid_image_depends(file)
+
+    timer = StageTimer("remove_batch")
+    storage = get_storage()
+
+    with timer.stage("queue"):
+        lease = await scheduler.admit("batch", sched.tenant)
+    try:
+        with timer.stage("upload"):
+            org_files = []
+            try:
+                for f in files:
+                    org_files.append(
+                        await storage.save_upload("oimg", f, f.filename.split(".")[-1].lower())
+                    )
+            except BaseException:
+                await release_files(org_files)
+                raise
+
+        db_imgs = [
+            source_row(org_file, f.filename, f.content_type, tags)
+            for org_file, f in zip(org_files, files)
+        ]
+        with timer.stage("db_commit"):
+            await save_sources(db, db_imgs, org_files)
+
+        with timer.stage("target_query"):
+            target_rows = await query_targets(db, tags)
+            # file_hash 는 ProcessedImages 에서 unique - 이미 처리된 원본은 다시 매칭하지 않음
+            result = await db.execute(
+                select(ProcessedImages.file_hash, ProcessedImages.url_id)
+                .where(ProcessedImages.file_hash.in_({f.file_hash for f in org_files}))
+            )
+            processed = dict(result.all())
+        mbuilder, target_imgs, target_ids, priors = await build_matcher(db, target_rows)
+    except BaseException:
+        lease.release()
+        raise
+
+    # 같은 원본이 여러 번 올라오면 처음 것만 매칭
+    first_index = {}
+    for i, org_file in enumerate(org_files):
+        first_index.setdefault(org_file.file_hash, i)
+    pending = [
+        i for i, org_file in enumerate(org_files)
+        if org_file.file_hash not in processed and first_index[org_file.file_hash] == i
+    ]
+
+    token = CancelToken(timeout)
+
+    def line(index: int, status: str, url_id: Optional[str] = None, matches: int = 0) -> str:
+        return json.dumps({
+            "index": index,
+            "filename": files[index].filename,
+            "status": status,
+            "url_id": url_id,
+            "matches": matches,
+        }) + "\n"
+
+    async def stream():
+        summary = collections.Counter()
+        # (원본 index, ProcessedImages, 매칭 수, ProcessingJobs) - BATCH_INSERT_SIZE 단위로 insert
+        rows = []
+        jobs = []
+
+        async def insert_rows(sess: AsyncSession) -> List[str]:
+            """
+            모은 결과 insert - ok 원본의 응답 줄
+            동시에 처리 중인 다른 요청이 같은 원본 (file_hash) 을 먼저 저장했으면
+            그 결과를 사용하고 (exists) 새로 저장한 결과 파일은 지움
+            """
+            lines = []
+            duplicates = []
+            with timer.stage("db_commit"):
+                if rows:
+                    result = await sess.execute(
+                        pg_insert(ProcessedImages)
+                        .values([processed_values(proc_img) for _, proc_img, _, _ in rows])
+                        .on_conflict_do_nothing(index_elements=[ProcessedImages.file_hash])
+                        .returning(
+                            ProcessedImages.file_hash, ProcessedImages.id, ProcessedImages.url_id
+                        )
+                    )
+                    saved = {file_hash: (id_, url_id) for file_hash, id_, url_id in result.all()}
+                    conflicts = {proc_img.file_hash for _, proc_img, _, _ in rows} - saved.keys()
+                    existing = {}
+                    if conflicts:
+                        result = await sess.execute(
+                            select(ProcessedImages.file_hash, ProcessedImages.id,
+                                   ProcessedImages.url_id)
+                            .where(ProcessedImages.file_hash.in_(conflicts))
+                        )
+                        existing = {
+                            file_hash: (id_, url_id) for file_hash, id_, url_id in result.all()
+                        }
+                    for i, proc_img, n, job in rows:
+                        if proc_img.file_hash in saved:
+                            id_, url_id = saved[proc_img.file_hash]
+                            status = "ok"
+                        else:
+                            id_, url_id = existing[proc_img.file_hash]
+                            status = "exists"
+                            duplicates.append(proc_img)
+                        job.result_data = {"processed_image_id": id_, "matches": n}
+                        summary[status] += 1
+                        lines.append(line(i, status, url_id, n))
+                sess.add_all(jobs)
+                await sess.commit()
+            rows.clear()
+            jobs.clear()
+
+            for proc_img in duplicates:
+                await storage.delete(proc_img.sliced_file_path)
+                await storage.delete(proc_img.marked_file_path)
+            return lines
+
+        async def save_aborted(sess: AsyncSession):
+            """중간에 끝난 요청의 남은 기록 저장 (insert 중에 끊겼으면 처음부터 다시)"""
+            await sess.rollback()
+            await insert_rows(sess)
+            timer.collect_engine()
+            timer.finish("cancelled")
+
+        def finish(
+                job: ProcessingJobs,
+                status: str,
+                seconds: Optional[float],
+                error_message: Optional[str] = None,
+        ):
+            job.status = status
+            job.completed_at = datetime.datetime.now(datetime.timezone.utc)
+            # batch 전체가 아니라 원본 하나의 처리 시간 (모르면 None)
+            job.processing_duration_ms = int(seconds * 1000) if seconds is not None else None
+            job.error_message = error_message
+            jobs.append(job)
+
+        async def handle(i: int, matches, seconds: Optional[float]) -> Optional[str]:
+            """
+            원본 하나의 매칭 결과 처리 - 응답 한 줄
+            매칭된 원본은 insert 후에 응답하므로 None
+
+            Args:
+                seconds: 원본 하나의 매칭 시간 (초)
+            """
+            job = new_job(db_imgs[i].id, tags, out_params, job_type="remove_batch")
+            if isinstance(matches, Exception):
+                finish(job, "failed", seconds, str(matches))
+                summary["error"] += 1
+                return line(i, "error")
+            if len(matches) == 0:
+                finish(job, "failed", seconds, "No match")
+                summary["no_match"] += 1
+                return line(i, "no_match")
+
+            started = time.perf_counter()
+            proc_img = await render_results(
+                org_files[i], matches, target_ids, out_params, timer
+            )
+            if seconds is not None:
+                seconds += time.perf_counter() - started
+            finish(job, "completed", seconds)
+            rows.append((i, proc_img, len(matches), job))
+            return None
+
+        pending_set = set(pending)
+        for i, org_file in enumerate(org_files):
+            if i in pending_set:
+                continue
+            if org_file.file_hash in processed:
+                summary["exists"] += 1
+                yield line(i, "exists", processed[org_file.file_hash])
+            else:
+                summary["duplicate"] += 1
+                yield line(i, "duplicate")
+
+        batch = timing.collecting(timer.collector, find_matches_batch(
+            [str(storage.local_path(org_files[i].path)) for i in pending],
+            target_imgs,
+            mbuilder,
+            multi_process_count=lease.slots,
+            priors=priors,
+            token=token,
+        ))
+        remaining = dict.fromkeys(pending)
+        finished = False
+        async with session() as sess:
+            try:
+                try:
+                    async with cancellation.watching(request, token):
+                        async for k, matches, seconds in iterate_in_threadpool(batch):
+                            i = pending[k]
+                            del remaining[i]
+                            result_line = await handle(i, matches, seconds)
+                            if result_line is not None:
+                                yield result_line
+                            if len(jobs) >= settings.BATCH_INSERT_SIZE:
+                                for result_line in await insert_rows(sess):
+                                    yield result_line
+                    finished = True
+                except Cancelled as e:
+                    finished = True
+                    cancellation.record(timer.endpoint, e)
+                    for i in list(remaining):
+                        del remaining[i]
+                        finish(new_job(db_imgs[i].id, tags, out_params, job_type="remove_batch"),
+                               "cancelled", None, str(e))
+                        summary["cancelled"] += 1
+                        yield line(i, "cancelled")
+                finally:
+                    if not finished:
+                        cancellation.close(timer.endpoint, batch, token)
+
+                if jobs:
+                    for result_line in await insert_rows(sess):
+                        yield result_line
+            except (asyncio.CancelledError, GeneratorExit):
+                # 연결이 끊김 - 매칭한 결과와 남은 원본을 기록
+                for i in remaining:
+                    finish(new_job(db_imgs[i].id, tags, out_params, job_type="remove_batch"),
+                           "cancelled", None, token.reason or "disconnect")
+                # task 가 cancel 된 상태라 기록은 shield 해서 끝까지 실행
+                await asyncio.shield(save_aborted(sess))
+                raise
+
+        timer.collect_engine()
+        merge_builder_stats(mbuilder)
+        status = "cancelled" if summary["cancelled"] else "completed"
+        timer.finish(status)
+        logger.info("remove-batch %s (%d ms)", dict(summary), timer.elapsed_ms)
+        yield json.dumps({"summary": summary, "timings": timer.as_dict()}) + "\n"
+
+    return StreamingResponse(
+        scheduler.hold(lease, stream()),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(lease.release),
     )
 
-    db.add(db_proc_img)
-    await db.commit()
-    await db.refresh(db_proc_img)
 
-    return {"status": "ok"}
+@router.get("/prefilter-stats")
+async def get_prefilter_stats():
+    """
+    prefilter 통계 (process 시작 이후 누적)
+    recall 은 매칭된 target 중 현재 PREFILTER_MIN_SCORE 를 통과하는 비율 (shadow 모드에서만)
+    """
+    return {
+        "method": settings.PREFILTER_METHOD or None,
+        "min_score": settings.PREFILTER_MIN_SCORE,
+        "shadow": settings.PREFILTER_SHADOW,
+        **prefilter_stats.as_dict(),
+        "recall": (
+            prefilter_stats.recall_at(settings.PREFILTER_MIN_SCORE)
+            if settings.PREFILTER_SHADOW else None
+        ),
+    }
+
+@router.get("/spatial-prior-stats")
+async def get_spatial_prior_stats():
+    """
+    spatial prior 통계 (process 시작 이후 누적)
+    fallback_rate: prior 영역에서 찾지 못해 원본 전체를 검색한 비율
+    """
+    return {
+        "enabled": settings.SPATIAL_PRIOR,
+        "coverage": settings.SPATIAL_PRIOR_COVERAGE,
+        **spatial_prior.prior_stats.as_dict(),
+    }
+
+@router.get("/jobs/{job_id}/profile")
+async def get_job_profile(job_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    X-Profile 로 요청한 처리의 profile 파일
+    cprofile: python -m pstats <file> 또는 snakeviz, tracemalloc: json
+    """
+    job = await db.get(ProcessingJobs, job_id)
+    profile = (job.result_data or {}).get("profile") if job is not None else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    file_path = get_storage(profile["file_type"]).local_path(profile["path"])
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="Profile file not found")
+
+    media_type = "application/json" if file_path.suffix == ".json" else "application/octet-stream"
+    return FileResponse(
+        file_path, media_type=media_type, filename=f"job-{job_id}{file_path.suffix}"
+    )
 
 @router.get("/list", response_model=ProcessedImageListResponse)
 async def get_proc_image_list(
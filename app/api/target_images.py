@@ -1,26 +1,28 @@
+import logging
 from typing import List
-import os
-from pathlib import Path
 import uuid
-import hashlib
 
-import aiofiles
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile
 from fastapi_cache.decorator import cache
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.common import settings, target_index
 from app.common.depends import depends_image, depends_tags
 from app.common.schema import TargetImageListResponse, TargetImageResponse
+from app.common.storage import get_storage
 from app.db.database import get_db
 from app.db.models import TargetImages
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
 @router.post("/register")
 async def create_target_image(
     name: str,
+    background_tasks: BackgroundTasks,
     tags: List[str] = Depends(depends_tags.tags_str_depends),
     is_active: bool = True,
     file: UploadFile = Depends(depends_image.valid_image_depends),
@@ -29,35 +31,21 @@ async def create_target_image(
     """
     제거 대상 이미지 등록
     """
+    stored = None
     try:
-        # make upload dir
-        upload_dir = Path(os.getenv("SAVED_IMG_DIR", "/tmp/saved_img")) / "eimg"
-        upload_dir.mkdir(parents=True, exist_ok=True)
-
         # upload file
         file_ext = file.filename.split(".")[-1].lower()
         fileid = uuid.uuid4()
-        filename = f"{fileid}.{file_ext}"
-        file_path = upload_dir / filename
-
-        hash_sha256 = hashlib.sha256()
-        async with aiofiles.open(file_path, "wb") as out:
-            while True:
-                chunk = await file.read(1024**2)  # 1MB
-                if not chunk:
-                    break
-
-                hash_sha256.update(chunk)
-                await out.write(chunk)
+        stored = await get_storage().save_upload("eimg", file, file_ext)
 
         db_img = TargetImages(
             name=name,
             tags=tags,
-            file_path=str(file_path.absolute()),
-            file_path_type="local",
-            file_size=file.size,
+            file_path=stored.path,
+            file_path_type=stored.file_type,
+            file_size=stored.file_size,
             mime_type=file.content_type,
-            file_hash=hash_sha256.hexdigest(),
+            file_hash=stored.file_hash,
             is_active=is_active,
             url_id=str(fileid),
         )
@@ -65,11 +53,18 @@ async def create_target_image(
         db.add(db_img)
         await db.commit()
         await db.refresh(db_img)
-    except Exception as e:
+    except Exception:
+        logger.exception("target upload failed: %s", file.filename)
         await db.rollback()
-        print(e)
+        # 이미 있는 파일이면 참조 수만 올라갔으므로 되돌림 (file_hash unique 위반 등)
+        if stored is not None:
+            await get_storage().delete(stored.path)
         raise HTTPException(status_code=500, detail="File upload failed.")
 
+    # target descriptor index 갱신 (변경된 target 만)
+    if settings.SIFT_TARGET_INDEX:
+        background_tasks.add_task(target_index.sync_with_db)
+
 async def key_builder(fn, namespace, **kwargs):
     import logging
     from fastapi_cache import FastAPICache
@@ -78,11 +73,11 @@ async def key_builder(fn, namespace, **kwargs):
     prefix = FastAPICache.get_prefix()
     final_key = f"{prefix}:{namespace}:{key}" if namespace else f"{prefix}:{key}"
     
-    logging.info(f"Cache key_builder - Function: {fn.__name__}")
-    logging.info(f"Cache key_builder - Namespace: {namespace}")
-    logging.info(f"Cache key_builder - Prefix from FastAPICache: {prefix}")
-    logging.info(f"Cache key_builder - Generated key: {key}")
-    logging.info(f"Cache key_builder - Expected final key: {final_key}")
+    logging.debug(
+        "Cache key_builder - Function: %s, Namespace: %s, Prefix: %s, "
+        "Generated key: %s, Expected final key: %s",
+        fn.__name__, namespace, prefix, key, final_key,
+    )
     
     return key
 
@@ -0,0 +1,77 @@
+"""
+요청 단위 매칭 취소 - client 연결 끊김 / 제한 시간
+
+매칭은 threadpool 에서 실행하고, 기다리는 동안 연결 끊김을 확인해서 CancelToken 을 취소함.
+제한 시간은 CancelToken 의 deadline 으로 엔진 (worker 포함) 에서 확인함
+"""
+import asyncio
+import contextlib
+import logging
+from typing import Callable, Iterator, TypeVar
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.common import metrics, settings
+from app.modules.ImageAutoEditor.common.cancel import Cancelled, CancelToken
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# client 가 응답 전에 연결을 끊음 (nginx 의 499)
+STATUS_CLIENT_CLOSED = 499
+
+
+async def watch_disconnect(request: Request, token: CancelToken) -> None:
+    """연결이 끊기면 token 취소 (매칭이 끝나면 task 를 cancel 해서 종료)"""
+    while not token.is_cancelled():
+        if await request.is_disconnected():
+            token.cancel("disconnect")
+            return
+        await asyncio.sleep(settings.DISCONNECT_POLL_INTERVAL)
+
+
+@contextlib.asynccontextmanager
+async def watching(request: Request, token: CancelToken):
+    """with 블록 동안 연결 끊김 확인 + iae_inflight_matching"""
+    watcher = asyncio.create_task(watch_disconnect(request, token))
+    try:
+        with metrics.inflight():
+            yield
+    finally:
+        watcher.cancel()
+
+
+async def run(request: Request, token: CancelToken, fn: Callable[..., T], *args) -> T:
+    """
+    fn(*args) 를 threadpool 에서 실행 - 연결이 끊기거나 제한 시간이 지나면 Cancelled
+
+    fn 은 token 을 엔진 (find_matches 등) 에 넘겨야 실제로 멈춤
+    """
+    async with watching(request, token):
+        return await run_in_threadpool(fn, *args)
+
+
+def close(endpoint: str, it: Iterator, token: CancelToken) -> None:
+    """
+    stream 응답이 중간에 끝났을 때 (연결 끊김) 엔진 iterator 정리
+
+    token 을 먼저 취소해서 실행 중인 worker 가 checkpoint 에서 멈추도록 함
+    """
+    token.cancel("disconnect")
+    record(endpoint, Cancelled(token.reason))
+    # threadpool 에서 실행 중이면 그 thread 에서 Cancelled 로 끝남
+    with contextlib.suppress(ValueError):
+        it.close()
+
+
+def record(endpoint: str, e: Cancelled) -> None:
+    logger.info("%s cancelled: %s", endpoint, e.reason)
+    metrics.CANCELLED.inc(endpoint=endpoint, reason=e.reason)
+
+
+def http_error(e: Cancelled) -> HTTPException:
+    if e.reason == "deadline":
+        return HTTPException(status_code=504, detail="Matching timed out")
+    return HTTPException(status_code=STATUS_CLIENT_CLOSED, detail="Client closed request")
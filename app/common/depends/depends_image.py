@@ -1,5 +1,9 @@
-from fastapi import HTTPException, UploadFile
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Query, UploadFile
 from app.common import settings
+from app.common.image_codec import OutputCodec, OutputFormat
 
 
 def valid_image_depends(file: UploadFile):
@@ -26,4 +30,32 @@ def valid_image_input_depends(file: UploadFile):
         raise HTTPException(
             status_code=413,
             detail=f"File too large. Maximum size is {settings.MAX_FILE_SIZE / (1024 * 1024):.1f}MB",
-        )
\ No newline at end of file
+        )
+
+@dataclass(frozen=True)
+class OutputFormatParams:
+    output_format: Optional[OutputCodec] = None
+    quality: Optional[int] = None
+    progressive: bool = False
+    png_compression: Optional[int] = None
+
+    def resolve(self, src_ext: str) -> OutputFormat:
+        """output_format 을 지정하지 않으면 원본 확장자의 codec 사용"""
+        fmt_kwargs = {"progressive": self.progressive}
+        if self.quality is not None:
+            fmt_kwargs["quality"] = self.quality
+        if self.png_compression is not None:
+            fmt_kwargs["png_compression"] = self.png_compression
+
+        if self.output_format is not None:
+            return OutputFormat(self.output_format, **fmt_kwargs)
+        return OutputFormat.from_ext(src_ext, **fmt_kwargs)
+
+
+def output_format_depends(
+    output_format: Optional[OutputCodec] = Query(None, description="결과 이미지 codec (기본: 원본 확장자)"),
+    quality: Optional[int] = Query(None, ge=1, le=100, description="jpeg, webp 품질"),
+    progressive: bool = Query(False, description="progressive jpeg"),
+    png_compression: Optional[int] = Query(None, ge=0, le=9, description="png 압축 레벨"),
+):
+    return OutputFormatParams(output_format, quality, progressive, png_compression)
@@ -0,0 +1,39 @@
+import contextlib
+from typing import AsyncIterator, Optional, get_args
+
+from fastapi import Header, HTTPException
+
+from app.common import settings
+from app.modules.ImageAutoEditor.common import profiling
+from app.modules.ImageAutoEditor.common.profiling import ProfileMode
+
+
+async def profile_depends(
+    x_profile: Optional[str] = Header(
+        None, description="요청 profiling (cprofile | tracemalloc), PROFILING_ENABLED=1 필요"
+    ),
+) -> AsyncIterator[Optional[ProfileMode]]:
+    """
+    profiler 는 process 에 하나라 요청이 끝날 때까지 선점하고,
+    다른 요청이 profiling 중이면 429
+    """
+    if not x_profile:
+        yield None
+        return
+
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled.")
+
+    mode = x_profile.strip().lower()
+    if mode not in get_args(ProfileMode):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid profile mode. Allowed: {', '.join(get_args(ProfileMode))}",
+        )
+
+    with contextlib.ExitStack() as stack:
+        try:
+            stack.enter_context(profiling.reserve())
+        except profiling.ProfilerBusy as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+        yield mode
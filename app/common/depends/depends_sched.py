@@ -0,0 +1,55 @@
+import hmac
+from dataclasses import dataclass
+from typing import Optional, get_args
+
+from fastapi import Header, HTTPException, Request
+
+from app.common import settings
+from app.common.scheduler import PRIORITY_ORDER, Priority
+
+
+@dataclass(frozen=True)
+class SchedParams:
+    priority: Priority = "interactive"
+    tenant: str = ""
+
+
+def is_trusted(key: Optional[str]) -> bool:
+    """X-Sched-Key 가 SCHED_TRUST_KEY 와 같은지 (SCHED_TRUST_KEY 가 없으면 항상 False)"""
+    if not settings.SCHED_TRUST_KEY or not key:
+        return False
+    return hmac.compare_digest(key.encode(), settings.SCHED_TRUST_KEY.encode())
+
+
+def sched_depends(
+    request: Request,
+    x_priority: Optional[str] = Header(
+        None, description="매칭 우선순위 (interactive | batch, 기본 SCHED_DEFAULT_PRIORITY)"
+    ),
+    x_tenant_id: Optional[str] = Header(
+        None, description="tenant - 같은 우선순위에서 tenant 별로 번갈아 실행 (X-Sched-Key 필요)"
+    ),
+    x_sched_key: Optional[str] = Header(
+        None, description="SCHED_TRUST_KEY - 있으면 X-Priority, X-Tenant-Id 를 그대로 사용"
+    ),
+) -> SchedParams:
+    """
+    client 가 보낸 값으로 대기열을 앞지르지 못하도록
+    신뢰하지 않는 요청은 우선순위를 SCHED_DEFAULT_PRIORITY 보다 낮추는 것만 허용하고,
+    tenant 는 client 주소로 정함 (tenant 를 바꿔 가며 보내서 먼저 실행되지 않도록)
+    """
+    priority = (x_priority or settings.SCHED_DEFAULT_PRIORITY).strip().lower()
+    if priority not in get_args(Priority):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid priority. Allowed: {', '.join(get_args(Priority))}",
+        )
+
+    if is_trusted(x_sched_key):
+        return SchedParams(priority, (x_tenant_id or "").strip())
+
+    ceiling = settings.SCHED_DEFAULT_PRIORITY
+    if PRIORITY_ORDER[priority] < PRIORITY_ORDER[ceiling]:
+        priority = ceiling
+    client = request.client.host if request.client is not None else ""
+    return SchedParams(priority, client)
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.common import settings
+
+
+def timeout_depends(
+    x_request_timeout: Optional[float] = Header(
+        None, description="매칭 제한 시간 (초, MATCH_TIMEOUT 보다 길게 지정할 수 없음)"
+    ),
+) -> Optional[float]:
+    """요청의 매칭 제한 시간 (None 이면 없음)"""
+    if x_request_timeout is not None and x_request_timeout <= 0:
+        raise HTTPException(status_code=400, detail="Invalid request timeout.")
+
+    limits = [t for t in (x_request_timeout, settings.MATCH_TIMEOUT) if t]
+    return min(limits) if limits else None
+
+
+def budget_depends(
+    x_latency_budget: Optional[float] = Header(
+        None, description="매칭 시간 예산 (초) - 넘으면 가능한 만큼의 결과를 partial 로 반환"
+    ),
+) -> Optional[float]:
+    """요청의 매칭 시간 예산 (None 이면 없음)"""
+    if x_latency_budget is not None and x_latency_budget <= 0:
+        raise HTTPException(status_code=400, detail="Invalid latency budget.")
+    return x_latency_budget or settings.MATCH_BUDGET or None
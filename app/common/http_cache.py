@@ -0,0 +1,119 @@
+import hashlib
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.common import settings
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def make_etag(file_hash: str, *parts) -> str:
+    """
+    저장된 file_hash + 파생 파라미터로 strong ETag 생성
+
+    Args:
+        file_hash: DB 에 저장된 원본 sha256
+        parts: 이미지 종류, blur/width/height/format 등 파생 파라미터
+    """
+    raw = "|".join([file_hash, *map(str, parts)])
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def http_date(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": settings.IMAGE_CACHE_CONTROL,
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_not_modified(
+    req_headers: Mapping[str, str], etag: str, last_modified: Optional[datetime]
+) -> bool:
+    """If-None-Match / If-Modified-Since 검사 (If-None-Match 우선)"""
+    if_none_match = req_headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # 비교시 weak 표시(W/)는 무시
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return etag in tags
+
+    if_modified_since = req_headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # http date 는 초 단위
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def bytes_response(
+    request: Request, data: bytes, media_type: str, headers: dict
+) -> Response:
+    """
+    메모리상의 이미지 응답. 단일 Range 요청이면 206 으로 응답
+    (multi range 는 전체 응답)
+    """
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    total = len(data)
+
+    http_range = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if http_range is None or (if_range is not None and if_range != headers.get("ETag")):
+        return Response(content=data, media_type=media_type, headers=headers)
+
+    m = _RANGE_RE.match(http_range.strip())
+    if m is None:
+        return Response(content=data, media_type=media_type, headers=headers)
+
+    start_s, end_s = m.groups()
+    if start_s:
+        start = int(start_s)
+        if end_s and int(end_s) < start:
+            # first > last 는 잘못된 Range - 무시하고 전체 응답 (RFC 9110 14.2)
+            return Response(content=data, media_type=media_type, headers=headers)
+        end = min(int(end_s), total - 1) if end_s else total - 1
+    elif end_s:
+        # suffix range: 마지막 n bytes
+        start = max(0, total - int(end_s))
+        end = total - 1
+    else:
+        return Response(content=data, media_type=media_type, headers=headers)
+
+    # 시작 위치가 전체 크기를 벗어나는 경우만 416 (suffix 0 bytes 포함)
+    if start >= total:
+        return Response(
+            status_code=416,
+            headers={**headers, "Content-Range": f"bytes */{total}"},
+        )
+
+    headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+    return Response(
+        content=data[start : end + 1],
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
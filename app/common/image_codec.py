@@ -0,0 +1,158 @@
+import asyncio
+from dataclasses import dataclass
+from io import BytesIO
+from typing import List, Literal, Optional, get_args
+
+import cv2
+import numpy as np
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+from app.common import settings
+
+OutputCodec = Literal["jpeg", "webp", "png"]
+
+# 확장자 -> codec
+EXT_CODECS = {"jpg": "jpeg", "jpeg": "jpeg", "png": "png", "webp": "webp"}
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    codec: OutputCodec = "png"
+    quality: int = settings.OUTPUT_QUALITY  # jpeg, webp
+    progressive: bool = False  # jpeg
+    png_compression: int = settings.OUTPUT_PNG_COMPRESSION  # 0 ~ 9
+
+    def __post_init__(self):
+        if self.codec not in get_args(OutputCodec):
+            raise ValueError(f"Unsupported output codec: {self.codec}")
+        if not 1 <= self.quality <= 100:
+            raise ValueError("quality must be in 1 ~ 100")
+        if not 0 <= self.png_compression <= 9:
+            raise ValueError("png_compression must be in 0 ~ 9")
+
+    @property
+    def media_type(self) -> str:
+        return f"image/{self.codec}"
+
+    @property
+    def extension(self) -> str:
+        return "jpg" if self.codec == "jpeg" else self.codec
+
+    @property
+    def key(self) -> str:
+        """캐시 key, ETag 에 사용"""
+        if self.codec == "jpeg":
+            return f"jpeg:q{self.quality}:p{int(self.progressive)}"
+        if self.codec == "webp":
+            return f"webp:q{self.quality}"
+        return f"png:c{self.png_compression}"
+
+    @classmethod
+    def from_ext(cls, ext: str, **kwargs) -> "OutputFormat":
+        return cls(EXT_CODECS.get(ext.lower(), "png"), **kwargs)
+
+
+def encode_cv2(img: np.ndarray, fmt: OutputFormat) -> bytes:
+    """BGR numpy 이미지 인코딩"""
+    if fmt.codec == "jpeg":
+        params = [
+            cv2.IMWRITE_JPEG_QUALITY, fmt.quality,
+            cv2.IMWRITE_JPEG_PROGRESSIVE, int(fmt.progressive),
+            cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+        ]
+    elif fmt.codec == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, fmt.quality]
+    else:
+        params = [cv2.IMWRITE_PNG_COMPRESSION, fmt.png_compression]
+
+    ok, buf = cv2.imencode(f".{fmt.extension}", img, params)
+    if not ok:
+        raise ValueError(f"Failed to encode image ({fmt.key})")
+    return buf.tobytes()
+
+
+def encode_pil(img: Image.Image, fmt: OutputFormat) -> bytes:
+    """PIL 이미지 인코딩"""
+    buf = BytesIO()
+    if fmt.codec == "jpeg":
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(
+            buf, format="JPEG", quality=fmt.quality,
+            progressive=fmt.progressive, optimize=True,
+        )
+    elif fmt.codec == "webp":
+        img.save(buf, format="WEBP", quality=fmt.quality)
+    else:
+        img.save(buf, format="PNG", compress_level=fmt.png_compression)
+    return buf.getvalue()
+
+
+async def encode_many(images: List[np.ndarray], fmt: OutputFormat) -> List[bytes]:
+    """여러 이미지를 thread pool 에서 동시에 인코딩 (cv2 는 GIL 을 풀어줌)"""
+    return list(
+        await asyncio.gather(
+            *[run_in_threadpool(encode_cv2, img, fmt) for img in images]
+        )
+    )
+
+
+def sniff_image(data: bytes) -> tuple[str, str]:
+    """
+    이미지 bytes 의 (확장자, mime type)
+
+    Raises:
+        ValueError: 이미지가 아닌 경우
+    """
+    try:
+        with Image.open(BytesIO(data)) as img:
+            pil_format = img.format
+    except Exception:
+        raise ValueError("File is not image.")
+
+    ext = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}.get(pil_format)
+    if ext is None:
+        raise ValueError(f"Unsupported image format: {pil_format}")
+    return ext, Image.MIME[pil_format]
+
+
+def accepted_types(accept: str) -> dict:
+    """
+    Accept 헤더의 media range -> q 값 (잘못된 q 는 1 로 봄)
+
+        "image/webp;q=0.8, image/*" -> {"image/webp": 0.8, "image/*": 1.0}
+    """
+    types = {}
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        media_type = media_type.strip().lower()
+        if not media_type:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(1.0, max(0.0, float(value)))
+                except ValueError:
+                    pass
+        types[media_type] = q
+    return types
+
+
+def negotiate_codec(
+    accept: Optional[str], requested: Optional[str], fallback: str
+) -> str:
+    """
+    Args:
+        accept: 요청의 Accept 헤더
+        requested: 요청 파라미터로 명시한 codec (우선)
+        fallback: 원본 이미지의 codec
+    """
+    if requested:
+        return requested
+    # image/* 만 보내는 client 도 많아서 image/webp 를 명시한 경우에만 webp (q=0 은 거부)
+    if accept and accepted_types(accept).get("image/webp", 0) > 0:
+        return "webp"
+    return fallback
@@ -0,0 +1,82 @@
+"""
+logging 설정 - env 로 전체/모듈 별 level, text | json 형식
+
+    LOG_LEVEL=INFO
+    LOG_LEVELS=app.modules.ImageAutoEditor.matchers=DEBUG,fastapi_cache=WARNING
+    LOG_FORMAT=json
+"""
+import json
+import logging
+import sys
+from typing import Dict
+
+from app.common import settings
+from app.modules.ImageAutoEditor.common import diagnostics
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+# LogRecord 기본 속성 (json 에서 extra 와 구분)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "taskName",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄 json (logger.info("...", extra={...}) 의 extra 도 포함)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """'a.b=DEBUG,c=WARNING' -> {"a.b": 10, "c": 30} (잘못된 항목은 무시)"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        level = logging.getLevelName(level.strip().upper())
+        if sep and name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+def setup_logging() -> None:
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if settings.LOG_FILE:
+        try:
+            handlers.append(
+                logging.FileHandler(settings.LOG_FILE, mode="a", encoding="utf-8")
+            )
+        except OSError as e:
+            print(f"log file disabled: {e}", file=sys.stderr)
+
+    formatter = (
+        JsonFormatter() if settings.LOG_FORMAT == "json"
+        else logging.Formatter(TEXT_FORMAT)
+    )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    diagnostics.configure(
+        ring_size=settings.LOG_RING_SIZE, sample_rate=settings.LOG_DEBUG_SAMPLE_RATE
+    )
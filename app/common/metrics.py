@@ -0,0 +1,309 @@
+"""
+Prometheus text format metrics (/metrics) + 요청 별 단계 시간
+
+prometheus_client 없이 필요한 만큼만 구현 (counter, gauge, histogram).
+process 단위 값이므로 worker 가 여러 개면 scrape 한 process 의 값만 보임
+"""
+import contextlib
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.common import settings
+from app.modules.ImageAutoEditor import multi_process_work
+from app.modules.ImageAutoEditor.common import timing
+
+LabelValues = Tuple[str, ...]
+
+_NULL = contextlib.nullcontext()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> LabelValues:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """scrape 시점에 callback 으로 값을 읽음"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_number(self.callback())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label -> [bucket 별 개수..., 합계]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            rec = self._values.get(key)
+            if rec is None:
+                rec = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    rec[i] += 1
+                    break
+            rec[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+
+        lines = []
+        for key, rec in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, rec):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(rec[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(
+    Counter("iae_requests_total", "Processed requests", ["endpoint", "status"])
+)
+REQUEST_SECONDS = REGISTRY.register(
+    Histogram("iae_request_seconds", "Request processing time", ["endpoint"])
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram("iae_stage_seconds", "Time spent per request stage", ["stage"])
+)
+ENGINE_SPAN_SECONDS = REGISTRY.register(
+    Counter(
+        "iae_engine_span_seconds_total",
+        "Time spent per engine span (summed over worker processes)",
+        ["span"],
+    )
+)
+ENGINE_SPAN_COUNT = REGISTRY.register(
+    Counter("iae_engine_span_total", "Engine span executions", ["span"])
+)
+ENGINE_EVENTS = REGISTRY.register(
+    Counter("iae_engine_events_total", "Engine counters (cache hit/miss)", ["name"])
+)
+REGISTRY.register(
+    Gauge(
+        "iae_pool_pending_tasks",
+        "Tasks submitted to the matching process pool and not yet finished",
+        multi_process_work.pending_tasks,
+    )
+)
+
+CANCELLED = REGISTRY.register(
+    Counter(
+        "iae_cancelled_total",
+        "Requests whose matching was cancelled (disconnect | deadline)",
+        ["endpoint", "reason"],
+    )
+)
+
+QUEUE_WAIT_SECONDS = REGISTRY.register(
+    Histogram(
+        "iae_scheduler_queue_wait_seconds",
+        "Time spent waiting for CPU slots",
+        ["priority"],
+    )
+)
+REJECTED = REGISTRY.register(
+    Counter(
+        "iae_scheduler_rejected_total",
+        "Requests rejected because the scheduler queue was full",
+        ["priority"],
+    )
+)
+
+# 매칭 중인 요청 수
+_inflight = 0
+_inflight_lock = threading.Lock()
+
+REGISTRY.register(
+    Gauge("iae_inflight_matching", "Requests currently matching", lambda: _inflight)
+)
+
+timing.set_enabled(settings.METRICS_ENABLED)
+
+
+@contextlib.contextmanager
+def inflight():
+    """with metrics.inflight(): 매칭 ... (iae_inflight_matching)"""
+    global _inflight
+    with _inflight_lock:
+        _inflight += 1
+    try:
+        yield
+    finally:
+        with _inflight_lock:
+            _inflight -= 1
+
+
+class StageTimer:
+    """
+    한 요청의 단계 별 시간
+
+    METRICS_ENABLED=0 이면 stage 는 아무것도 하지 않고 전체 시간만 측정함
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.enabled = settings.METRICS_ENABLED
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.engine: Optional[dict] = None
+        # 이 요청의 엔진 기록 (timing.collect / timing.collecting 으로 사용)
+        self.collector = timing.Collector()
+
+    def stage(self, name: str):
+        return _Stage(self, name) if self.enabled else _NULL
+
+    def _record(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, stage=name)
+
+    def collect_engine(self) -> None:
+        """find_matches 이후 엔진 기록(worker 포함)을 가져옴"""
+        if not self.enabled:
+            return
+        self.engine = self.collector.pop()
+        for name, (count, seconds) in self.engine["spans"].items():
+            ENGINE_SPAN_SECONDS.inc(seconds, span=name)
+            ENGINE_SPAN_COUNT.inc(count, span=name)
+        for name, n in self.engine["counters"].items():
+            ENGINE_EVENTS.inc(n, name=name)
+
+    @property
+    def elapsed_ms(self) -> int:
+        return int((time.perf_counter() - self.started) * 1000)
+
+    def finish(self, status: str) -> None:
+        REQUESTS.inc(endpoint=self.endpoint, status=status)
+        if self.enabled:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - self.started, endpoint=self.endpoint
+            )
+
+    def as_dict(self) -> Optional[dict]:
+        """ProcessingJobs.result_data 에 저장할 값"""
+        if not self.enabled:
+            return None
+        data = {"stages_ms": {k: round(v * 1000, 1) for k, v in self.stages.items()}}
+        if self.engine is not None:
+            data["engine"] = {
+                "spans_ms": {
+                    k: {"count": c, "ms": round(s * 1000, 1)}
+                    for k, (c, s) in self.engine["spans"].items()
+                },
+                "counters": self.engine["counters"],
+            }
+        return data
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: StageTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer._record(self.name, time.perf_counter() - self.start)
+        return False
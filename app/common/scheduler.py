@@ -0,0 +1,206 @@
+"""
+매칭 CPU 사용량 조절 (admission control + 우선순위)
+
+요청마다 os.cpu_count() 개의 process 를 만들면 동시 요청 수만큼 process 가 늘어나므로,
+전체 CPU slot (SCHED_CAPACITY) 을 나눠주고 slot 수만큼만 worker process 를 사용하게 함.
+
+- 빈 slot 이 있으면 바로 실행 (요청한 slot 보다 적게 받을 수 있음)
+- 없으면 대기열에서 기다림. 우선순위 (interactive > batch) 가 높은 요청부터,
+  같은 우선순위에서는 실행 중인 작업이 적은 tenant 부터 실행
+- 대기열이 가득 차면 바로 QueueFull (429 + Retry-After)
+
+process 단위 scheduler 이므로 uvicorn worker 가 여러 개면 worker 별로 나눠서 설정해야 함
+"""
+import asyncio
+import collections
+import itertools
+import math
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Literal, Optional
+
+from fastapi import HTTPException
+
+from app.common import metrics, settings
+
+Priority = Literal["interactive", "batch"]
+PRIORITY_ORDER: Dict[str, int] = {"interactive": 0, "batch": 1}
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"scheduler queue is full (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Waiter:
+    priority: Priority
+    tenant: str
+    slots: int
+    seq: int
+    enqueued: float
+    future: asyncio.Future = field(repr=False)
+
+
+class Lease:
+    """할당받은 slot - 작업이 끝나면 release (여러 번 호출해도 한 번만 반환)"""
+
+    def __init__(self, scheduler: "CpuScheduler", tenant: str, slots: int):
+        self.scheduler = scheduler
+        self.tenant = tenant
+        self.slots = slots
+        self.started = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self.scheduler._release(self)
+
+    async def __aenter__(self) -> "Lease":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+class CpuScheduler:
+    """
+    Args:
+        capacity: 전체 slot 수 (동시에 사용할 worker process 수)
+        max_queue: 대기열 크기 (0 이면 빈 slot 이 없을 때 바로 거절)
+        slots_per_job: 요청 하나에 줄 최대 slot 수 (1 이상)
+    """
+
+    def __init__(self, capacity: int, max_queue: int, slots_per_job: int = 1):
+        if slots_per_job < 1:
+            raise ValueError(f"slots_per_job must be >= 1 (got {slots_per_job})")
+        self.capacity = max(1, capacity)
+        self.max_queue = max_queue
+        self.slots_per_job = min(self.capacity, slots_per_job)
+        self.in_use = 0
+        self._waiters: List[_Waiter] = []
+        self._running: Dict[str, int] = collections.Counter()
+        self._seq = itertools.count()
+        # 작업 하나가 slot 을 점유하는 평균 시간 (Retry-After 추정, 지수 이동 평균)
+        self._hold_seconds = 1.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(
+        self, priority: Priority = "interactive", tenant: str = "", slots: Optional[int] = None
+    ) -> Lease:
+        """
+        slot 할당 (빈 slot 이 생길 때까지 대기)
+
+        Args:
+            slots: 원하는 slot 수 (기본 slots_per_job), 빈 slot 만큼만 받을 수 있음
+
+        Raises:
+            QueueFull: 대기열이 가득 참
+        """
+        want = min(self.capacity, max(1, slots or self.slots_per_job))
+
+        if not self._waiters and self.in_use < self.capacity:
+            metrics.QUEUE_WAIT_SECONDS.observe(0, priority=priority)
+            return self._grant(tenant, want)
+
+        if len(self._waiters) >= self.max_queue:
+            metrics.REJECTED.inc(priority=priority)
+            raise QueueFull(self.retry_after())
+
+        waiter = _Waiter(
+            priority, tenant, want, next(self._seq), time.perf_counter(),
+            asyncio.get_running_loop().create_future(),
+        )
+        self._waiters.append(waiter)
+        try:
+            lease = await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # 할당과 취소가 동시에 일어난 경우
+                waiter.future.result().release()
+            raise
+        metrics.QUEUE_WAIT_SECONDS.observe(
+            time.perf_counter() - waiter.enqueued, priority=priority
+        )
+        return lease
+
+    def retry_after(self) -> int:
+        """대기열이 빠지는 데 걸릴 예상 시간 (초)"""
+        backlog = self.in_use + sum(w.slots for w in self._waiters)
+        return max(1, math.ceil(self._hold_seconds * backlog / self.capacity))
+
+    def _grant(self, tenant: str, want: int) -> Lease:
+        slots = min(want, self.capacity - self.in_use)
+        self.in_use += slots
+        self._running[tenant] += 1
+        return Lease(self, tenant, slots)
+
+    def _release(self, lease: Lease) -> None:
+        self.in_use -= lease.slots
+        self._running[lease.tenant] -= 1
+        if self._running[lease.tenant] <= 0:
+            # 한 번 본 tenant 가 계속 남지 않도록
+            del self._running[lease.tenant]
+        held = time.perf_counter() - lease.started
+        self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._waiters and self.in_use < self.capacity:
+            waiter = min(
+                self._waiters,
+                key=lambda w: (PRIORITY_ORDER[w.priority], self._running[w.tenant], w.seq),
+            )
+            self._waiters.remove(waiter)
+            if not waiter.future.done():
+                waiter.future.set_result(self._grant(waiter.tenant, waiter.slots))
+
+
+if settings.SCHED_DEFAULT_PRIORITY not in PRIORITY_ORDER:
+    raise ValueError(f"Invalid SCHED_DEFAULT_PRIORITY: {settings.SCHED_DEFAULT_PRIORITY}")
+
+SCHEDULER = CpuScheduler(
+    settings.SCHED_CAPACITY, settings.SCHED_MAX_QUEUE, settings.SCHED_SLOTS_PER_JOB
+)
+
+metrics.REGISTRY.register(
+    metrics.Gauge(
+        "iae_scheduler_queue_length", "Requests waiting for CPU slots",
+        lambda: SCHEDULER.queued,
+    )
+)
+metrics.REGISTRY.register(
+    metrics.Gauge(
+        "iae_scheduler_slots_in_use", "CPU slots (worker processes) in use",
+        lambda: SCHEDULER.in_use,
+    )
+)
+
+
+async def admit(priority: Priority, tenant: str = "") -> Lease:
+    """SCHEDULER.acquire - 대기열이 가득 차면 429 + Retry-After"""
+    try:
+        return await SCHEDULER.acquire(priority, tenant)
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Server is busy. Try again later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+async def hold(lease: Lease, body: AsyncIterator) -> AsyncIterator:
+    """stream 응답 - 응답이 끝나거나 중간에 끊기면 lease 반환"""
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        lease.release()
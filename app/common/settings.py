@@ -1,2 +1,86 @@
+import os
+
 MAX_FILE_SIZE = (1024**2) * 10  # 10mb
 ALLOWED_IMG_EXTENSIONS = ["jpg", "jpeg", "png"]
+
+# /api/image 파생 이미지(blur, resize) 캐시 용량
+VARIANT_CACHE_MAX_BYTES = int(
+    os.getenv("VARIANT_CACHE_MAX_BYTES", (1024**2) * 256)  # 256mb
+)
+
+# /api/image 응답 Cache-Control (url_id 별 파일은 변경되지 않음)
+IMAGE_CACHE_CONTROL = os.getenv(
+    "IMAGE_CACHE_CONTROL", "public, max-age=31536000, immutable"
+)
+
+# 결과 이미지 인코딩 기본값
+OUTPUT_QUALITY = int(os.getenv("OUTPUT_QUALITY", 90))  # jpeg, webp
+OUTPUT_PNG_COMPRESSION = int(os.getenv("OUTPUT_PNG_COMPRESSION", 3))
+
+# 전체 target descriptor index 로 SIFT 매칭 (target 이 많을 때)
+SIFT_TARGET_INDEX = os.getenv("SIFT_TARGET_INDEX", "0") == "1"
+# /remove 에서 비활성/삭제된 target 을 index 에서 정리하는 주기 (초)
+TARGET_INDEX_PRUNE_INTERVAL = float(os.getenv("TARGET_INDEX_PRUNE_INTERVAL", 30))
+
+# matcher 실행 전 prefilter (hist | thumb, 빈 값이면 사용하지 않음)
+PREFILTER_METHOD = os.getenv("PREFILTER_METHOD", "")
+PREFILTER_MIN_SCORE = float(os.getenv("PREFILTER_MIN_SCORE", 0.9))
+# 제외하지 않고 score 만 기록 (PREFILTER_MIN_SCORE 조정용)
+PREFILTER_SHADOW = os.getenv("PREFILTER_SHADOW", "0") == "1"
+
+# target 별 matcher 적중률/소요 시간 기록
+MATCHER_STATS_PATH = os.getenv(
+    "MATCHER_STATS_PATH",
+    os.path.join(os.getenv("SAVED_IMG_DIR", "/tmp/saved_img"), "index", "matcher_stats.json"),
+)
+# 기록에 따라 target 별 matcher 순서 변경 (0 이면 항상 설정한 순서)
+ADAPTIVE_MATCHER_ORDER = os.getenv("ADAPTIVE_MATCHER_ORDER", "1") == "1"
+
+# 과거 매칭 위치를 먼저 검색 (ProcessedImages.match_data)
+# 재현율을 확인하기 전까지 기본 사용하지 않음 (/spatial-prior-stats)
+SPATIAL_PRIOR = os.getenv("SPATIAL_PRIOR", "0") == "1"
+SPATIAL_PRIOR_HISTORY = int(os.getenv("SPATIAL_PRIOR_HISTORY", 1000))  # 최근 처리 수
+# 최근 처리 기록을 다시 읽는 주기 (초) - 새로 추가된 row 만 읽음
+SPATIAL_PRIOR_REFRESH = float(os.getenv("SPATIAL_PRIOR_REFRESH", 5))
+SPATIAL_PRIOR_COVERAGE = float(os.getenv("SPATIAL_PRIOR_COVERAGE", 0.95))
+
+# /metrics, 요청 단계 별 시간 기록 (0 이면 전체 처리 시간만 기록)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# X-Profile header 로 요청 단위 profiling 허용 (cprofile | tracemalloc)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+
+# 매칭 제한 시간 (초, 0 이면 없음) - X-Request-Timeout header 로 더 짧게 지정 가능
+MATCH_TIMEOUT = float(os.getenv("MATCH_TIMEOUT", 0))
+# 매칭 시간 예산 (초, 0 이면 없음) - 넘으면 가능한 만큼의 결과를 partial 로 반환
+# X-Latency-Budget header 로 요청 별 지정 가능
+MATCH_BUDGET = float(os.getenv("MATCH_BUDGET", 0))
+# 매칭 중 client 연결 끊김 확인 주기 (초)
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", 0.5))
+
+# 매칭 CPU scheduler (app/common/scheduler.py) - process 단위
+# 동시에 사용할 worker process 수, 대기열 크기,
+# 요청 하나가 사용할 최대 process 수 (1 이상, 기본 SCHED_CAPACITY 의 절반 - 요청 하나가 전체를 쓰지 않도록)
+SCHED_CAPACITY = int(os.getenv("SCHED_CAPACITY", os.cpu_count() or 1))
+SCHED_MAX_QUEUE = int(os.getenv("SCHED_MAX_QUEUE", 16))
+SCHED_SLOTS_PER_JOB = int(os.getenv("SCHED_SLOTS_PER_JOB", max(1, SCHED_CAPACITY // 2)))
+# X-Priority, X-Tenant-Id 는 client 가 보내는 값이라 그대로 믿지 않음.
+# X-Sched-Key 가 SCHED_TRUST_KEY 와 같은 요청 (내부 서비스 등) 만 그대로 사용하고,
+# 나머지는 우선순위를 SCHED_DEFAULT_PRIORITY 보다 낮추는 것만 허용하고 tenant 는 client 주소로 정함
+SCHED_TRUST_KEY = os.getenv("SCHED_TRUST_KEY", "")
+SCHED_DEFAULT_PRIORITY = os.getenv("SCHED_DEFAULT_PRIORITY", "interactive")
+
+# /remove-batch 한 요청의 최대 원본 수, 결과 row 를 모아서 insert 할 단위
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 200))
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", 50))
+
+# logging (app/common/log_config.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# 모듈 별 level - "app.modules.ImageAutoEditor.matchers=DEBUG,fastapi_cache=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+LOG_FILE = os.getenv("LOG_FILE", "/iae/logs/app.log")  # 빈 값이면 stdout 만
+# 최근 매칭 진단 기록 수 (오류 시 dump)
+LOG_RING_SIZE = int(os.getenv("LOG_RING_SIZE", 256))
+# debug trace 를 남길 target 비율 (해당 모듈이 DEBUG 일 때만 출력)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0))
@@ -0,0 +1,153 @@
+import asyncio
+import collections
+import logging
+import time
+from typing import Deque, Dict, Iterable, List, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common import settings
+from app.db.models import ProcessedImages
+from app.modules.ImageAutoEditor.common.types import MatchResult
+from app.modules.ImageAutoEditor.helper import PriorStats, SpatialPrior
+from app.modules.ImageAutoEditor.helper.spatial_prior import GRID_SHAPE, grid_cell
+
+logger = logging.getLogger(__name__)
+
+# process 전체 prior 통계 (/spatial-prior-stats)
+prior_stats = PriorStats()
+
+
+def match_data(
+    width: int, height: int, matches: List[MatchResult], target_ids: List[int]
+) -> dict:
+    """
+    ProcessedImages.match_data
+
+    Args:
+        width, height: 원본 크기
+        matches: find_matches 결과 (MatchResult.target 은 target_ids 의 위치)
+        target_ids: find_matches 에 넘긴 target 순서의 TargetImages.id
+    """
+    return {
+        "width": width,
+        "height": height,
+        "matches": match_items(matches, target_ids),
+    }
+
+
+def match_items(matches: List[MatchResult], target_ids: List[int]) -> List[dict]:
+    """match_data.matches 형식 (/remove-stream 의 match event 에도 사용)"""
+    return [
+        {
+            "target_id": target_ids[m.target],
+            "x": int(m.x),
+            "y": int(m.y),
+            "w": int(m.w),
+            "h": int(m.h),
+            "similarity": round(float(m.similarity), 4),
+            "method": m.method,
+            **({"roi_only": True} if m.roi_only else {}),
+        }
+        for m in matches
+        if m.target is not None
+    ]
+
+
+# (target_id, 격자 row, 격자 col)
+Cell = Tuple[int, int, int]
+
+
+def match_cells(data: dict) -> List[Cell]:
+    """match_data 의 매칭 위치 격자 (prior 영역에서만 찾은 결과는 제외)"""
+    cells = []
+    try:
+        width, height = data["width"], data["height"]
+        for m in data["matches"]:
+            if m.get("roi_only"):
+                continue
+            cell = grid_cell(m["x"], m["y"], m["w"], m["h"], width, height)
+            if cell is not None:
+                cells.append((m["target_id"], *cell))
+    except (KeyError, TypeError) as e:
+        logger.error("invalid match_data: %s", e)
+    return cells
+
+
+class PriorHistory:
+    """
+    최근 size 개 ProcessedImages 의 target 별 격자 (process 단위)
+
+    refresh 는 마지막으로 읽은 id 이후의 row 만 읽고, 범위를 벗어난 row 는 격자에서 뺌
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.rows: Deque[Tuple[int, List[Cell]]] = collections.deque()
+        self.grids: Dict[int, np.ndarray] = {}
+        self.counts: Dict[int, int] = collections.Counter()
+        self.last_id = 0
+        self.refreshed_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def _apply(self, cells: List[Cell], sign: int) -> None:
+        for target_id, r, c in cells:
+            grid = self.grids.get(target_id)
+            if grid is None:
+                grid = self.grids[target_id] = np.zeros(GRID_SHAPE, np.float32)
+            grid[r, c] += sign
+            self.counts[target_id] += sign
+            if self.counts[target_id] <= 0:
+                del self.grids[target_id], self.counts[target_id]
+
+    def add(self, row_id: int, data: dict) -> None:
+        cells = match_cells(data)
+        self.rows.append((row_id, cells))
+        self._apply(cells, 1)
+        self.last_id = max(self.last_id, row_id)
+        while len(self.rows) > self.size:
+            self._apply(self.rows.popleft()[1], -1)
+
+    async def refresh(self, db: AsyncSession, interval: float = 0.0) -> None:
+        """interval 안에 다시 호출하면 읽지 않음"""
+        async with self._lock:
+            if time.monotonic() - self.refreshed_at < interval:
+                return
+            query = (
+                select(ProcessedImages.id, ProcessedImages.match_data)
+                .where(ProcessedImages.match_data.is_not(None))
+                .where(ProcessedImages.id > self.last_id)
+                .order_by(ProcessedImages.id.desc())
+                .limit(self.size)
+            )
+            result = await db.execute(query)
+            for row_id, data in reversed(result.all()):
+                self.add(row_id, data)
+            self.refreshed_at = time.monotonic()
+
+    def priors(self, target_ids: Iterable[int]) -> Dict[int, SpatialPrior]:
+        return {
+            tid: SpatialPrior(self.grids[tid].copy(), self.counts[tid])
+            for tid in set(target_ids)
+            if tid in self.grids
+        }
+
+
+_history = PriorHistory(settings.SPATIAL_PRIOR_HISTORY)
+
+
+async def load_priors(
+    db: AsyncSession, target_ids: Iterable[int]
+) -> Dict[int, SpatialPrior]:
+    """
+    최근 ProcessedImages 의 매칭 위치로 target 별 SpatialPrior 생성
+    (SPATIAL_PRIOR_REFRESH 마다 새로 추가된 row 만 읽음)
+    """
+    target_ids = set(target_ids)
+    if not target_ids:
+        return {}
+
+    await _history.refresh(db, settings.SPATIAL_PRIOR_REFRESH)
+    return _history.priors(target_ids)
@@ -0,0 +1,45 @@
+import os
+from typing import Dict, Optional, Type
+
+from .base import BaseStorage, StoredFile
+from .local import LocalStorage
+
+# file_path_type -> backend
+_BACKENDS: Dict[str, Type[BaseStorage]] = {
+    "local": LocalStorage,
+}
+_instances: Dict[str, BaseStorage] = {}
+
+
+def register_storage(file_type: str, backend: Type[BaseStorage]) -> None:
+    """object store 등 backend 추가"""
+    _BACKENDS[file_type] = backend
+    _instances.pop(file_type, None)
+
+
+def get_storage(file_type: Optional[str] = None) -> BaseStorage:
+    """
+    Args:
+        file_type: DB 의 file_path_type 값. 없으면 STORAGE_BACKEND (기본 local)
+    """
+    file_type = file_type or os.getenv("STORAGE_BACKEND", "local")
+
+    storage = _instances.get(file_type)
+    if storage is None:
+        backend = _BACKENDS.get(file_type)
+        if backend is None:
+            raise ValueError(f"Unknown storage type: {file_type}")
+
+        if backend is LocalStorage:
+            storage = LocalStorage(os.getenv("SAVED_IMG_DIR", "/tmp/saved_img"))
+        else:
+            storage = backend()
+        _instances[file_type] = storage
+
+    return storage
+
+
+__all__ = [
+    "BaseStorage", "StoredFile", "LocalStorage",
+    "get_storage", "register_storage",
+]
@@ -0,0 +1,69 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+
+CHUNK_SIZE = 1024**2  # 1MB
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    path: str  # DB 의 file_path 에 저장되는 값
+    file_type: str  # DB 의 file_path_type 에 저장되는 값
+    file_size: int
+    file_hash: str  # sha256
+    deduped: bool = False  # 같은 내용의 파일이 이미 있어서 재사용한 경우
+
+
+class BaseStorage(ABC):
+    """
+    이미지 저장소 인터페이스
+
+    file_type 은 DB 의 file_path_type 컬럼 값과 같고,
+    get_storage(file_type) 으로 저장된 파일의 backend 를 찾음
+    """
+
+    file_type: str
+
+    @abstractmethod
+    async def save_stream(
+        self, kind: str, chunks: AsyncIterator[bytes], ext: str
+    ) -> StoredFile:
+        """
+        Args:
+            kind: 이미지 종류 (oimg, eimg, sliced, marked)
+            chunks: 파일 내용
+            ext: 확장자
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def local_path(self, path: str) -> Path:
+        """cv2, FileResponse 등에서 읽을 수 있는 로컬 경로"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, path: str) -> None:
+        raise NotImplementedError
+
+    async def save_upload(self, kind: str, file: UploadFile, ext: str) -> StoredFile:
+        async def chunks():
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+        return await self.save_stream(kind, chunks(), ext)
+
+    async def save_bytes(self, kind: str, data: bytes, ext: str) -> StoredFile:
+        async def chunks():
+            yield data
+
+        return await self.save_stream(kind, chunks(), ext)
@@ -0,0 +1,130 @@
+import contextlib
+import fcntl
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Iterator
+
+import aiofiles
+from starlette.concurrency import run_in_threadpool
+
+from .base import BaseStorage, StoredFile
+
+
+class LocalStorage(BaseStorage):
+    """
+    로컬 디스크 저장소
+
+    sha256 기준으로 디렉토리를 나눠서 저장하고 (root/kind/ab/cd/abcd....ext)
+    같은 내용의 파일은 한 번만 저장함.
+    여러 row 가 같은 파일을 가리킬 수 있으므로 참조 수 (abcd....ext.refs) 를 세고
+    delete 는 마지막 참조일 때만 파일을 지움 (.refs 가 없는 기존 파일은 참조 1)
+    """
+
+    file_type = "local"
+
+    def __init__(self, root: str | Path, shard_depth: int = 2, shard_width: int = 2):
+        self.root = Path(root)
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+
+    def object_path(self, kind: str, file_hash: str, ext: str) -> Path:
+        w = self.shard_width
+        shards = [file_hash[i * w : (i + 1) * w] for i in range(self.shard_depth)]
+        return self.root.joinpath(kind, *shards, f"{file_hash}.{ext}")
+
+    async def save_stream(
+        self, kind: str, chunks: AsyncIterator[bytes], ext: str
+    ) -> StoredFile:
+        # hash 를 알기 전까지 임시 파일에 기록 후 rename
+        tmp_dir = self.root / kind / ".tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / uuid.uuid4().hex
+
+        hash_sha256 = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as out:
+                async for chunk in chunks:
+                    hash_sha256.update(chunk)
+                    size += len(chunk)
+                    await out.write(chunk)
+
+            file_hash = hash_sha256.hexdigest()
+            path = self.object_path(kind, file_hash, ext.lower())
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            deduped = await run_in_threadpool(self._add_ref, path, tmp_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        return StoredFile(
+            path=str(path.absolute()),
+            file_type=self.file_type,
+            file_size=size,
+            file_hash=file_hash,
+            deduped=deduped,
+        )
+
+    def local_path(self, path: str) -> Path:
+        return Path(path)
+
+    async def exists(self, path: str) -> bool:
+        return Path(path).exists()
+
+    async def delete(self, path: str) -> None:
+        await run_in_threadpool(self._remove_ref, Path(path))
+
+    @staticmethod
+    def refs_path(path: Path) -> Path:
+        return path.with_name(path.name + ".refs")
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _locked(path: Path) -> Iterator[None]:
+        """같은 shard 디렉토리의 참조 수 변경을 process 간에 직렬화 (lock 파일은 지우지 않음)"""
+        fd = os.open(path.parent / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _read_refs(self, path: Path) -> int:
+        if not path.exists():
+            return 0
+        try:
+            return max(1, int(self.refs_path(path).read_text()))
+        except (FileNotFoundError, ValueError):
+            return 1
+
+    def _write_refs(self, path: Path, refs: int) -> None:
+        refs_path = self.refs_path(path)
+        tmp_path = refs_path.with_name(f"{refs_path.name}.{uuid.uuid4().hex}")
+        tmp_path.write_text(str(refs))
+        os.replace(tmp_path, refs_path)
+
+    def _add_ref(self, path: Path, tmp_path: Path) -> bool:
+        """
+        Returns:
+            이미 같은 파일이 있었는지 (deduped)
+        """
+        with self._locked(path):
+            refs = self._read_refs(path)
+            if refs == 0:
+                os.replace(tmp_path, path)
+            self._write_refs(path, refs + 1)
+        return refs > 0
+
+    def _remove_ref(self, path: Path) -> None:
+        if not path.parent.exists():
+            return
+        with self._locked(path):
+            refs = self._read_refs(path) - 1
+            if refs > 0:
+                self._write_refs(path, refs)
+                return
+            path.unlink(missing_ok=True)
+            self.refs_path(path).unlink(missing_ok=True)
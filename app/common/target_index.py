@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.common import settings
+from app.common.storage import get_storage
+from app.db.database import session
+from app.db.models import TargetImages
+from app.modules.ImageAutoEditor.common.target_index import TargetIndex
+
+logger = logging.getLogger(__name__)
+
+_index: Optional[TargetIndex] = None
+_lock = asyncio.Lock()
+# 마지막으로 비활성/삭제된 target 을 정리한 시각 (ensure_indexed)
+_pruned_at = 0.0
+
+
+def index_path() -> str:
+    return str(
+        Path(os.getenv("SAVED_IMG_DIR", "/tmp/saved_img")) / "index" / "sift_targets.npz"
+    )
+
+
+def _get_index() -> TargetIndex:
+    global _index
+    if _index is None:
+        path = index_path()
+        try:
+            _index = TargetIndex.load(path) if os.path.exists(path) else TargetIndex()
+        except Exception as e:
+            logger.error("failed to load target index, rebuild: %s", e)
+            _index = TargetIndex()
+    return _index
+
+
+def _target_rows(rows) -> list[Tuple[str, str, str]]:
+    """(id, file_hash, file_path, file_path_type) -> TargetIndex 입력"""
+    items = []
+    for target_id, file_hash, path, file_type in rows:
+        if file_type != "url":
+            path = str(get_storage(file_type).local_path(path))
+        items.append((str(target_id), file_hash, path))
+    return items
+
+
+async def _active_hashes(db: AsyncSession) -> Dict[str, str]:
+    query = (select(TargetImages.id, TargetImages.file_hash)
+             .where(TargetImages.is_active))
+    result = await db.execute(query)
+    return {str(target_id): file_hash for target_id, file_hash in result.all()}
+
+
+async def ensure_indexed(db: AsyncSession, rows: Iterable) -> None:
+    """
+    index 에 없는 target 추가 (/remove 에서 매칭 전에 호출)
+    TARGET_INDEX_PRUNE_INTERVAL 마다 비활성/삭제/변경된 target 도 제거함
+
+    Args:
+        rows: (id, file_hash, file_path, file_path_type)
+    """
+    global _pruned_at
+    items = _target_rows(rows)
+
+    active = None
+    if time.monotonic() - _pruned_at >= settings.TARGET_INDEX_PRUNE_INTERVAL:
+        _pruned_at = time.monotonic()
+        active = await _active_hashes(db)
+
+    async with _lock:
+        index = _get_index()
+        changed = active is not None and index.prune(active)
+        if await run_in_threadpool(index.add_missing, items) or changed:
+            await run_in_threadpool(index.save, index_path())
+
+
+async def sync_with_db() -> None:
+    """활성 target 전체와 맞춤 (target 등록/변경 후 호출)"""
+    async with session() as db:
+        query = (select(TargetImages.id, TargetImages.file_hash,
+                        TargetImages.file_path, TargetImages.file_path_type)
+                 .where(TargetImages.is_active))
+        rows = (await db.execute(query)).all()
+
+    items = _target_rows(rows)
+    async with _lock:
+        index = _get_index()
+        if await run_in_threadpool(index.sync, items):
+            await run_in_threadpool(index.save, index_path())
+            logger.info("target index synced: %d targets", len(index))
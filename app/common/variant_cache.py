@@ -0,0 +1,126 @@
+import asyncio
+import functools
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.common import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Variant:
+    data: bytes
+    media_type: str
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class VariantCache:
+    """
+    blur/resize 로 파생된 이미지 캐시 (LRU, byte 단위 용량 제한)
+
+    - key 는 원본 식별자 + 파생 파라미터로 만든 content-addressed key
+    - miss 인 경우 thread pool 에서 렌더링 (event loop 블로킹 방지)
+    - 같은 key 로 동시에 들어온 요청은 하나의 렌더링 결과를 공유
+    """
+
+    def __init__(self, max_bytes: int, max_item_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes or max(1, max_bytes // 8)
+
+        self._items: "OrderedDict[str, Variant]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(source_id: str, blur: int, width: int, height: int, fmt: str) -> str:
+        """
+        Args:
+            source_id: 원본 이미지를 식별하는 값 (content hash 등)
+            blur, width, height, fmt: 파생 파라미터
+        """
+        raw = f"{source_id}|{blur}|{width}|{height}|{fmt.lower()}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Variant]:
+        variant = self._items.get(key)
+        if variant is not None:
+            self._items.move_to_end(key)
+        return variant
+
+    def put(self, key: str, variant: Variant) -> None:
+        if variant.size > self.max_item_bytes:
+            return
+
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+        self._items[key] = variant
+        self._bytes += variant.size
+
+        # 용량 초과시 오래된 것부터 제거
+        while self._bytes > self.max_bytes and self._items:
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    async def get_or_render(self, key: str, render: Callable[[], Variant]) -> Variant:
+        """
+        Args:
+            key: make_key 로 만든 key
+            render: cache miss 일 때 thread pool 에서 실행할 렌더링 함수
+        """
+        variant = self.get(key)
+        if variant is not None:
+            self.hits += 1
+            return variant
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            # 요청이 끊겨도 렌더링은 끝까지 진행해서 다른 대기자/캐시에 사용
+            task = asyncio.ensure_future(run_in_threadpool(render))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._on_rendered, key))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _on_rendered(self, key: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error("variant render failed: %s", task.exception())
+            return
+        self.put(key, task.result())
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self._items),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+        }
+
+
+variant_cache = VariantCache(settings.VARIANT_CACHE_MAX_BYTES)
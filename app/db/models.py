@@ -17,7 +17,8 @@ class ProcessedImages(Base):
         CheckConstraint("sliced_file_mime_type::text ~* '^image/'::text", name='processed_images_sliced_file_mime_type_check'),
         PrimaryKeyConstraint('id', name='processed_images_pkey'),
         UniqueConstraint('file_hash', name='processed_images_file_hash_key'),
-        Index('processed_images_created_at_index', 'created_at')
+        Index('processed_images_created_at_index', 'created_at'),
+        Index('idx_processed_images_url_id', 'url_id')
     )
 
     id: Mapped[int] = mapped_column(BigInteger, Identity(start=1, increment=1, minvalue=1, maxvalue=9223372036854775807, cycle=False, cache=1), primary_key=True)
@@ -32,6 +33,8 @@ class ProcessedImages(Base):
     url_id: Mapped[Optional[str]] = mapped_column(String(255))
     file_hash: Mapped[str] = mapped_column(String(64))
     created_at: Mapped[datetime.datetime] = mapped_column(DateTime(True), server_default=text('now()'))
+    # {"width", "height", "matches": [{"target_id", "x", "y", "w", "h", "similarity", "method"}]}
+    match_data: Mapped[Optional[dict]] = mapped_column(JSONB)
 
 
 class SourceImages(Base):
@@ -71,7 +74,8 @@ class TargetImages(Base):
         UniqueConstraint('file_hash', name='target_images_file_hash_key'),
         Index('idx_target_images_active', 'is_active'),
         Index('idx_target_images_created_at', 'created_at'),
-        Index('idx_target_images_tags_gin', 'tags', postgresql_using='gin')
+        Index('idx_target_images_tags_gin', 'tags', postgresql_using='gin'),
+        Index('idx_target_images_url_id', 'url_id')
     )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
@@ -10,11 +10,13 @@ from app.common import utils
 utils.load_all_config()
 
 import logging
-import sys
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.common import utils
+from fastapi.responses import PlainTextResponse
+from app.common import metrics, utils
+from app.common.log_config import setup_logging
+from app.modules.ImageAutoEditor.common import diagnostics
 
 from app.api import target_images, proc_image, get_image
 from redis import asyncio as aioredis
@@ -22,18 +24,9 @@ from redis import asyncio as aioredis
 
 pyproj = utils.get_pyproject()
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("/iae/logs/app.log", mode="a", encoding="utf-8"),
-        logging.StreamHandler(sys.stdout),
-    ],
-)
-
-# FastAPI Cache 로거 설정
-logging.getLogger('fastapi_cache').setLevel(logging.DEBUG)
-logging.getLogger('fastapi_cache.decorator').setLevel(logging.DEBUG)
+# LOG_LEVEL, LOG_LEVELS (모듈 별), LOG_FORMAT
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # @asynccontextmanager
 # async def lifespan(_: FastAPI) -> AsyncIterator[None]:
@@ -59,6 +52,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def dump_diagnostics_on_error(request: Request, call_next):
+    """
+    요청마다 진단 기록을 따로 모으고,
+    처리되지 않은 오류 시 그 요청의 최근 매칭 진단 기록을 로그로 남김
+    """
+    with diagnostics.scope():
+        try:
+            return await call_next(request)
+        except Exception:
+            logger.exception("unhandled error: %s %s", request.method, request.url.path)
+            diagnostics.dump(logger)
+            raise
+
 app.include_router(target_images.router, prefix="/api/target-images", tags=["target-images"])
 app.include_router(proc_image.router, prefix="/api/proc-images", tags=["proc-image"])
 app.include_router(get_image.router, prefix="/api/image", tags=["image"])
@@ -73,3 +80,10 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(
+        metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
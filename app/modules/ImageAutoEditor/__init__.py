@@ -4,10 +4,16 @@ logger = logging.getLogger(__name__.split(".")[0])
 logger.addHandler(logging.NullHandler())
 
 
-from .core import find_matches, slice_image, mark_image, mark_and_slice_image
-from .helper import MatcherBuilder
+from .core import (
+    find_matches, find_matches_batch, find_matches_budgeted, iter_matches,
+    slice_image, mark_image,
+    mark_and_slice_image, draw_marks, erase_matches,
+)
+from .helper import MatcherBuilder, SpatialPrior
 
 __all__ = [
-    "find_matches", "slice_image", "mark_image", "mark_and_slice_image",
-    "MatcherBuilder"
+    "find_matches", "find_matches_batch", "find_matches_budgeted", "iter_matches",
+    "slice_image", "mark_image",
+    "mark_and_slice_image", "draw_marks", "erase_matches", "MatcherBuilder",
+    "SpatialPrior"
 ]
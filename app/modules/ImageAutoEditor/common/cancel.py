@@ -0,0 +1,95 @@
+"""
+매칭 작업 취소 (client 연결 끊김, 요청 deadline)
+
+CancelToken 은 multiprocessing.Event 와 deadline 을 가지고 있고, pool 을 만들 때
+initializer 로 worker 에 넘겨서 worker 도 같은 token 을 봄.
+matcher 는 안전한 지점 (target / matcher / 영역 / 검출 반복 사이) 에서 check() 를 호출하고
+취소됐으면 Cancelled 를 raise 함. token 이 없으면 check() 는 아무것도 하지 않음
+"""
+import contextlib
+import multiprocessing
+import threading
+import time
+from typing import Iterator, Optional
+
+_local = threading.local()
+# worker process 의 token (pool initializer 에서 설정)
+_process_token: Optional["CancelToken"] = None
+
+
+class Cancelled(BaseException):
+    """
+    매칭 취소
+
+    asyncio.CancelledError 처럼 BaseException 을 상속해서
+    matcher 의 except Exception (오류 기록 후 계속 진행) 에 잡히지 않음
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f"matching cancelled: {reason}")
+        self.reason = reason
+
+
+class CancelToken:
+    """
+    Args:
+        timeout: 생성 시점부터의 제한 시간 (초, None 이면 없음)
+        parent: parent 가 취소되면 같이 취소됨 (요청 token 안의 단계 별 제한 시간)
+    """
+
+    def __init__(
+        self, timeout: Optional[float] = None, parent: Optional["CancelToken"] = None
+    ):
+        self._event = multiprocessing.Event()
+        # process 간 비교를 위해 wall clock 사용
+        self.deadline = time.time() + timeout if timeout is not None else None
+        self.parent = parent
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if self.reason is None:
+            self.reason = reason
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.parent is not None and self.parent.is_cancelled():
+            self.cancel(self.parent.reason or "cancelled")
+            return True
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.cancel("deadline")
+            return True
+        return False
+
+    def check(self) -> None:
+        if self.is_cancelled():
+            raise Cancelled(self.reason or "cancelled")
+
+
+def install(token: Optional[CancelToken]) -> None:
+    """ProcessPoolExecutor initializer"""
+    global _process_token
+    _process_token = token
+
+
+@contextlib.contextmanager
+def scope(token: Optional[CancelToken]) -> Iterator[None]:
+    """현재 thread 의 check() 가 token 을 보도록 함 (single process 매칭)"""
+    prev = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield
+    finally:
+        _local.token = prev
+
+
+def current() -> Optional[CancelToken]:
+    return getattr(_local, "token", None) or _process_token
+
+
+def check() -> None:
+    """matcher 의 checkpoint"""
+    token = current()
+    if token is not None:
+        token.check()
@@ -0,0 +1,146 @@
+"""
+최근 매칭 진단 기록 (ring buffer) + sampling 된 debug trace
+
+매칭 중의 상세 정보는 문자열로 만들지 않고 (시각, 이벤트, 값) 그대로 고정 크기 deque 에 넣음.
+문자열 변환은 오류가 나서 dump 할 때와 sampling 된 target 을 debug 로그로 남길 때만 수행함.
+기록은 현재 context (contextvar) 의 Ring 에 쌓임. 요청마다 scope() 안에서 처리해서
+dump 할 때 그 요청의 기록만 남기고 비움.
+Ring 이 없으면 process 기본 Ring 에 기록함 (worker process - 오류가 나면 worker 에서 dump 함,
+fork 로 만든 worker 는 부모의 configure 설정을 그대로 사용)
+"""
+import collections
+import contextlib
+import contextvars
+import logging
+import random
+import threading
+import time
+from typing import Deque, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (시각, 이벤트, 값)
+Entry = Tuple[float, str, dict]
+
+_ring_size = 256
+_sample_rate = 0.0
+
+
+class Ring:
+    """최근 기록 (한 요청 또는 process 기본)"""
+
+    def __init__(self, size: Optional[int] = None):
+        self._lock = threading.Lock()
+        self.entries: Deque[Entry] = collections.deque(
+            maxlen=_ring_size if size is None else max(0, size)
+        )
+
+    def append(self, entry: Entry) -> None:
+        self.entries.append(entry)
+
+    def resize(self, size: int) -> None:
+        with self._lock:
+            self.entries = collections.deque(self.entries, maxlen=max(0, size))
+
+    def snapshot(self) -> List[Entry]:
+        with self._lock:
+            return list(self.entries)
+
+    def drain(self) -> List[Entry]:
+        """기록을 반환하고 비움"""
+        with self._lock:
+            entries = list(self.entries)
+            self.entries.clear()
+        return entries
+
+
+_process = Ring()
+_current: contextvars.ContextVar[Optional[Ring]] = contextvars.ContextVar(
+    "diagnostics_ring", default=None
+)
+# 현재 target 의 trace 를 debug 로그로 남길지 (begin_trace 에서 target 마다 결정)
+_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "diagnostics_sampled", default=False
+)
+
+
+def _ring() -> Ring:
+    return _current.get() or _process
+
+
+def configure(ring_size: int = 256, sample_rate: float = 0.0) -> None:
+    """
+    Args:
+        ring_size: 보관할 최근 기록 수 (0 이면 기록하지 않음) - 이후 시작하는 요청부터 적용
+        sample_rate: debug trace 를 남길 target 비율 (0 ~ 1)
+    """
+    global _ring_size, _sample_rate
+    _ring_size = max(0, ring_size)
+    _process.resize(_ring_size)
+    _sample_rate = sample_rate
+
+
+@contextlib.contextmanager
+def scope() -> Iterator[Ring]:
+    """
+    with diagnostics.scope():
+        ...  # 요청 처리
+
+    안에서 (threadpool, 복사된 context 포함) 남긴 기록은 새 Ring 에 쌓임
+    """
+    ring = Ring()
+    token = _current.set(ring)
+    sampled = _sampled.set(False)
+    try:
+        yield ring
+    finally:
+        _sampled.reset(sampled)
+        _current.reset(token)
+
+
+def begin_trace(**fields) -> bool:
+    """
+    target 하나의 매칭 시작 - sampling 여부를 정하고 시작 기록을 남김
+
+    Args:
+        fields: target 식별값 (target=번호 등)
+    """
+    sampled = _sample_rate > 0 and random.random() < _sample_rate
+    _sampled.set(sampled)
+    record("begin", **fields)
+    return sampled
+
+
+def is_sampled() -> bool:
+    return _sampled.get()
+
+
+def record(event: str, **fields) -> None:
+    """
+    진단 기록 (포맷하지 않음)
+    sampling 된 target 이면 debug 로그로도 남김
+    """
+    ring = _ring()
+    if ring.entries.maxlen:
+        ring.append((time.time(), event, fields))
+    if is_sampled() and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("trace %s %s", event, fields)
+
+
+def snapshot() -> List[dict]:
+    entries = _ring().snapshot()
+    return [{"ts": ts, "event": event, **fields} for ts, event, fields in entries]
+
+
+def dump(log: logging.Logger = logger, level: int = logging.ERROR) -> None:
+    """현재 Ring 의 최근 기록을 로그로 남기고 비움 (오류 발생 시)"""
+    entries = _ring().drain()
+    if not entries or not log.isEnabledFor(level):
+        return
+
+    lines = [
+        f"  {time.strftime('%H:%M:%S', time.localtime(ts))}.{int(ts % 1 * 1000):03d} "
+        f"{event} {fields}"
+        for ts, event, fields in entries
+    ]
+    log.log(level, "recent match diagnostics (%d):\n%s", len(entries), "\n".join(lines))
@@ -0,0 +1,184 @@
+"""
+요청 단위 profiling (cProfile, tracemalloc)
+
+capture(mode) 안에서 실행한 find_matches 를 부모 process 와 worker process 모두 기록함.
+capture 밖에서는 find_matches_parallel 이 worker 에 None 을 넘기므로 추가 비용이 없음
+
+profiler 는 process 에 하나만 켤 수 있음 - tracemalloc 은 process 전역이고, python 3.12+ 의
+cProfile 은 sys.monitoring (process 전역) 을 사용해서 두 번째 enable() 은 ValueError 가 남.
+그래서 reserve() 로 한 번에 한 요청만 profiling 하고, 진행 중인 profile 은 contextvar 로 요청에 묶음.
+profiling 중에는 같은 process 의 다른 요청 (다른 thread) 도 부모 process 기록에 섞일 수 있음
+"""
+import contextlib
+import contextvars
+import cProfile
+import json
+import marshal
+import pstats
+import threading
+import tracemalloc
+from typing import Any, Callable, Iterator, List, Literal, Optional, Tuple, get_args
+
+ProfileMode = Literal["cprofile", "tracemalloc"]
+
+# tracemalloc 에서 남길 할당 위치 수, traceback 깊이
+TRACEMALLOC_TOP = 50
+TRACEMALLOC_FRAMES = 10
+
+_lock = threading.Lock()
+_active: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar(
+    "profile", default=None
+)
+
+
+class ProfilerBusy(RuntimeError):
+    """다른 요청이 profiling 중"""
+
+
+class _RawStats:
+    """cProfile.Profile.stats dict 를 pstats.Stats 에 넘기기 위한 wrapper"""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _start(mode: ProfileMode):
+    if mode == "cprofile":
+        prof = cProfile.Profile()
+        prof.enable()
+        return prof
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    return started
+
+
+def _stop(mode: ProfileMode, state) -> Any:
+    if mode == "cprofile":
+        state.disable()
+        state.create_stats()
+        return state.stats
+
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    if state:
+        tracemalloc.stop()
+    return {
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {
+                "size": stat.size,
+                "count": stat.count,
+                "traceback": stat.traceback.format(),
+            }
+            for stat in snapshot.statistics("traceback")[:TRACEMALLOC_TOP]
+        ],
+    }
+
+
+def run(mode: ProfileMode, fn: Callable, *args, **kwargs) -> Tuple[Any, Any]:
+    """
+    fn 실행을 profiling (worker process 에서 사용)
+
+    Returns:
+        (fn 결과, profile 기록)
+    """
+    state = _start(mode)
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        data = _stop(mode, state)
+    return result, data
+
+
+class Profile:
+    """부모 process 기록 + worker 기록"""
+
+    def __init__(self, mode: ProfileMode):
+        if mode not in get_args(ProfileMode):
+            raise ValueError(f"Unsupported profile mode: {mode}")
+        self.mode = mode
+        self.parent: Any = None
+        self.workers: List[Any] = []
+        self._state = None
+
+    def start(self) -> None:
+        self._state = _start(self.mode)
+
+    def stop(self) -> None:
+        self.parent = _stop(self.mode, self._state)
+
+    def add_worker(self, data: Any) -> None:
+        self.workers.append(data)
+
+    def dump(self) -> Tuple[bytes, str]:
+        """
+        Returns:
+            (파일 내용, 확장자)
+            cprofile 은 pstats 로 읽을 수 있는 .prof (부모 + worker 합계)
+        """
+        if self.mode == "cprofile":
+            stats = pstats.Stats(_RawStats(self.parent or {}))
+            for data in self.workers:
+                stats.add(_RawStats(data))
+            return marshal.dumps(stats.stats), "prof"
+
+        report = {"mode": self.mode, "parent": self.parent, "workers": self.workers}
+        return json.dumps(report).encode(), "json"
+
+
+@contextlib.contextmanager
+def reserve() -> Iterator[None]:
+    """
+    profiler 선점 - 요청이 끝날 때까지 유지하고 그 안에서 capture() 호출
+
+    Raises:
+        ProfilerBusy: 다른 요청이 선점 중
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy("Another request is being profiled.")
+    try:
+        yield
+    finally:
+        _lock.release()
+
+
+@contextlib.contextmanager
+def capture(mode: Optional[ProfileMode]) -> Iterator[Optional[Profile]]:
+    """
+    with profiling.reserve():
+        with profiling.capture("cprofile") as prof:
+            find_matches(...)
+        data, ext = prof.dump()
+
+    mode 가 None 이면 아무것도 하지 않고 None 을 반환함
+    """
+    if mode is None:
+        yield None
+        return
+
+    profile = Profile(mode)
+    token = _active.set(profile)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        _active.reset(token)
+
+
+def active_mode() -> Optional[ProfileMode]:
+    profile = _active.get()
+    return profile.mode if profile is not None else None
+
+
+def add_worker(data: Any) -> None:
+    profile = _active.get()
+    if profile is not None:
+        profile.add_worker(data)
@@ -0,0 +1,352 @@
+import asyncio
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, List, Optional
+from urllib.parse import urljoin, urlparse
+
+import cv2
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_SCHEMES = ("http", "https")
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+class BlockedURL(ValueError):
+    """허용하지 않는 scheme 이나 내부 주소 (SSRF 방지)"""
+
+
+def is_public_address(
+    ip: ipaddress.IPv4Address | ipaddress.IPv6Address,
+    allowed_networks: Iterable[ipaddress.IPv4Network | ipaddress.IPv6Network] = (),
+) -> bool:
+    """loopback, private, link-local (cloud metadata), multicast 등이 아니거나 allowed_networks 안의 주소"""
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    if any(ip in net for net in allowed_networks):
+        return True
+    return ip.is_global and not ip.is_multicast
+
+
+def resolve_url(url: str) -> str:
+    """
+    s3://bucket/key -> {OBJECT_STORE_ENDPOINT}/bucket/key (path-style)
+    """
+    parsed = urlparse(url)
+    if parsed.scheme != "s3":
+        return url
+
+    endpoint = os.getenv("OBJECT_STORE_ENDPOINT")
+    if not endpoint:
+        raise ValueError(f"[{url}] OBJECT_STORE_ENDPOINT is not set")
+    return f"{endpoint.rstrip('/')}/{parsed.netloc}{parsed.path}"
+
+
+def decode_img(data: bytes | bytearray | memoryview) -> np.ndarray:
+    """메모리상의 이미지 bytes 를 복사 없이 cv2.imdecode (np.frombuffer 로 같은 buffer 사용)"""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Failed to decode image")
+    return image
+
+
+class RemoteImageFetcher:
+    """
+    원격 이미지 fetcher
+
+    - 프로세스 당 하나의 httpx.AsyncClient (connection pool) 를 전용 event loop thread 에서 사용
+    - 동시 요청 수 제한 (semaphore)
+    - 로컬 디스크 캐시: url 별로 body + ETag/Last-Modified 를 저장하고
+      max_age 가 지나면 조건부 요청(If-None-Match)으로 재검증.
+      max_cache_bytes 를 넘으면 오래 사용하지 않은 (mtime) 파일부터 삭제
+    - http(s) 만 허용하고, redirect 를 포함한 모든 요청에서 host 를 직접 resolve 해서
+      내부 주소면 거절함. 검사한 IP 로 접속해서 (Host, SNI 는 원래 host) DNS 가 바뀌어도 우회되지 않음.
+      s3:// 는 설정된 OBJECT_STORE_ENDPOINT 로 가는 첫 요청만 검사하지 않음
+    - body 는 하나의 bytearray 에 받고 복사하지 않고 반환함
+      (cv2.imdecode 는 나눠서 decode 할 수 없으므로 decode_img 에서 같은 buffer 를 그대로 사용)
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_connections: int = 32,
+        max_concurrency: int = 8,
+        max_age: float = 300.0,
+        max_bytes: int = (1024**2) * 50,
+        max_cache_bytes: int = (1024**3),
+        timeout: float = 30.0,
+        allowed_networks: Iterable[str] = (),
+    ):
+        """
+        Args:
+            max_bytes: 이미지 하나의 최대 크기
+            max_cache_bytes: 디스크 캐시 최대 크기
+            allowed_networks: 내부 주소 중 예외로 허용할 대역 (예: 사내 object store "10.0.0.0/8")
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.max_cache_bytes = max_cache_bytes
+        self.timeout = timeout
+        self.allowed_networks = [ipaddress.ip_network(n) for n in allowed_networks]
+        # 마지막 캐시 정리 이후 기록한 bytes (max_cache_bytes 의 1/10 마다 정리)
+        self._written = 0
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+        self.hits = 0  # 디스크 캐시 그대로 사용
+        self.revalidated = 0  # 304
+        self.downloads = 0
+
+    # ---- event loop ----
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    self._client = httpx.AsyncClient(
+                        timeout=self.timeout,
+                        # redirect 는 hop 마다 주소를 검사하기 위해 직접 처리
+                        follow_redirects=False,
+                        limits=httpx.Limits(max_connections=self.max_connections),
+                    )
+                    self._sem = asyncio.Semaphore(self.max_concurrency)
+                    started.set()
+                    loop.run_forever()
+
+                threading.Thread(
+                    target=run, name="remote-image-fetcher", daemon=True
+                ).start()
+                started.wait()
+                self._loop = loop
+        return self._loop
+
+    def fetch_sync(self, url: str) -> bytearray:
+        """동기 코드(load_img, worker process)에서 사용"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._fetch(url), loop).result()
+
+    async def fetch(self, url: str) -> bytearray:
+        """다른 event loop (FastAPI 등)에서 사용"""
+        loop = self._ensure_loop()
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._fetch(url), loop)
+        )
+
+    async def fetch_many(self, urls: List[str]) -> List[bytearray]:
+        return list(await asyncio.gather(*[self.fetch(u) for u in urls]))
+
+    # ---- cache ----
+    def _cache_paths(self, url: str):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        base = self.cache_dir / key[:2]
+        return base / f"{key}.bin", base / f"{key}.json"
+
+    def _read_meta(self, meta_path: Path) -> Optional[dict]:
+        try:
+            return json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes | bytearray) -> None:
+        tmp = path.parent / f".{uuid.uuid4().hex}"
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _write_cache(
+        self, body_path: Path, meta_path: Path, data: bytearray, meta: dict
+    ) -> None:
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(body_path, data)
+        self._write_atomic(meta_path, json.dumps(meta).encode())
+
+        self._written += len(data)
+        if self._written >= self.max_cache_bytes // 10:
+            self._written = 0
+            self.evict()
+
+    def evict(self) -> None:
+        """캐시가 max_cache_bytes 를 넘으면 mtime 이 오래된 순서로 90% 까지 삭제"""
+        entries = []
+        total = 0
+        for body_path in self.cache_dir.glob("*/*.bin"):
+            try:
+                stat = body_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, body_path))
+            total += stat.st_size
+        if total <= self.max_cache_bytes:
+            return
+
+        target = self.max_cache_bytes * 0.9
+        for _, size, body_path in sorted(entries):
+            if total <= target:
+                break
+            body_path.with_suffix(".json").unlink(missing_ok=True)
+            body_path.unlink(missing_ok=True)
+            total -= size
+        logger.debug("remote image cache evicted to %d bytes", total)
+
+    # ---- request ----
+    async def _resolve(self, host: str, port: int) -> str:
+        """host 의 주소를 검사해서 접속할 IP 반환 (하나라도 내부 주소면 거절)"""
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, port, type=socket.SOCK_STREAM
+            )
+        except socket.gaierror as e:
+            raise httpx.ConnectError(f"Failed to resolve {host}: {e}")
+
+        addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+        if not addresses:
+            raise httpx.ConnectError(f"Failed to resolve {host}")
+        blocked = [
+            ip for ip in addresses
+            if not is_public_address(ip, self.allowed_networks)
+        ]
+        if blocked:
+            raise BlockedURL(f"[{host}] Address not allowed: {blocked[0]}")
+        return str(addresses[0])
+
+    async def _request(
+        self, url: str, headers: dict, trusted: bool = False
+    ) -> httpx.Request:
+        """
+        검사한 IP 로 보낼 요청
+
+        Args:
+            trusted: 주소 검사 생략 (설정된 object store endpoint)
+        """
+        parsed = urlparse(url)
+        if parsed.scheme not in ALLOWED_SCHEMES or not parsed.hostname:
+            raise BlockedURL(f"[{url}] Scheme not allowed")
+        if trusted:
+            return self._client.build_request("GET", url, headers=headers)
+
+        host = parsed.hostname
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        ip = await self._resolve(host, port)
+        pinned = httpx.URL(url).copy_with(host=ip)
+        headers = {**headers, "Host": parsed.netloc.rpartition("@")[2]}
+        extensions = {"sni_hostname": host} if parsed.scheme == "https" else {}
+        return self._client.build_request(
+            "GET", pinned, headers=headers, extensions=extensions
+        )
+
+    async def _send(self, url: str, headers: dict) -> httpx.Response:
+        """redirect 를 따라가며 hop 마다 scheme, 주소 검사 (stream 응답)"""
+        trusted = urlparse(url).scheme == "s3"
+        current = resolve_url(url)
+        for _ in range(MAX_REDIRECTS + 1):
+            request = await self._request(current, headers, trusted)
+            res = await self._client.send(request, stream=True)
+            location = res.headers.get("location")
+            if res.status_code not in REDIRECT_STATUSES or not location:
+                return res
+            await res.aclose()
+            current = urljoin(current, location)
+            trusted = False
+        raise httpx.TooManyRedirects(f"[{url}] Too many redirects")
+
+    async def _fetch(self, url: str) -> bytearray:
+        body_path, meta_path = self._cache_paths(url)
+        meta = self._read_meta(meta_path) if body_path.exists() else None
+
+        if meta and time.time() - meta["checked_at"] < self.max_age:
+            self.hits += 1
+            body_path.touch()
+            return bytearray(body_path.read_bytes())
+
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        async with self._sem:
+            res = await self._send(url, headers)
+            try:
+                if res.status_code == 304 and meta:
+                    self.revalidated += 1
+                    data = bytearray(body_path.read_bytes())
+                    meta["checked_at"] = time.time()
+                    self._write_atomic(meta_path, json.dumps(meta).encode())
+                    return data
+
+                res.raise_for_status()
+
+                length = res.headers.get("content-length")
+                if length and length.isdigit() and int(length) > self.max_bytes:
+                    raise ValueError(f"[{url}] Image too large")
+
+                buf = bytearray()
+                async for chunk in res.aiter_bytes():
+                    buf.extend(chunk)
+                    if len(buf) > self.max_bytes:
+                        raise ValueError(f"[{url}] Image too large")
+            finally:
+                await res.aclose()
+
+            new_meta = {
+                "url": url,
+                "etag": res.headers.get("etag"),
+                "last_modified": res.headers.get("last-modified"),
+                "content_type": res.headers.get("content-type"),
+                "sha256": hashlib.sha256(buf).hexdigest(),
+                "checked_at": time.time(),
+            }
+
+        self.downloads += 1
+        logger.debug("remote image downloaded: %s (%d bytes)", url, len(buf))
+        self._write_cache(body_path, meta_path, buf, new_meta)
+        return buf
+
+
+_fetcher: Optional[RemoteImageFetcher] = None
+_fetcher_pid: Optional[int] = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher() -> RemoteImageFetcher:
+    """프로세스 당 하나 (fork 된 worker 는 새로 생성)"""
+    global _fetcher, _fetcher_pid
+    with _fetcher_lock:
+        if _fetcher is None or _fetcher_pid != os.getpid():
+            cache_dir = os.getenv(
+                "REMOTE_IMG_CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), "iae_remote_cache"),
+            )
+            allowed = os.getenv("REMOTE_IMG_ALLOWED_NETWORKS", "")
+            _fetcher = RemoteImageFetcher(
+                cache_dir,
+                max_concurrency=int(os.getenv("REMOTE_IMG_MAX_CONCURRENCY", 8)),
+                max_cache_bytes=int(
+                    os.getenv("REMOTE_IMG_CACHE_MAX_BYTES", 1024**3)  # 1gb
+                ),
+                allowed_networks=[n.strip() for n in allowed.split(",") if n.strip()],
+            )
+            _fetcher_pid = os.getpid()
+    return _fetcher
@@ -0,0 +1,45 @@
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+import numpy as np
+
+from . import timing
+
+T = TypeVar("T")
+
+# id(원본 이미지) -> {key: 계산 결과}
+# 원본 이미지가 GC 되면 weakref.finalize 로 같이 제거됨
+_cache: Dict[int, Dict[Hashable, Any]] = {}
+_lock = threading.Lock()
+
+
+def get_cached(org: np.ndarray, key: Hashable, compute: Callable[[], T]) -> T:
+    """
+    원본 이미지 기준으로 한 번만 계산하는 값 (gray, SIFT 특징점 등)
+
+    같은 원본에 여러 target 을 매칭할 때 target 마다 다시 계산하지 않도록 함.
+    원본 이미지는 매칭 중에 수정되지 않는다고 가정함
+
+    Args:
+        org: 원본 이미지 (객체 identity 로 구분)
+        key: 계산 종류
+        compute: 캐시에 없을 때 실행할 함수
+    """
+    org_id = id(org)
+    with _lock:
+        entry = _cache.get(org_id)
+        if entry is not None and key in entry:
+            timing.incr("source_cache.hit")
+            return entry[key]
+
+    timing.incr("source_cache.miss")
+    value = compute()
+
+    with _lock:
+        entry = _cache.get(org_id)
+        if entry is None:
+            entry = _cache[org_id] = {}
+            weakref.finalize(org, _cache.pop, org_id, None)
+        entry.setdefault(key, value)
+        return entry[key]
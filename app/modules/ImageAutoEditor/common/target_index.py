@@ -0,0 +1,441 @@
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+FLANN_INDEX_KDTREE = 1
+INDEX_VERSION = 1
+
+# TargetIndex.generation - process 안에서 index 마다, 변경마다 다른 값 (id() 처럼 재사용되지 않음)
+_generations = itertools.count(1)
+
+
+def image_digest(img: np.ndarray) -> str:
+    """디코딩된 이미지 내용으로 만든 식별값 (index 에서 target 을 찾을 때 사용)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(img.shape).encode())
+    h.update(np.ascontiguousarray(img).data)
+    return h.hexdigest()
+
+
+@dataclass
+class _Entry:
+    digest: str
+    file_hash: str  # DB 의 file_hash (변경 감지용)
+    pts: np.ndarray  # (N, 2) target 특징점 좌표
+    des: np.ndarray  # (N, 128) SIFT descriptor
+    shape: Tuple[int, int]  # target (h, w)
+
+
+@dataclass
+class _Segment:
+    """index 의 한 부분 - base 는 FLANN, 최근 변경분 (delta) 은 brute force"""
+
+    keys: List[str]
+    entries: List[_Entry]
+    des: np.ndarray  # 전체 descriptor
+    labels: np.ndarray  # descriptor -> keys 번호
+    offsets: np.ndarray  # keys 번호 -> 시작 위치
+    matcher: Optional[cv2.DescriptorMatcher]
+
+    @classmethod
+    def build(cls, items: List[Tuple[str, _Entry]], flann: bool) -> "_Segment":
+        keys = [k for k, _ in items]
+        entries = [e for _, e in items]
+        sizes = [len(e.des) for e in entries]
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        labels = np.repeat(np.arange(len(keys)), sizes)
+        des = (
+            np.concatenate([e.des for e in entries]) if entries
+            else np.zeros((0, 128), np.float32)
+        )
+
+        matcher = None
+        if len(des):
+            if flann and len(des) >= 2:
+                matcher = cv2.FlannBasedMatcher(
+                    dict(algorithm=FLANN_INDEX_KDTREE, trees=5), dict(checks=50)
+                )
+            else:
+                matcher = cv2.BFMatcher(cv2.NORM_L2)
+            matcher.add([des])
+            matcher.train()
+        return cls(keys, entries, des, labels, offsets, matcher)
+
+    @property
+    def size(self) -> int:
+        return int(self.offsets[-1])
+
+    def knn(self, des: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (거리 (Q, k), descriptor 위치 (Q, k)) - 이웃이 k 개보다 적으면 inf, -1
+        """
+        dist = np.full((len(des), k), np.inf, np.float32)
+        idx = np.full((len(des), k), -1, np.int64)
+        if self.matcher is None:
+            return dist, idx
+
+        for q, row in enumerate(self.matcher.knnMatch(des, k=min(k, self.size))):
+            for j, m in enumerate(row):
+                dist[q, j] = m.distance
+                idx[q, j] = m.trainIdx
+        return dist, idx
+
+
+class TargetIndex:
+    """
+    등록된 모든 target 의 SIFT descriptor 를 하나의 index 로 관리
+
+    원본의 descriptor 를 한 번만 질의해서 target 별로 투표(lowe's ratio 통과 수)를 받고,
+    투표를 충분히 받은 target 만 homography 로 검증함
+
+    target 추가/삭제는 entry 단위로 반영됨. FLANN index (base) 는 다시 학습하지 않고
+    추가/변경된 target 은 brute force 로 찾는 delta 에, 삭제/변경된 target 은 제외 목록에 넣고,
+    delta 나 제외된 descriptor 가 base 의 REBUILD_RATIO 를 넘으면 한 번에 다시 학습함
+    """
+
+    # base 를 다시 학습하는 기준 (base descriptor 수 대비), delta 는 최소 DELTA_MIN 까지 허용
+    REBUILD_RATIO = 0.25
+    DELTA_MIN = 20000
+    # 두 번째 이웃을 찾을 범위 (원본 descriptor 당 이웃 수)
+    NEIGHBOURS = 8
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._sift = cv2.SIFT.create()
+        # 변경 / index 갱신 (여러 thread 에서 같은 index 사용)
+        self._lock = threading.RLock()
+
+        self._base: Optional[_Segment] = None
+        self._delta: Optional[_Segment] = None
+        self._dead: frozenset = frozenset()  # base 에서 제외할 key
+        self._digests: Optional[Dict[str, str]] = None
+        self._dirty = True
+        # 투표 결과 cache 의 key (변경될 때마다 증가)
+        self.generation = next(_generations)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str):
+        return key in self._entries
+
+    def keys(self) -> List[str]:
+        return list(self._entries.keys())
+
+    def digest_map(self) -> Dict[str, str]:
+        """image_digest -> key"""
+        with self._lock:
+            if self._digests is None:
+                self._digests = {e.digest: k for k, e in self._entries.items()}
+            return self._digests
+
+    # ---- 변경 ----
+    def _put(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._changed()
+
+    def _changed(self) -> None:
+        self._digests = None
+        self._dirty = True
+        self.generation = next(_generations)
+
+    def add(self, key: str, img: np.ndarray, file_hash: str = "") -> None:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        kp, des = self._sift.detectAndCompute(gray, None)
+        if des is None:
+            des = np.zeros((0, 128), np.float32)
+
+        self._put(key, _Entry(
+            digest=image_digest(img),
+            file_hash=file_hash,
+            pts=np.float32([k.pt for k in kp]).reshape(-1, 2),
+            des=des.astype(np.float32),
+            shape=img.shape[:2],
+        ))
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._changed()
+
+    def prune(self, wanted: Dict[str, str]) -> bool:
+        """
+        wanted 에 없거나 file_hash 가 바뀐 target 제거
+
+        Args:
+            wanted: key -> file_hash (활성 target 전체)
+        Returns:
+            변경 여부
+        """
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if wanted.get(key) != entry.file_hash
+            ]
+            for key in stale:
+                self.remove(key)
+        return bool(stale)
+
+    def sync(self, targets: Iterable[Tuple[str, str, str]]) -> bool:
+        """
+        DB 의 target 목록과 맞춤 (없는 것만 추가, 사라지거나 바뀐 것은 제거)
+
+        Args:
+            targets: (key, file_hash, 이미지 경로)
+        Returns:
+            변경 여부
+        """
+        targets = list(targets)
+        changed = self.prune({key: file_hash for key, file_hash, _ in targets})
+        return self.add_missing(targets) or changed
+
+    def add_missing(self, targets: Iterable[Tuple[str, str, str]]) -> bool:
+        """sync 와 같지만 목록에 없는 target 을 제거하지 않음"""
+        changed = False
+        for key, file_hash, path in targets:
+            entry = self._entries.get(key)
+            if entry is not None and entry.file_hash == file_hash:
+                continue
+            try:
+                self.add(key, utils.load_img(path), file_hash)
+                changed = True
+            except Exception as e:
+                logger.error("target index - failed to add %s: %s", key, e)
+        return changed
+
+    def merge_from(self, other: "TargetIndex") -> bool:
+        """
+        다시 로드한 index 의 변경분만 반영 (학습된 base 는 유지)
+
+        Returns:
+            변경 여부
+        """
+        with self._lock:
+            changed = self.prune({k: e.file_hash for k, e in other._entries.items()})
+            for key, entry in other._entries.items():
+                current = self._entries.get(key)
+                if current is None or current.digest != entry.digest:
+                    self._put(key, entry)
+                    changed = True
+        return changed
+
+    # ---- index ----
+    def _refresh(self) -> None:
+        """변경분을 delta / 제외 목록에 반영하고, 기준을 넘으면 base 를 다시 학습"""
+        base = self._base
+        base_entries = dict(zip(base.keys, base.entries)) if base else {}
+        dead = [k for k, e in base_entries.items() if self._entries.get(k) is not e]
+        pending = [
+            (k, e) for k, e in self._entries.items() if base_entries.get(k) is not e
+        ]
+        dead_size = sum(len(base_entries[k].des) for k in dead)
+        pending_size = sum(len(e.des) for _, e in pending)
+
+        limit = self.REBUILD_RATIO * base.size if base else 0
+        if (
+            base is None
+            or dead_size > limit
+            or pending_size > max(self.DELTA_MIN, limit)
+        ):
+            self._base = _Segment.build(list(self._entries.items()), flann=True)
+            self._delta = None
+            self._dead = frozenset()
+            logger.debug(
+                "target index built: %d targets, %d descriptors",
+                len(self._base.keys), self._base.size,
+            )
+        else:
+            self._delta = _Segment.build(pending, flann=False) if pending else None
+            self._dead = frozenset(dead)
+        self._dirty = False
+
+    def _segments(self) -> List[Tuple[_Segment, frozenset]]:
+        """질의할 (segment, 제외할 key) - 만들어진 segment 는 변경하지 않음"""
+        with self._lock:
+            if self._dirty:
+                self._refresh()
+            segments = [(self._base, self._dead)]
+            if self._delta is not None:
+                segments.append((self._delta, frozenset()))
+            return segments
+
+    def vote(
+        self, kp_org, des_org: np.ndarray, ratio: float
+    ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        원본 descriptor 를 index 에 한 번 질의하고 target 별 대응점을 모음
+
+        lowe's ratio 의 두 번째 이웃은 가까운 NEIGHBOURS 개 중에서 찾되,
+        다른 target 의 descriptor 중 첫 번째 이웃과 거의 같은 것 (첫 번째 이웃 거리 이내) 은
+        같은 특징으로 보고 건너뜀. 통과하면 그 target 들에도 같이 투표함
+        (비슷한 target 이 여러 개 있어도 서로의 투표를 막지 않음)
+
+        Args:
+            kp_org: 원본 특징점
+            des_org: 원본 descriptor
+            ratio: lowe's ratio
+        Returns:
+            key -> (target 점 (N, 2), 원본 점 (N, 2)), N 이 투표 수
+        """
+        segments = self._segments()
+        if des_org is None or len(des_org) == 0:
+            return {}
+
+        des_org = des_org.astype(np.float32)
+        k = self.NEIGHBOURS
+        keys: List[str] = []
+        entries: List[_Entry] = []
+        dists, labels, points, segs, idxs = [], [], [], [], []
+        for s_no, (segment, dead) in enumerate(segments):
+            dist, idx = segment.knn(des_org, k)
+            label = segment.labels[np.maximum(idx, 0)] if segment.size else idx
+            removed = np.array([key in dead for key in segment.keys] + [True])
+            dist[(idx < 0) | removed[label]] = np.inf
+            valid = np.isfinite(dist)
+
+            dists.append(dist)
+            labels.append(np.where(valid, label + len(keys), -1))
+            points.append(idx - segment.offsets[np.maximum(label, 0)])
+            segs.append(np.full(idx.shape, s_no))
+            idxs.append(np.maximum(idx, 0))
+            keys.extend(segment.keys)
+            entries.extend(segment.entries)
+
+        # 전체 segment 에서 가까운 순서로 k 개
+        dist = np.concatenate(dists, axis=1)
+        order = np.argsort(dist, axis=1, kind="stable")[:, :k]
+        dist = np.take_along_axis(dist, order, axis=1)
+        label, point, seg, idx = (
+            np.take_along_axis(np.concatenate(a, axis=1), order, axis=1)
+            for a in (labels, points, segs, idxs)
+        )
+
+        def vectors(j: int) -> np.ndarray:
+            out = np.zeros((len(des_org), 128), np.float32)
+            for s_no, (segment, _) in enumerate(segments):
+                sel = (seg[:, j] == s_no) & (label[:, j] >= 0)
+                out[sel] = segment.des[idx[sel, j]]
+            return out
+
+        # 첫 번째 이웃과 같은 특징인 다른 target 의 이웃
+        first = vectors(0)
+        same = np.zeros(dist.shape, bool)
+        same[:, 0] = label[:, 0] >= 0
+        for j in range(1, k):
+            near = np.linalg.norm(vectors(j) - first, axis=1) <= dist[:, 0]
+            same[:, j] = (label[:, j] >= 0) & (label[:, j] != label[:, 0]) & near
+
+        # 두 번째 이웃 - 없으면 k 번째 이웃 거리 (실제 거리보다 가까우므로 보수적)
+        second = dist[:, k - 1].copy()
+        for j in range(k - 1, 0, -1):
+            second = np.where(same[:, j], second, dist[:, j])
+        ok = same[:, 0] & np.isfinite(second) & (dist[:, 0] < ratio * second)
+
+        org_idx, lib_label, lib_point = [], [], []
+        for j in range(k):
+            vote = ok & same[:, j]
+            for jj in range(j):
+                vote &= ~(same[:, jj] & (label[:, jj] == label[:, j]))
+            org_idx.append(np.flatnonzero(vote))
+            lib_label.append(label[vote, j])
+            lib_point.append(point[vote, j])
+
+        org_idx = np.concatenate(org_idx)
+        if not len(org_idx):
+            return {}
+        lib_label = np.concatenate(lib_label)
+        lib_point = np.concatenate(lib_point)
+        org_pts = np.float32([kp_org[i].pt for i in org_idx])
+
+        votes = {}
+        for lab in np.unique(lib_label):
+            sel = lib_label == lab
+            votes[keys[lab]] = (entries[lab].pts[lib_point[sel]], org_pts[sel])
+        return votes
+
+    def shape(self, key: str) -> Tuple[int, int]:
+        return self._entries[key].shape
+
+    # ---- 저장 ----
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            keys = list(self._entries.keys())
+            entries = [self._entries[k] for k in keys]
+        sizes = [len(e.des) for e in entries]
+
+        tmp = path.parent / f".{uuid.uuid4().hex}.npz"
+        np.savez(
+            tmp,
+            version=INDEX_VERSION,
+            keys=np.array(keys, dtype=str),
+            digests=np.array([e.digest for e in entries], dtype=str),
+            file_hashes=np.array([e.file_hash for e in entries], dtype=str),
+            shapes=np.array([e.shape for e in entries], dtype=np.int64).reshape(-1, 2),
+            sizes=np.array(sizes, dtype=np.int64),
+            pts=np.concatenate([e.pts for e in entries]) if entries else np.zeros((0, 2), np.float32),
+            des=np.concatenate([e.des for e in entries]) if entries else np.zeros((0, 128), np.float32),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "TargetIndex":
+        index = cls()
+        with np.load(path) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError("Unsupported target index version")
+
+            offsets = np.concatenate([[0], np.cumsum(data["sizes"])])
+            pts, des = data["pts"], data["des"]
+            for i, key in enumerate(data["keys"]):
+                s, e = offsets[i], offsets[i + 1]
+                index._entries[str(key)] = _Entry(
+                    digest=str(data["digests"][i]),
+                    file_hash=str(data["file_hashes"][i]),
+                    pts=pts[s:e],
+                    des=des[s:e],
+                    shape=tuple(int(v) for v in data["shapes"][i]),
+                )
+        index._changed()
+        return index
+
+
+# process 별로 로드한 index (경로 -> (mtime, index))
+_loaded: Dict[str, Tuple[int, TargetIndex]] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_cached(path: str) -> Optional[TargetIndex]:
+    """파일이 바뀐 경우에만 다시 로드 (이미 로드한 index 에는 변경분만 반영)"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != mtime:
+            loaded = TargetIndex.load(path)
+            if cached is not None:
+                cached[1].merge_from(loaded)
+                loaded = cached[1]
+            cached = (mtime, loaded)
+            _loaded[path] = cached
+        return cached[1]
@@ -0,0 +1,153 @@
+"""
+엔진 내부 단계별 소요 시간 / 횟수 수집
+
+기본은 비활성이고 비활성 상태에서 span 은 공유 nullcontext 를 반환하므로 비용이 거의 없음.
+기록은 현재 context (contextvar) 의 Collector 에 쌓임. 요청마다 collect(collector) 안에서
+엔진을 실행해서 동시에 처리 중인 요청의 기록이 섞이지 않도록 함.
+Collector 가 없으면 process 기본 Collector 에 기록함 (worker process - 작업이 끝날 때 pop() 으로
+꺼내서 부모 process 에서 merge() 함)
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_enabled = False
+_NULL = contextlib.nullcontext()
+
+
+class Collector:
+    """한 요청 (또는 worker 작업) 의 기록"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> [횟수, 초]
+        self.spans: Dict[str, List[float]] = {}
+        # name -> 횟수
+        self.counters: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            rec = self.spans.setdefault(name, [0, 0.0])
+            rec[0] += 1
+            rec[1] += seconds
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def pop(self) -> dict:
+        """지금까지의 기록을 반환하고 초기화"""
+        with self._lock:
+            data = {"spans": self.spans, "counters": self.counters}
+            self.spans, self.counters = {}, {}
+        return data
+
+    def merge(self, data: dict) -> None:
+        if not data:
+            return
+        with self._lock:
+            for name, (count, seconds) in data.get("spans", {}).items():
+                rec = self.spans.setdefault(name, [0, 0.0])
+                rec[0] += count
+                rec[1] += seconds
+            for name, n in data.get("counters", {}).items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+
+_process = Collector()
+_current: contextvars.ContextVar[Optional[Collector]] = contextvars.ContextVar(
+    "timing_collector", default=None
+)
+
+
+def _collector() -> Collector:
+    return _current.get() or _process
+
+
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+@contextlib.contextmanager
+def collect(collector: Collector) -> Iterator[Collector]:
+    """
+    with timing.collect(collector):
+        find_matches(...)
+
+    같은 thread (context) 안에서 시작하고 끝나야 함.
+    threadpool 에서 단계별로 실행하는 generator 는 collecting() 사용
+    """
+    token = _current.set(collector)
+    try:
+        yield collector
+    finally:
+        _current.reset(token)
+
+
+def collecting(collector: Collector, it: Iterator[T]) -> Iterator[T]:
+    """
+    iterator 의 각 단계 (next, close) 를 collector 에 기록
+    iterate_in_threadpool 처럼 단계마다 다른 thread 에서 실행되는 경우에 사용
+    """
+    try:
+        while True:
+            with collect(collector):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            with collect(collector):
+                close()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def span(name: str):
+    """with timing.span("load.source"): ..."""
+    return _Span(name) if _enabled else _NULL
+
+
+def record(name: str, seconds: float) -> None:
+    if _enabled:
+        _collector().record(name, seconds)
+
+
+def incr(name: str, n: int = 1) -> None:
+    if _enabled:
+        _collector().incr(name, n)
+
+
+def pop() -> dict:
+    """현재 Collector 의 기록을 반환하고 초기화"""
+    return _collector().pop()
+
+
+def merge(data: dict) -> None:
+    """worker 에서 pop() 한 기록을 현재 Collector 에 합침"""
+    _collector().merge(data)
@@ -1,10 +1,12 @@
-from typing import Literal
-from dataclasses import dataclass
+from typing import List, Literal, Optional, Tuple
+from dataclasses import dataclass, field
 
 TemplateMethod = Literal[
     "TM_CCOEFF_NORMED", "TM_CCORR_NORMED", "TM_SQDIFF_NORMED"
 ]
 HashMethod = Literal["AHASH", "PHASH", "DHASH"]
+# template matching 에 사용할 이미지 (bgr: 3 channel, gray, edge: gradient 크기)
+TemplateMode = Literal["bgr", "gray", "edge"]
 MatchingMethod = TemplateMethod | HashMethod
 
 
@@ -17,6 +19,10 @@ class MatchResult:
     similarity: float
     method: str = ""
     scale: float = 1.0
+    # find_matches 의 target_imgs 에서의 위치 (unpack 에는 포함되지 않음)
+    target: Optional[int] = None
+    # spatial prior 영역에서만 검색해서 찾은 결과 (prior 학습에서 제외)
+    roi_only: bool = False
 
     def __setattr__(self, key, value):
         if key in ("x", "y", "similarity") and value < 0:
@@ -35,3 +41,36 @@ class MatchResult:
                 self.scale,
             )
         )
+
+
+@dataclass
+class BudgetResult:
+    """find_matches_budgeted 결과"""
+
+    matches: List[MatchResult] = field(default_factory=list)
+    # 시간이 부족해서 모든 matcher 를 실행하지 못한 target 이 있음
+    partial: bool = False
+    # 실행하지 못한 (target index, matcher 이름)
+    skipped: List[Tuple[int, str]] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class CascadeBand:
+    """
+    cascade 에서 matcher 결과(similarity)의 판정 구간
+
+    - accept 이상: 확정
+    - reject 미만: 제외
+    - 그 사이: 다음 matcher 가 해당 영역(ROI)에서 다시 확인
+    """
+
+    accept: float
+    reject: float
+    # 결과가 하나도 없으면 다음 matcher 는 원본 전체를 검색
+    full_on_empty: bool = True
+    # ROI 여백 (target 크기 대비 비율)
+    margin: float = 0.5
+
+    def __post_init__(self):
+        if self.reject > self.accept:
+            raise ValueError("reject must be less than or equal to accept")
@@ -2,22 +2,36 @@ from typing import List, runtime_checkable, Protocol, Union, Sequence, Mapping
 import cv2
 import numpy as np
 from pathlib import Path
+from urllib.parse import urlparse
 
 from .config import SUPPORTED_FORMATS
 
+REMOTE_SCHEMES = ("http", "https", "s3")
+
+
+def is_remote(img: str) -> bool:
+    return urlparse(img).scheme in REMOTE_SCHEMES
+
 
 def load_img(img: str | np.ndarray) -> np.ndarray:
     """
     이미지 로드
     Args:
-        img(str|np.ndarray): 이미지 경로 | 이미지 numpy 배열
+        img(str|np.ndarray): 이미지 경로 | 이미지 url (http, https, s3) | 이미지 numpy 배열
     """
-    # img_type = "local"  # local, s3
-
     # 이미 np array인 경우 그냥 돌려줌
     if isinstance(img, np.ndarray):
         return img
 
+    # 웹 url 인 경우 - 공용 connection pool + 디스크 캐시
+    if is_remote(img):
+        from .remote import get_fetcher, decode_img
+
+        try:
+            return decode_img(get_fetcher().fetch_sync(img))
+        except ValueError:
+            raise ValueError(f"[{img}] Failed to load image")
+
     path = Path(img)
 
     image = None
@@ -31,8 +45,6 @@ def load_img(img: str | np.ndarray) -> np.ndarray:
             )
 
         image = cv2.imread(img, cv2.IMREAD_COLOR)
-    # TODO: 이미지가 웹 url 인 경우.
-    # else:
 
     if image is None:
         raise ValueError(f"[{img}] Failed to load image")
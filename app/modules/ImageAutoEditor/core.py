@@ -1,12 +1,17 @@
 import logging
-from typing import List, Optional
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
 
 import cv2
 import numpy as np
 
-from .common import types, utils
-from .helper import MatcherBuilder
-from .multi_process_work import find_matches_parallel
+from .common import cancel, diagnostics, timing, types, utils
+from .helper import MatcherBuilder, SpatialPrior
+from .multi_process_work import (
+    find_matches_batch_parallel, iter_match_source, iter_matches_parallel,
+    match_source, worker_pool,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +21,8 @@ def find_matches(
     target_imgs: List[str],
     mbuilder: MatcherBuilder,
     multi_process_count: int = 1,
+    priors: Optional[List[Optional[SpatialPrior]]] = None,
+    token: Optional[cancel.CancelToken] = None,
 ) -> List[types.MatchResult]:
     """
     Find matches of target_img in original_img using specified methods.
@@ -26,37 +33,263 @@ def find_matches(
         target_imgs: 타겟 이미지 (경로)
         mbuilder: Match Builder
         multi_process_count
+        priors: target_imgs 와 같은 순서의 SpatialPrior (MatcherBuilder.set_spatial_prior)
+        token: 취소되면 매칭을 멈추고 cancel.Cancelled 를 raise
     """
-    if multi_process_count <= 1:
-        return __find_matches_single(original_img, target_imgs, mbuilder)
-    else:
-        return find_matches_parallel(
-            original_img, target_imgs, mbuilder, multi_process_count
-        )
+    matches: List[types.MatchResult] = []
+    for _, res in iter_matches(
+        original_img, target_imgs, mbuilder, multi_process_count, priors, token
+    ):
+        matches.extend(res)
+    return matches
 
 
-def __find_matches_single(
+def iter_matches(
     original_img: str,
     target_imgs: List[str],
-    mbuilder: MatcherBuilder
-) -> List[types.MatchResult]:
-    """Single process of find_matches"""
-    original_img = utils.load_img(original_img)
-    target_imgs = utils.load_target_imgs(target_imgs)
+    mbuilder: MatcherBuilder,
+    multi_process_count: int = 1,
+    priors: Optional[List[Optional[SpatialPrior]]] = None,
+    token: Optional[cancel.CancelToken] = None,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> Iterator[Tuple[int, List[types.MatchResult]]]:
+    """
+    find_matches - target 하나가 끝날 때마다 (target index, 매칭 결과)
 
-    # 모든 매칭 수행
-    all_matches: List[types.MatchResult] = []
+    multi process 는 끝나는 순서대로 반환하고, 중간에 반복을 멈추면 남은 target 은 매칭하지 않음
 
-    for idx, target in enumerate(target_imgs):
-        logger.debug(f"\n--- 타겟 {idx + 1} 매칭")
+    Args:
+        executor: multi process 에서 재사용할 pool (worker_pool, 같은 token 으로 만든 것)
+    """
+    if priors is None:
+        priors = [None] * len(target_imgs)
+
+    try:
+        if multi_process_count <= 1:
+            with timing.span("load.target"):
+                targets = utils.load_target_imgs(target_imgs)
+            yield from iter_match_source(
+                mbuilder, original_img, targets, priors, token
+            )
+        else:
+            yield from iter_matches_parallel(
+                original_img, target_imgs, mbuilder, multi_process_count, priors,
+                token, executor,
+            )
+    finally:
+        mbuilder.flush_stats()
+
+
+def find_matches_budgeted(
+    original_img: str,
+    target_imgs: List[str],
+    mbuilder: MatcherBuilder,
+    budget: float,
+    multi_process_count: int = 1,
+    priors: Optional[List[Optional[SpatialPrior]]] = None,
+    token: Optional[cancel.CancelToken] = None,
+) -> types.BudgetResult:
+    """
+    제한 시간 (budget) 안에서 가능한 만큼 매칭
 
-        try:
-            matches = mbuilder.match(original_img, target)
-            all_matches.extend(matches)
-        except Exception as e:
-            logger.error(e)
+    matcher 를 예상 시간 (MatcherBuilder.matcher_costs) 이 짧은 순서로 단계를 나누고,
+    단계마다 아직 찾지 못한 target 중 남은 시간 안에 끝날 만큼만 실행함.
+    (빠른 matcher 를 모든 target 에 먼저 실행하고, SIFT 등은 시간이 남을 때만)
+    prefilter 는 첫 단계에서만 실행하고 통과한 target 만 다음 단계로 넘김.
+    worker pool 과 원본 이미지는 모든 단계에서 재사용함.
+    budget 이 지나면 실행 중인 매칭도 checkpoint 에서 멈추고 그때까지의 결과를 partial 로 반환함.
+    cascade 는 단계를 나눌 수 없으므로 전체를 한 단계로 실행함
 
-    return all_matches
+    Args:
+        budget: 제한 시간 (초)
+        token: 요청 취소 (취소되면 결과 대신 cancel.Cancelled)
+    """
+    deadline = time.time() + budget
+    workers = max(1, multi_process_count)
+    if priors is None:
+        priors = [None] * len(target_imgs)
+
+    costs = mbuilder.matcher_costs()
+    if mbuilder.is_cascade:
+        phases = [list(range(len(mbuilder.matchers)))]
+    else:
+        phases = [[i] for i in sorted(range(len(costs)), key=lambda i: costs[i])]
+    early_stop = mbuilder.get_config("early_stop", False) or mbuilder.is_cascade
+    prefilter = mbuilder.prefilter
+    # shadow 모드의 prefilter 는 기록만 하고 제외하지 않음
+    filtering = prefilter is not None and not prefilter.shadow
+
+    result = types.BudgetResult()
+    remaining = list(range(len(target_imgs)))
+
+    def skip(targets: List[int], phases: List[List[int]]) -> None:
+        result.partial = True
+        result.skipped.extend(
+            (t, mbuilder.matchers[i].name) for phase in phases for t in targets for i in phase
+        )
+
+    # 모든 단계의 제한 시간 - pool 의 worker 도 같은 token 을 확인함
+    budget_token = cancel.CancelToken(budget, parent=token)
+    executor = worker_pool(workers, budget_token) if workers > 1 else None
+    source = original_img
+    try:
+        if executor is None:
+            with timing.span("load.source"):
+                source = utils.load_img(original_img)
+
+        for n, phase in enumerate(phases):
+            if not remaining:
+                break
+            first = n == 0
+
+            # worker 수만큼 동시에 실행되는 것으로 보고 남은 시간 안에 끝날 target 수
+            time_left = deadline - time.time()
+            cost = sum(costs[i] for i in phase)
+            n_fit = int(time_left / cost) * workers if cost > 0 else len(remaining)
+            planned, over = remaining[:max(0, n_fit)], remaining[max(0, n_fit):]
+            if over:
+                # 첫 단계 (prefilter) 를 실행하지 않은 target 은 다음 단계에서도 실행하지 않음
+                skip(over, phases[n:] if first else [phase])
+            if first:
+                remaining = planned
+            if not planned:
+                continue
+
+            diagnostics.record(
+                "budget", phase=[mbuilder.matchers[i].name for i in phase],
+                planned=len(planned), skipped=len(over), time_left=round(time_left, 3),
+            )
+            sub = mbuilder if len(phases) == 1 else mbuilder.subset(phase, prefilter=first)
+            done = set()
+            found = set()
+            rejected = set()
+            n_rejected = prefilter.stats.rejected if filtering else 0
+            try:
+                for k, res in iter_matches(
+                    source,
+                    [target_imgs[t] for t in planned],
+                    sub,
+                    multi_process_count,
+                    [priors[t] for t in planned],
+                    budget_token,
+                    executor,
+                ):
+                    t = planned[k]
+                    for m in res:
+                        m.target = t
+                    result.matches.extend(res)
+                    done.add(t)
+                    if res:
+                        found.add(t)
+                    # 결과를 받기 전에 worker 의 prefilter 기록을 합치므로 target 별로 구분됨
+                    if first and filtering and prefilter.stats.rejected > n_rejected:
+                        n_rejected = prefilter.stats.rejected
+                        rejected.add(t)
+            except cancel.Cancelled:
+                if token is not None and token.is_cancelled():
+                    raise
+                skip([t for t in planned if t not in done], [phase])
+
+            remaining = [
+                t for t in remaining
+                if t not in rejected and not (early_stop and t in found)
+            ]
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    timing.incr("budget.partial" if result.partial else "budget.complete")
+    return result
+
+
+def find_matches_batch(
+    original_imgs: List[str],
+    target_imgs: List[str],
+    mbuilder: MatcherBuilder,
+    multi_process_count: int = 1,
+    priors: Optional[List[Optional[SpatialPrior]]] = None,
+    token: Optional[cancel.CancelToken] = None,
+) -> Iterator[Tuple[int, List[types.MatchResult] | Exception, Optional[float]]]:
+    """
+    원본 여러 개에 같은 target 목록을 매칭 - 끝나는 순서대로 (원본 index, 결과, 매칭 시간 (초))
+
+    target 이미지와 matcher 는 (worker 당) 한 번만 준비하고, 원본 단위로 병렬 처리함.
+    원본 하나가 실패하면 결과 대신 Exception 을 반환하고 나머지는 계속 진행
+
+    Args:
+        original_imgs: 원본 이미지 (경로)
+        target_imgs: 타겟 이미지 (경로)
+        mbuilder: Match Builder
+        multi_process_count
+        priors: target_imgs 와 같은 순서의 SpatialPrior
+        token: 취소되면 남은 원본은 매칭하지 않고 cancel.Cancelled 를 raise
+    """
+    if priors is None:
+        priors = [None] * len(target_imgs)
+
+    try:
+        if multi_process_count <= 1:
+            with timing.span("load.target"):
+                targets = utils.load_target_imgs(target_imgs)
+            for i, org in enumerate(original_imgs):
+                started = time.perf_counter()
+                try:
+                    res = match_source(mbuilder, org, targets, priors, token)
+                except Exception as e:
+                    logger.error("source %s: %s", org, e)
+                    res = e
+                yield i, res, time.perf_counter() - started
+        else:
+            yield from find_matches_batch_parallel(
+                original_imgs, target_imgs, mbuilder, multi_process_count, priors,
+                token,
+            )
+    finally:
+        mbuilder.flush_stats()
+
+
+def draw_marks(
+    original_img: np.ndarray, matches: List[types.MatchResult]
+) -> np.ndarray:
+    """매칭 영역에 빨간 사각형 + 유사도 표시 (복사본)"""
+    result_image = original_img.copy()
+
+    for x, y, w, h, similarity, method, *_ in matches:
+        # 사격형 그리기
+        cv2.rectangle(result_image, (x, y), (x + w, y + h), (0, 0, 255), 3)
+
+        # 유사도 text 추가
+        text = f"{similarity:.3f} - {method}"
+        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+
+        # text 배경 - 가독성 해결
+        cv2.rectangle(result_image,
+                      (x, y - text_size[1] - 10),
+                      (x + text_size[0] + 10, y),
+                      (0, 0, 255),
+                      -1)
+
+        # 유사도 text (흰색)
+        cv2.putText(result_image, text, (x+5, y-5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+    return result_image
+
+
+def erase_matches(
+    original_img: np.ndarray, matches: List[types.MatchResult], inpaint: bool = True
+) -> np.ndarray:
+    """매칭 영역 제거 - inpaint 또는 흰색으로 채움 (복사본)"""
+    mask = np.zeros(original_img.shape[:2], dtype=np.uint8)
+    for x, y, w, h, *_ in matches:
+        mask[y : y + h, x : x + w] = 255
+
+    if inpaint:
+        return cv2.inpaint(original_img, mask, 3, cv2.INPAINT_TELEA)
+
+    result_image = original_img.copy()
+    result_image[mask == 255] = (255, 255, 255)
+    return result_image
 
 
 def slice_image(
@@ -89,18 +322,7 @@ def slice_image(
         logger.error("No match")
         return None
 
-    # mask 생성
-    mask = np.zeros(original_img.shape[:2], dtype=np.uint8)
-    for x, y, w, h, *_ in matches:
-        mask[y : y + h, x : x + w] = 255
-
-    if inpaint:
-        result_image = cv2.inpaint(original_img, mask, 3, cv2.INPAINT_TELEA)
-    else:
-        result_image = original_img.copy()
-        result_image[mask == 255] = (255, 255, 255)
-
-    return result_image
+    return erase_matches(original_img, matches, inpaint)
 
 def mark_image(
     original_img: str,
@@ -130,44 +352,13 @@ def mark_image(
         logger.error("No match")
         return None
 
-    # 결과 이미지 복사본 생성
-    result_image = original_img.copy()
-
-    # 매칭된 영역들에 빨간색 사각형 그리기
-    logger.debug(f"\n\n\n✅ Found {len(matches)} matching")
-    for i, (x, y, w, h, similarity, method, *_) in enumerate(matches):
-        # 빨간색 사각형 그리기
-        cv2.rectangle(result_image, (x, y), (x + w, y + h), (0, 0, 255), 3)
-
-        # 유사도 text 추가
-        text = f"{similarity:.3f} - {method}"
-        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-
-        # text 배경 - 가독성이 너무 떨어짐
-        cv2.rectangle(
-            result_image,
-            (x, y - text_size[1] - 10),
-            (x + text_size[0] + 10, y),
-            (0, 0, 255),
-            -1,
-        )
-
-        # 유사도 text (흰색)
-        cv2.putText(
-            result_image,
-            text,
-            (x + 5, y - 5),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.6,
-            (255, 255, 255),
-            2,
-        )
-
+    logger.debug("Found %d matching", len(matches))
+    for i, (x, y, w, h, similarity, *_) in enumerate(matches):
         logger.debug(
-            f"  영역 {i + 1}: ({x}, {y}, {w}, {h}) 유사도: {similarity:.4f}"
+            "  영역 %d: (%d, %d, %d, %d) 유사도: %.4f", i + 1, x, y, w, h, similarity
         )
 
-    return result_image
+    return draw_marks(original_img, matches)
 
 def mark_and_slice_image(
     original_img: str,
@@ -175,9 +366,12 @@ def mark_and_slice_image(
     mbuilder: MatcherBuilder = None,
     inpaint: bool = True,
     multi_process_count: int = 1,
+    priors: Optional[List[Optional[SpatialPrior]]] = None,
 ):
     """mark + slice"""
-    matches = find_matches(original_img, target_imgs, mbuilder, multi_process_count)
+    matches = find_matches(
+        original_img, target_imgs, mbuilder, multi_process_count, priors
+    )
 
     original_img = utils.load_img(original_img)
 
@@ -185,39 +379,8 @@ def mark_and_slice_image(
         logger.error("No match")
         return None, None
 
-    # mark - 복사본 생성
-    mark_result_image = original_img.copy()
-
-    # mark - 매칭 영역에 빨간 사각형 그리기
-    logger.debug(f"\n\n✅ Found {len(matches)} matching")
-    for i, (x, y, w, h, similarity, method, *_) in enumerate(matches):
-        # 사격형 그리기
-        cv2.rectangle(mark_result_image, (x, y), (x + w, y + h), (0, 0, 255), 3)
-
-        # 유사도 text 추가
-        text = f"{similarity:.3f} - {method}"
-        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-
-        # text 배경 - 가독성 해결
-        cv2.rectangle(mark_result_image,
-                      (x, y - text_size[1] - 10),
-                      (x + text_size[0] + 10, y),
-                      (0, 0, 255),
-                      -1)
-
-        # 유사도 text (흰색)
-        cv2.putText(mark_result_image, text, (x+5, y-5),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-    # slice - mask 생성
-    mask = np.zeros(original_img.shape[:2], dtype=np.uint8)
-    for x, y, w, h, *_ in matches:
-        mask[y : y + h, x : x + w] = 255
-
-    if inpaint:
-        slice_result_image = cv2.inpaint(original_img, mask, 3, cv2.INPAINT_TELEA)
-    else:
-        slice_result_image = original_img.copy()
-        slice_result_image[mask == 255] = (255, 255, 255)
+    logger.debug("Found %d matching", len(matches))
+    mark_result_image = draw_marks(original_img, matches)
+    slice_result_image = erase_matches(original_img, matches, inpaint)
 
-    return slice_result_image, mark_result_image
\ No newline at end of file
+    return slice_result_image, mark_result_image
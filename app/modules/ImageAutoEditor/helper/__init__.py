@@ -1,4 +1,8 @@
 from .matcher_builder import MatcherBuilder
+from .prefilter import Prefilter, PrefilterStats
+from .spatial_prior import PriorStats, SpatialPrior
 
 
-__all__ = ["MatcherBuilder"]
+__all__ = [
+    "MatcherBuilder", "Prefilter", "PrefilterStats", "PriorStats", "SpatialPrior"
+]
@@ -0,0 +1,143 @@
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.modules.ImageAutoEditor.common import cancel, diagnostics, timing, utils
+from app.modules.ImageAutoEditor.common.types import MatchResult
+from app.modules.ImageAutoEditor.matchers import BaseMatcher
+
+logger = logging.getLogger(__name__)
+
+Region = Tuple[int, int, int, int]  # x0, y0, x1, y1
+
+
+def merge_regions(regions: List[Region]) -> List[Region]:
+    """겹치는 영역을 합침"""
+    regions = list(regions)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                a, b = regions[i], regions[j]
+                if utils.is_overlap(
+                    (a[0], a[1], a[2] - a[0], a[3] - a[1]),
+                    (b[0], b[1], b[2] - b[0], b[3] - b[1]),
+                ):
+                    regions[i] = (
+                        min(a[0], b[0]), min(a[1], b[1]),
+                        max(a[2], b[2]), max(a[3], b[3]),
+                    )
+                    del regions[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    return regions
+
+
+def _regions(
+    candidates: Sequence[MatchResult],
+    targ_shape: tuple,
+    org_shape: tuple,
+    margin: float,
+) -> List[Region]:
+    """후보 영역에 여백을 더하고 겹치는 영역은 합침"""
+    th, tw = targ_shape[:2]
+    oh, ow = org_shape[:2]
+    pad = int(max(th, tw) * margin)
+
+    regions: List[Region] = []
+    for c in candidates:
+        # 다음 matcher 가 target 을 찾을 수 있도록 최소 target 크기 이상
+        w, h = max(c.w, tw), max(c.h, th)
+        regions.append(
+            (
+                max(0, c.x - pad),
+                max(0, c.y - pad),
+                min(ow, c.x + w + pad),
+                min(oh, c.y + h + pad),
+            )
+        )
+
+    return merge_regions(regions)
+
+
+def match_in_regions(
+    matcher: BaseMatcher,
+    org: np.ndarray,
+    targ: np.ndarray,
+    regions: Sequence[Region],
+) -> List[MatchResult]:
+    """원본의 일부 영역에서만 매칭하고 좌표를 원본 기준으로 되돌림"""
+    matches: List[MatchResult] = []
+    for x0, y0, x1, y1 in regions:
+        cancel.check()
+        for m in matcher.match(org[y0:y1, x0:x1], targ):
+            m.x += x0
+            m.y += y0
+            matches.append(m)
+    return matches
+
+
+def cascade_match(
+    matchers: Sequence[BaseMatcher],
+    org: np.ndarray,
+    targ: np.ndarray,
+    regions: Optional[Sequence[Region]] = None,
+) -> List[MatchResult]:
+    """
+    단계별 matcher 실행
+
+    각 matcher 의 band 로 결과를 확정/제외/보류로 나누고, 보류된 후보의 영역만
+    다음 (더 비싼) matcher 로 다시 확인함. band 가 없는 matcher 의 결과는 모두 확정.
+    마지막 단계에서 보류된 후보는 확인할 matcher 가 없으므로 제외함
+
+    Args:
+        regions: 첫 단계의 검색 영역 (None 이면 원본 전체)
+    """
+    accepted: List[MatchResult] = []
+    searched_full = regions is None
+
+    for matcher in matchers:
+        cancel.check()
+        with timing.span(f"match.{matcher.name}"):
+            if regions is None:
+                candidates = matcher.match(org, targ)
+            else:
+                # 이미 확정된 영역과 겹치는 결과는 제외
+                candidates = [
+                    c
+                    for c in match_in_regions(matcher, org, targ, regions)
+                    if not any(utils.is_overlap(c, a) for a in accepted)
+                ]
+
+        band = matcher.band
+        if band is None:
+            accepted.extend(candidates)
+            break
+
+        ambiguous = []
+        for c in candidates:
+            if c.similarity >= band.accept:
+                accepted.append(c)
+            elif c.similarity >= band.reject:
+                ambiguous.append(c)
+
+        diagnostics.record(
+            "cascade",
+            matcher=matcher.name,
+            candidates=len(candidates),
+            ambiguous=len(ambiguous),
+        )
+
+        if ambiguous:
+            regions = _regions(ambiguous, targ.shape, org.shape, band.margin)
+        elif not candidates and band.full_on_empty and searched_full:
+            continue
+        else:
+            break
+
+    return accepted
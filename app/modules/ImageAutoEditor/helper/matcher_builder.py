@@ -1,15 +1,32 @@
 import copy
+import dataclasses
+import hashlib
+import json
 import logging
-from typing import List
+import time
+from typing import List, Optional
 
 import numpy as np
 
-from app.modules.ImageAutoEditor.common.types import TemplateMethod, HashMethod
+from app.modules.ImageAutoEditor.helper import spatial_prior
+from app.modules.ImageAutoEditor.helper.cascade import (
+    Region, cascade_match, match_in_regions
+)
+from app.modules.ImageAutoEditor.helper.matcher_stats import MatcherStats
+from app.modules.ImageAutoEditor.helper.prefilter import Prefilter, PrefilterMethod
+from app.modules.ImageAutoEditor.helper.spatial_prior import PriorStats, SpatialPrior
+from app.modules.ImageAutoEditor.common import cancel, timing, utils
+from app.modules.ImageAutoEditor.common.target_index import image_digest
+from app.modules.ImageAutoEditor.common.types import (
+    CascadeBand, MatchResult, TemplateMethod, TemplateMode, HashMethod
+)
 from app.modules.ImageAutoEditor.matchers import (
     BaseMatcher,
     TemplateMatcher,
     HashMatcher,
     SiftMatcher,
+    SiftIndexMatcher,
+    OrbMatcher,
 )
 
 logger = logging.getLogger(__name__)
@@ -17,13 +34,32 @@ logger = logging.getLogger(__name__)
 
 class MatcherBuilder:
     matchers: List[BaseMatcher]
+    prefilter: Optional[Prefilter]
+    matcher_stats: Optional[MatcherStats]
 
     def __init__(self):
         self.matchers = []
+        self.prefilter = None
+        self.matcher_stats = None
+        self.reorder = False
+        self.prior_config = None
+        self.prior_stats = PriorStats()
         self.__config = {}
+        self.__matcher_keys = None
 
-    def set_tm_matcher(self, threshold: float, method: TemplateMethod):
-        matcher = TemplateMatcher(threshold, method)
+    def set_tm_matcher(
+        self,
+        threshold: float,
+        method: TemplateMethod,
+        max_instances: Optional[int] = None,
+        mode: TemplateMode = "bgr",
+    ):
+        """
+        Args:
+            max_instances: 원본에 최대 k 번 있는 경우 상위 k 개만 찾음
+            mode: bgr | gray | edge (색이 바뀐 워터마크는 edge)
+        """
+        matcher = TemplateMatcher(threshold, method, max_instances, mode)
         self.matchers.append(matcher)
         return self
 
@@ -38,24 +74,300 @@ class MatcherBuilder:
         self.matchers.append(matcher)
         return self
 
-    def set_sift_matcher(self, threshold: float, min_match_count: int = 10):
-        matcher = SiftMatcher(threshold, min_match_count)
+    def set_sift_matcher(
+        self,
+        threshold: float,
+        min_match_count: int = 10,
+        index_source: bool = True,
+        max_instances: int = 1,
+    ):
+        """
+        Args:
+            max_instances: 같은 target 이 원본에 여러 번 있는 경우 찾을 최대 개수
+        """
+        matcher = SiftMatcher(
+            threshold,
+            min_match_count,
+            index_source=index_source,
+            max_instances=max_instances,
+        )
+        self.matchers.append(matcher)
+        return self
+
+    def set_sift_index_matcher(
+        self,
+        threshold: float,
+        index_path: str,
+        min_match_count: int = 10,
+        max_instances: int = 1,
+    ):
+        """
+        전체 target 의 descriptor index (TargetIndex) 를 사용하는 SIFT
+        """
+        matcher = SiftIndexMatcher(
+            threshold, min_match_count, index_path, max_instances
+        )
+        self.matchers.append(matcher)
+        return self
+
+    def set_orb_matcher(
+        self,
+        threshold: float,
+        min_match_count: int = 10,
+        detector: str = "ORB",
+        n_features: int = 50000,
+        max_instances: int = 1,
+    ):
+        """
+        binary descriptor (ORB, AKAZE) 특징점 매칭
+        """
+        matcher = OrbMatcher(
+            threshold, min_match_count, detector, n_features, max_instances
+        )
         self.matchers.append(matcher)
         return self
 
+    def set_prefilter(
+        self,
+        min_score: float,
+        method: PrefilterMethod = "hist",
+        shadow: bool = False,
+        thumb_scale: float = 0.25,
+    ):
+        """
+        matcher 실행 전에 원본에 없을 것 같은 target 을 제외 (Prefilter 참고)
+        """
+        self.prefilter = Prefilter(min_score, method, shadow, thumb_scale)
+        return self
+
+    def set_cascade_band(
+        self,
+        accept: float,
+        reject: float,
+        full_on_empty: bool = True,
+        margin: float = 0.5,
+    ):
+        """
+        마지막으로 추가한 matcher 의 cascade 판정 구간 (CascadeBand 참고)
+
+        band 가 하나라도 있으면 match 는 cascade 로 동작함 (early_stop 무시).
+        similarity 가 accept 이상이면 확정, reject 미만이면 제외하고
+        그 사이는 다음 matcher 가 해당 영역에서만 다시 확인함
+
+        ex) set_tm_matcher(0.7, ...).set_cascade_band(0.95, 0.8).set_sift_matcher(...)
+        """
+        if not self.matchers:
+            raise ValueError("No matcher to set cascade band")
+        self.matchers[-1].band = CascadeBand(accept, reject, full_on_empty, margin)
+        return self
+
+    def set_adaptive_order(self, stats_path: str, reorder: bool = True):
+        """
+        target 별로 matcher 의 적중률/소요 시간을 기록하고 (MatcherStats),
+        처음 적중할 때까지의 기대 시간이 작은 순서로 matcher 를 실행함
+
+        early_stop 에서만 의미가 있고 cascade 에서는 순서를 바꾸지 않음
+
+        Args:
+            stats_path: 기록 파일 (json)
+            reorder: False 면 기록만 하고 설정한 순서대로 실행
+        """
+        self.matcher_stats = MatcherStats(stats_path)
+        self.reorder = reorder
+        return self
+
+    def set_spatial_prior(
+        self, coverage: float = 0.95, margin: float = 0.5, min_count: int = 3
+    ):
+        """
+        match 에 target 의 SpatialPrior 가 주어지면 확률이 높은 영역을 먼저 검색하고,
+        찾지 못한 경우에만 원본 전체를 검색함 (prior_stats 에 fallback 수 기록).
+        여러 개를 찾는 matcher 가 있으면 영역에서 찾은 경우에도 나머지 영역을 검색하고,
+        하나만 찾는 경우 영역에서만 찾은 결과는 roi_only 로 표시함 (prior 학습에서 제외)
+
+        Args:
+            coverage: 과거 매칭 중 검색 영역에 포함할 비율
+            margin: 영역 여백 (target 크기 대비 비율)
+            min_count: prior 를 사용할 최소 매칭 기록 수
+        """
+        self.prior_config = {
+            "coverage": coverage, "margin": margin, "min_count": min_count
+        }
+        return self
+
+    def _matcher_keys(self) -> List[str]:
+        """matcher 식별값 - 종류 + 파라미터"""
+        if self.__matcher_keys is None or len(self.__matcher_keys) != len(self.matchers):
+            keys = []
+            for model, params in self.serialize()[0]["items"]:
+                params = {k: v for k, v in params.items() if k != "band"}
+                digest = hashlib.sha1(
+                    json.dumps(params, sort_keys=True).encode()
+                ).hexdigest()[:10]
+                keys.append(f"{model}:{digest}")
+            self.__matcher_keys = keys
+        return self.__matcher_keys
+
+    @property
+    def is_cascade(self) -> bool:
+        return any(m.band is not None for m in self.matchers)
+
+    def matcher_costs(self) -> List[float]:
+        """matcher 별 target 하나 당 예상 시간 (초) - MatcherStats 평균, 기록이 없으면 cost_hint"""
+        self.reload_stats()
+
+        costs = []
+        for matcher, key in zip(self.matchers, self._matcher_keys()):
+            cost = None
+            if self.matcher_stats is not None:
+                cost = self.matcher_stats.matcher_cost(key)
+            costs.append(cost if cost is not None else matcher.cost_hint)
+        return costs
+
+    def reload_stats(self) -> None:
+        """
+        matcher 기록 파일이 바뀌었으면 다시 읽음
+        target 마다 확인하지 않도록 매칭 시작 전에 한 번 호출 (worker 는 builder 를 만들 때 읽음)
+        """
+        if self.matcher_stats is not None:
+            self.matcher_stats.reload()
+
+    def subset(self, indices: List[int], prefilter: bool = True) -> "MatcherBuilder":
+        """
+        일부 matcher 만 가진 builder (시간 제한 매칭의 단계)
+        prefilter, matcher_stats 등은 공유하므로 기록은 원래 builder 에 남음
+
+        Args:
+            prefilter: False 면 prefilter 없이 실행 (이전 단계에서 이미 확인한 target)
+        """
+        sub = copy.copy(self)
+        sub.matchers = [self.matchers[i] for i in indices]
+        if not prefilter:
+            sub.prefilter = None
+        sub.__matcher_keys = None
+        return sub
+
     def set_config(self, k: str, v):
         self.__config[k] = v
         return self
 
+    def get_config(self, k: str, default=None):
+        return self.__config.get(k, default)
+
     def build(self):
         return self.matchers
 
-    def match(self, org: np.ndarray, targ: np.ndarray, **kwargs):
+    def match(
+        self,
+        org: np.ndarray,
+        targ: np.ndarray,
+        prior: Optional[SpatialPrior] = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            org: 원본 이미지
+            targ: target 이미지
+            prior: target 의 위치 prior (set_spatial_prior 를 설정한 경우에만 사용)
+        """
         allconfig = {**self.__config, **kwargs}
+        # matcher 기록의 target 식별값 - 영역 검색 후 전체 검색을 해도 한 번만 계산
+        target_key = None
+        if self.matcher_stats is not None and not self.is_cascade:
+            target_key = image_digest(targ)
+
+        if self.prefilter is not None:
+            with timing.span("prefilter"):
+                passed, score = self.prefilter.check(org, targ)
+            if not passed:
+                return []
 
         matches = []
+        searched = False
+        if self.prior_config is not None and spatial_prior.usable(
+            prior, self.prior_config["min_count"]
+        ):
+            regions = prior.regions(
+                org.shape, targ.shape,
+                self.prior_config["coverage"], self.prior_config["margin"],
+            )
+            if regions:
+                self.prior_stats.tried += 1
+                self.prior_stats.roi_area += spatial_prior.region_area(
+                    regions, org.shape
+                )
+                matches = self._match_chain(org, targ, regions, allconfig, target_key)
+                if matches and self._multi_instance():
+                    # 영역 밖에도 있을 수 있으므로 나머지 영역도 검색 (prior 학습에도 사용)
+                    self.prior_stats.roi_hits += 1
+                    self.prior_stats.rest_searches += 1
+                    rest = spatial_prior.rest_regions(regions, org.shape, targ.shape)
+                    # 영역끼리 겹치는 부분에서 같은 위치를 다시 찾을 수 있음
+                    for m in self._match_chain(org, targ, rest, allconfig, target_key):
+                        if not any(utils.is_overlap(m, found) for found in matches):
+                            matches.append(m)
+                    searched = True
+                elif matches:
+                    # 하나만 찾는 경우 - 영역만 검색한 결과는 prior 학습에서 제외
+                    self.prior_stats.roi_hits += 1
+                    for m in matches:
+                        m.roi_only = True
+                    searched = True
+                else:
+                    self.prior_stats.fallbacks += 1
+
+        if not searched:
+            matches = self._match_chain(org, targ, None, allconfig, target_key)
+
+        if self.prefilter is not None and matches:
+            self.prefilter.record_match(score)
+
+        return matches
+
+    def _multi_instance(self) -> bool:
+        """같은 target 을 여러 개 찾는 matcher 가 있는지 (template 은 max_instances 가 없으면 전부)"""
         for matcher in self.matchers:
-            res = matcher.match(org, targ)
+            k = getattr(matcher, "max_instances", 1)
+            if k is None or k > 1:
+                return True
+        return False
+
+    def _match_chain(
+        self,
+        org: np.ndarray,
+        targ: np.ndarray,
+        regions: Optional[List[Region]],
+        allconfig: dict,
+        target_key: Optional[str] = None,
+    ) -> List[MatchResult]:
+        """
+        matcher 실행 (regions 가 있으면 해당 영역에서만)
+
+        Args:
+            target_key: matcher 기록의 target 식별값 (matcher_stats 가 있을 때)
+        """
+        if self.is_cascade:
+            return cascade_match(self.matchers, org, targ, regions)
+
+        order = range(len(self.matchers))
+        if self.matcher_stats is not None and self.reorder:
+            order = self.matcher_stats.order(target_key, self._matcher_keys())
+
+        matches = []
+        for i in order:
+            cancel.check()
+            matcher = self.matchers[i]
+            start = time.perf_counter()
+            if regions is None:
+                res = matcher.match(org, targ)
+            else:
+                res = match_in_regions(matcher, org, targ, regions)
+            elapsed = time.perf_counter() - start
+            timing.record(f"match.{matcher.name}", elapsed)
+            if self.matcher_stats is not None:
+                self.matcher_stats.record(
+                    target_key, self._matcher_keys()[i], len(res) > 0, elapsed
+                )
 
             matches.extend(res)
 
@@ -65,12 +377,52 @@ class MatcherBuilder:
 
         return matches
 
+    def pop_stats(self) -> dict:
+        """
+        worker process 에서 쌓인 통계를 반환하고 초기화 (부모 process 에서 merge_stats)
+        """
+        return {
+            "prefilter": self.prefilter.pop_stats() if self.prefilter else None,
+            "matcher_stats": (
+                self.matcher_stats.pop_delta() if self.matcher_stats else None
+            ),
+            "prior": self.pop_prior_stats(),
+        }
+
+    def pop_prior_stats(self) -> PriorStats:
+        stats, self.prior_stats = self.prior_stats, PriorStats()
+        return stats
+
+    def merge_stats(self, stats: dict) -> None:
+        if self.prefilter is not None and stats.get("prefilter") is not None:
+            self.prefilter.stats.merge(stats["prefilter"])
+        if self.matcher_stats is not None and stats.get("matcher_stats"):
+            self.matcher_stats.merge_delta(stats["matcher_stats"])
+        if stats.get("prior") is not None:
+            self.prior_stats.merge(stats["prior"])
+
+    def flush_stats(self) -> None:
+        """matcher 기록을 파일에 저장"""
+        if self.matcher_stats is not None:
+            try:
+                self.matcher_stats.flush()
+            except OSError as e:
+                logger.error("failed to save matcher stats: %s", e)
+
     def serialize(self):
         items = []
         for m in self.matchers:
             if isinstance(m, TemplateMatcher):
                 items.append(
-                    ("tm", {"threshold": m.threshold, "method": m.method})
+                    (
+                        "tm",
+                        {
+                            "threshold": m.threshold,
+                            "method": m.method,
+                            "max_instances": m.max_instances,
+                            "mode": m.mode,
+                        },
+                    )
                 )
             elif isinstance(m, HashMatcher):
                 items.append(
@@ -84,6 +436,31 @@ class MatcherBuilder:
                         },
                     )
                 )
+            elif isinstance(m, OrbMatcher):
+                items.append(
+                    (
+                        "orb",
+                        {
+                            "threshold": m.threshold,
+                            "min_match_count": m.min_match_count,
+                            "detector": m.detector,
+                            "n_features": m.n_features,
+                            "max_instances": m.max_instances,
+                        },
+                    )
+                )
+            elif isinstance(m, SiftIndexMatcher):
+                items.append(
+                    (
+                        "sift_index",
+                        {
+                            "threshold": m.threshold,
+                            "min_match_count": m.min_match_count,
+                            "index_path": m.index_path,
+                            "max_instances": m.max_instances,
+                        },
+                    )
+                )
             elif isinstance(m, SiftMatcher):
                 items.append(
                     (
@@ -91,11 +468,26 @@ class MatcherBuilder:
                         {
                             "threshold": m.threshold,
                             "min_match_count": m.min_match_count,
+                            "index_source": m.index_source,
+                            "max_instances": m.max_instances,
                         },
                     )
                 )
 
+        for m, (_, params) in zip(self.matchers, items):
+            if m.band is not None:
+                params["band"] = dataclasses.asdict(m.band)
+
         specs = {"version": 1, "items": items}
+        if self.prefilter is not None:
+            specs["prefilter"] = self.prefilter.spec()
+        if self.prior_config is not None:
+            specs["spatial_prior"] = dict(self.prior_config)
+        if self.matcher_stats is not None:
+            specs["adaptive"] = {
+                "stats_path": str(self.matcher_stats.path),
+                "reorder": self.reorder,
+            }
         return specs, copy.deepcopy(self.__config)
 
     def deserialize(self, specs, config):
@@ -108,11 +500,39 @@ class MatcherBuilder:
             raise ValueError("Invalid specs")
 
         self.matchers = []
+        self.prefilter = None
+        self.matcher_stats = None
+        self.reorder = False
+        self.prior_config = None
         self.__config = copy.deepcopy(config)
+        self.__matcher_keys = None
+
+        prior_config = specs.get("spatial_prior")
+        if prior_config is not None:
+            self.set_spatial_prior(**prior_config)
+
+        adaptive = specs.get("adaptive")
+        if adaptive is not None:
+            self.set_adaptive_order(adaptive["stats_path"], adaptive["reorder"])
+
+        prefilter = specs.get("prefilter")
+        if prefilter is not None:
+            self.set_prefilter(
+                prefilter["min_score"],
+                prefilter["method"],
+                prefilter.get("shadow", False),
+                prefilter.get("thumb_scale", 0.25),
+            )
 
         for model, params in items:
+            n_matchers = len(self.matchers)
             if model == "tm":
-                self.set_tm_matcher(params["threshold"], params["method"])
+                self.set_tm_matcher(
+                    params["threshold"],
+                    params["method"],
+                    params.get("max_instances"),
+                    params.get("mode", "bgr"),
+                )
             elif model == "hash":
                 self.set_hash_matcher(
                     params["threshold"],
@@ -122,8 +542,30 @@ class MatcherBuilder:
                 )
             elif model == "sift":
                 self.set_sift_matcher(
-                    params["threshold"], params["min_match_count"]
+                    params["threshold"],
+                    params["min_match_count"],
+                    params.get("index_source", True),
+                    params.get("max_instances", 1),
+                )
+            elif model == "sift_index":
+                self.set_sift_index_matcher(
+                    params["threshold"],
+                    params["index_path"],
+                    params["min_match_count"],
+                    params.get("max_instances", 1),
                 )
+            elif model == "orb":
+                self.set_orb_matcher(
+                    params["threshold"],
+                    params["min_match_count"],
+                    params["detector"],
+                    params["n_features"],
+                    params.get("max_instances", 1),
+                )
+
+            band = params.get("band")
+            if band is not None and len(self.matchers) > n_matchers:
+                self.set_cascade_band(**band)
 
         return self
 
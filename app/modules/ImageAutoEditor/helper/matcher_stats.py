@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+STATS_VERSION = 1
+# 시도 횟수가 이 값을 넘으면 기록을 절반으로 줄여서 최근 결과의 비중을 높임
+MAX_ATTEMPTS = 500
+
+# target key -> matcher key -> [attempts, hits, seconds]
+Records = Dict[str, Dict[str, List[float]]]
+
+
+def _merge(dst: Records, src: Records) -> None:
+    for tkey, matchers in src.items():
+        target = dst.setdefault(tkey, {})
+        for mkey, (attempts, hits, seconds) in matchers.items():
+            rec = target.setdefault(mkey, [0, 0, 0.0])
+            rec[0] += attempts
+            rec[1] += hits
+            rec[2] += seconds
+            if rec[0] > MAX_ATTEMPTS:
+                rec[0], rec[1], rec[2] = rec[0] / 2, rec[1] / 2, rec[2] / 2
+
+
+class MatcherStats:
+    """
+    (target, matcher) 별 적중률/소요 시간 기록과 matcher 순서 결정
+
+    early_stop 에서 처음 적중할 때까지의 기대 시간이 최소가 되도록
+    평균 시간 / 적중 확률 이 작은 matcher 부터 실행함.
+    적중 확률은 (hits + 1) / (attempts + 2) 로 기록이 적은 matcher 도 기회를 가짐
+
+    기록은 base (파일에서 읽은 값) + delta (아직 저장하지 않은 값) 로 나눠서
+    worker process 는 delta 만 부모에게 넘기고, 부모가 flush 로 파일에 합침
+    """
+
+    def __init__(self, path: Optional[str | Path] = None):
+        self.path = Path(path) if path else None
+        self._base: Records = {}
+        self._delta: Records = {}
+        self._mtime: Optional[int] = None
+
+        if self.path is not None:
+            self.reload()
+
+    # ---- 기록 ----
+    def record(self, target_key: str, matcher_key: str, hit: bool, seconds: float):
+        rec = self._delta.setdefault(target_key, {}).setdefault(
+            matcher_key, [0, 0, 0.0]
+        )
+        rec[0] += 1
+        rec[1] += int(hit)
+        rec[2] += seconds
+
+    def pop_delta(self) -> Records:
+        delta, self._delta = self._delta, {}
+        return delta
+
+    def merge_delta(self, delta: Records) -> None:
+        _merge(self._delta, delta)
+
+    # ---- 순서 ----
+    def _combined(self, target_key: str) -> Dict[str, List[float]]:
+        combined: Records = {}
+        for records in (self._base, self._delta):
+            if target_key in records:
+                _merge(combined, {target_key: records[target_key]})
+        return combined.get(target_key, {})
+
+    def order(self, target_key: str, matcher_keys: Sequence[str]) -> List[int]:
+        """
+        matcher_keys 의 실행 순서 (index)
+        한 번도 실행되지 않은 matcher 는 설정된 순서대로 먼저 실행함
+        """
+        records = self._combined(target_key)
+
+        def expected_cost(i: int):
+            rec = records.get(matcher_keys[i])
+            if rec is None or rec[0] == 0:
+                return (0, 0.0, i)
+            attempts, hits, seconds = rec
+            p_hit = (hits + 1) / (attempts + 2)
+            return (1, (seconds / attempts) / p_hit, i)
+
+        return sorted(range(len(matcher_keys)), key=expected_cost)
+
+    def matcher_cost(self, matcher_key: str) -> Optional[float]:
+        """모든 target 에 대한 matcher 의 평균 시간 (초, 기록이 없으면 None)"""
+        attempts = seconds = 0.0
+        for records in (self._base, self._delta):
+            for matchers in records.values():
+                rec = matchers.get(matcher_key)
+                if rec is not None:
+                    attempts += rec[0]
+                    seconds += rec[2]
+        return seconds / attempts if attempts else None
+
+    # ---- 저장 ----
+    def reload(self) -> None:
+        """파일이 바뀐 경우에만 다시 읽음"""
+        if self.path is None:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+
+        try:
+            data = json.loads(self.path.read_text())
+            if data.get("version") == STATS_VERSION:
+                self._base = data["targets"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("failed to load matcher stats: %s", e)
+        self._mtime = mtime
+
+    def flush(self) -> None:
+        """
+        delta 를 파일에 합쳐서 저장
+        다른 process 가 그 사이 저장한 값도 다시 읽어서 합침 (동시에 저장하면 일부 유실될 수 있음)
+        """
+        if self.path is None or not self._delta:
+            return
+
+        self._mtime = None
+        self.reload()
+        _merge(self._base, self.pop_delta())
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.parent / f".{uuid.uuid4().hex}.json"
+        tmp.write_text(json.dumps({"version": STATS_VERSION, "targets": self._base}))
+        os.replace(tmp, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def as_dict(self) -> Records:
+        combined: Records = {}
+        _merge(combined, self._base)
+        _merge(combined, self._delta)
+        return combined
@@ -0,0 +1,201 @@
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import List, Literal, Tuple
+
+import cv2
+import numpy as np
+
+from app.modules.ImageAutoEditor.common import source_cache
+
+logger = logging.getLogger(__name__)
+
+PrefilterMethod = Literal["hist", "thumb"]
+
+# HSV (H, S, V) bin 수
+HIST_BINS = (12, 4, 4)
+HIST_RANGES = [0, 180, 0, 256, 0, 256]
+
+# 매칭된 target 의 score 분포 (hist: 0 ~ 1, thumb: -1 ~ 1) - 0.01 단위 bucket
+SCORE_MIN = -1.0
+SCORE_STEP = 0.01
+SCORE_BUCKETS = 200
+
+
+def score_bucket(score: float) -> int:
+    i = math.floor((score - SCORE_MIN) / SCORE_STEP + 1e-9)
+    return min(SCORE_BUCKETS - 1, max(0, i))
+
+
+@dataclass
+class PrefilterStats:
+    checked: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    # prefilter 를 통과하고 실제로 매칭된 target 의 score 분포 (threshold 조정용)
+    # 누적해도 크기가 늘지 않도록 bucket 별 개수만 기록
+    matched_buckets: List[int] = field(default_factory=lambda: [0] * SCORE_BUCKETS)
+
+    @property
+    def matched(self) -> int:
+        return sum(self.matched_buckets)
+
+    def record_match(self, score: float) -> None:
+        self.matched_buckets[score_bucket(score)] += 1
+
+    def merge(self, other: "PrefilterStats") -> None:
+        self.checked += other.checked
+        self.rejected += other.rejected
+        self.seconds += other.seconds
+        for i, n in enumerate(other.matched_buckets):
+            self.matched_buckets[i] += n
+
+    def recall_at(self, min_score: float) -> float | None:
+        """
+        매칭된 target 중 min_score 이상인 비율 (SCORE_STEP 단위로 근사)
+        shadow 모드로 모은 값에서 threshold 별 재현율을 추정할 때 사용
+        (shadow 가 아니면 min_score 미만은 매칭 전에 제외되므로 항상 1)
+        """
+        matched = self.matched
+        if not matched:
+            return None
+        return sum(self.matched_buckets[score_bucket(min_score):]) / matched
+
+    def min_matched_score(self) -> float | None:
+        """매칭된 target 의 최소 score (bucket 하한)"""
+        for i, n in enumerate(self.matched_buckets):
+            if n:
+                return round(SCORE_MIN + i * SCORE_STEP, 2)
+        return None
+
+    def as_dict(self) -> dict:
+        return {
+            "checked": self.checked,
+            "rejected": self.rejected,
+            "rejection_rate": self.rejected / self.checked if self.checked else 0.0,
+            "seconds": round(self.seconds, 4),
+            "matched": self.matched,
+            "matched_min_score": self.min_matched_score(),
+        }
+
+
+class Prefilter:
+    """
+    matcher 를 실행하기 전에 원본에 없을 것 같은 target 을 싸게 제외
+
+    - hist: HSV color histogram containment. target 의 색 분포가 원본에 포함되는 비율
+    - thumb: 축소한 원본/target 의 template matching 최대 상관계수
+
+    원본 쪽 계산(histogram, 축소 이미지)은 source_cache 로 원본 당 한 번만 수행
+    """
+
+    def __init__(
+        self,
+        min_score: float,
+        method: PrefilterMethod = "hist",
+        shadow: bool = False,
+        thumb_scale: float = 0.25,
+    ):
+        """
+        Args:
+            min_score: 이 값보다 score 가 낮으면 제외 (낮을수록 재현율 높음)
+            method: hist | thumb
+            shadow: score 와 통계만 기록하고 제외하지 않음 (threshold 조정용).
+                rejected 에는 제외됐을 target 수가 기록됨
+            thumb_scale: thumb 의 축소 비율
+        """
+        if method not in ("hist", "thumb"):
+            raise ValueError(f"Unsupported prefilter method: {method}")
+
+        self.min_score = min_score
+        self.method = method
+        self.shadow = shadow
+        self.thumb_scale = thumb_scale
+        self.stats = PrefilterStats()
+
+    # ---- score ----
+    @staticmethod
+    def _hist(img: np.ndarray) -> np.ndarray:
+        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+        return cv2.calcHist([hsv], [0, 1, 2], None, HIST_BINS, HIST_RANGES)
+
+    def _hist_score(self, org: np.ndarray, targ: np.ndarray) -> float:
+        org_hist = source_cache.get_cached(
+            org, ("prefilter_hist", HIST_BINS), lambda: self._hist(org)
+        )
+        targ_hist = self._hist(targ)
+        total = float(targ_hist.sum())
+        if total == 0:
+            return 1.0
+        return float(np.minimum(org_hist, targ_hist).sum()) / total
+
+    def _thumb_score(self, org: np.ndarray, targ: np.ndarray) -> float:
+        s = self.thumb_scale
+
+        def build():
+            gray = source_cache.get_cached(
+                org, "gray", lambda: cv2.cvtColor(org, cv2.COLOR_BGR2GRAY)
+            )
+            return cv2.resize(gray, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+
+        org_small = source_cache.get_cached(org, ("prefilter_thumb", s), build)
+
+        th, tw = targ.shape[:2]
+        size = (int(tw * s), int(th * s))
+        # 너무 작게 줄어드는 target 은 판단하지 않음
+        if min(size) < 4 or size[0] > org_small.shape[1] or size[1] > org_small.shape[0]:
+            return 1.0
+
+        targ_small = cv2.resize(
+            cv2.cvtColor(targ, cv2.COLOR_BGR2GRAY), size, interpolation=cv2.INTER_AREA
+        )
+        _, max_val, _, _ = cv2.minMaxLoc(
+            cv2.matchTemplate(org_small, targ_small, cv2.TM_CCOEFF_NORMED)
+        )
+        # 단색 target 은 상관계수가 정의되지 않음
+        return 1.0 if not math.isfinite(max_val) else float(max_val)
+
+    def score(self, org: np.ndarray, targ: np.ndarray) -> float:
+        if self.method == "thumb":
+            return self._thumb_score(org, targ)
+        return self._hist_score(org, targ)
+
+    # ---- check ----
+    def check(self, org: np.ndarray, targ: np.ndarray) -> Tuple[bool, float]:
+        """
+        Returns:
+            (matcher 를 실행할지 여부, score)
+        """
+        start = time.perf_counter()
+        try:
+            score = self.score(org, targ)
+        except Exception as e:
+            logger.error("Prefilter Error: %s", e)
+            return True, 1.0
+        finally:
+            self.stats.seconds += time.perf_counter() - start
+
+        self.stats.checked += 1
+        passed = score >= self.min_score
+        if not passed:
+            self.stats.rejected += 1
+            logger.debug("prefilter rejected (%s score: %.3f)", self.method, score)
+
+        return passed or self.shadow, score
+
+    def record_match(self, score: float) -> None:
+        self.stats.record_match(score)
+
+    def pop_stats(self) -> PrefilterStats:
+        """지금까지의 통계를 반환하고 초기화 (worker -> 부모 process 로 넘길 때)"""
+        stats, self.stats = self.stats, PrefilterStats()
+        return stats
+
+    def spec(self) -> dict:
+        return {
+            "min_score": self.min_score,
+            "method": self.method,
+            "shadow": self.shadow,
+            "thumb_scale": self.thumb_scale,
+        }
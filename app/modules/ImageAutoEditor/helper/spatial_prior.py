@@ -0,0 +1,181 @@
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.modules.ImageAutoEditor.helper.cascade import Region, merge_regions
+
+# (세로, 가로) 격자 - 상세페이지는 세로로 길어서 세로를 더 잘게 나눔
+GRID_SHAPE = (32, 8)
+
+
+def grid_cell(
+    x: float, y: float, w: float, h: float, width: float, height: float,
+    grid_shape: Tuple[int, int] = GRID_SHAPE,
+) -> Optional[Tuple[int, int]]:
+    """매칭 중심 좌표의 격자 (row, col) - 원본 크기가 잘못된 경우 None"""
+    if width <= 0 or height <= 0:
+        return None
+    gh, gw = grid_shape
+    cx = min(max((x + w / 2) / width, 0.0), 0.999999)
+    cy = min(max((y + h / 2) / height, 0.0), 0.999999)
+    return int(cy * gh), int(cx * gw)
+
+
+@dataclass
+class SpatialPrior:
+    """
+    target 이 과거에 매칭된 위치의 histogram (원본 크기로 정규화한 중심 좌표의 격자)
+
+    같은 태그의 로고/워터마크는 비슷한 위치(상단, 하단 모서리 등)에 있으므로
+    확률이 높은 영역을 먼저 검색하고, 거기서 찾지 못하면 원본 전체를 검색함.
+    여러 개를 찾는 matcher 는 영역에서 찾은 경우에도 나머지 영역을 검색함
+    """
+
+    grid: np.ndarray  # GRID_SHAPE, 격자별 매칭 수
+    count: int  # 전체 매칭 수
+
+    @classmethod
+    def from_boxes(
+        cls,
+        boxes: Iterable[Tuple[float, float, float, float, float, float]],
+        grid_shape: Tuple[int, int] = GRID_SHAPE,
+    ) -> "SpatialPrior":
+        """
+        Args:
+            boxes: (x, y, w, h, 원본 width, 원본 height)
+        """
+        grid = np.zeros(grid_shape, np.float32)
+        count = 0
+        for box in boxes:
+            cell = grid_cell(*box, grid_shape=grid_shape)
+            if cell is None:
+                continue
+            grid[cell] += 1
+            count += 1
+        return cls(grid, count)
+
+    def regions(
+        self,
+        org_shape: tuple,
+        targ_shape: tuple,
+        coverage: float = 0.95,
+        margin: float = 0.5,
+    ) -> List[Region]:
+        """
+        매칭 수가 많은 격자부터 coverage 비율이 될 때까지 선택한 검색 영역
+
+        Args:
+            org_shape: 원본 shape
+            targ_shape: target shape
+            coverage: 선택할 매칭 수 비율
+            margin: 여백 (target 크기 대비 비율)
+        """
+        if self.count == 0:
+            return []
+
+        oh, ow = org_shape[:2]
+        th, tw = targ_shape[:2]
+        gh, gw = self.grid.shape
+        cell_h, cell_w = oh / gh, ow / gw
+
+        flat = self.grid.ravel()
+        order = np.argsort(flat)[::-1]
+        cumulative = np.cumsum(flat[order]) / self.count
+        n_cells = int(np.searchsorted(cumulative, coverage) + 1)
+
+        # 중심이 격자 안에 있는 target 전체 + 여백
+        pad_x = int(tw / 2 + tw * margin)
+        pad_y = int(th / 2 + th * margin)
+        regions = []
+        for idx in order[:n_cells]:
+            if flat[idx] == 0:
+                break
+            r, c = divmod(int(idx), gw)
+            regions.append(
+                (
+                    max(0, int(c * cell_w) - pad_x),
+                    max(0, int(r * cell_h) - pad_y),
+                    min(ow, int((c + 1) * cell_w) + pad_x),
+                    min(oh, int((r + 1) * cell_h) + pad_y),
+                )
+            )
+        return merge_regions(regions)
+
+
+@dataclass
+class PriorStats:
+    tried: int = 0  # prior 로 영역을 먼저 검색한 target 수
+    roi_hits: int = 0  # 영역에서 찾은 수
+    fallbacks: int = 0  # 영역에서 찾지 못해 전체를 검색한 수
+    rest_searches: int = 0  # 영역에서 찾았지만 여러 개를 찾는 matcher 라 나머지도 검색한 수
+    roi_area: float = 0.0  # 검색 영역 / 원본 넓이 합 (평균 계산용)
+
+    def merge(self, other: "PriorStats") -> None:
+        self.tried += other.tried
+        self.roi_hits += other.roi_hits
+        self.fallbacks += other.fallbacks
+        self.rest_searches += other.rest_searches
+        self.roi_area += other.roi_area
+
+    def as_dict(self) -> dict:
+        return {
+            "tried": self.tried,
+            "roi_hits": self.roi_hits,
+            "fallbacks": self.fallbacks,
+            "fallback_rate": self.fallbacks / self.tried if self.tried else 0.0,
+            "rest_searches": self.rest_searches,
+            "mean_roi_area": self.roi_area / self.tried if self.tried else None,
+        }
+
+
+def rest_regions(
+    regions: List[Region], org_shape: tuple, targ_shape: tuple
+) -> List[Region]:
+    """
+    regions 를 제외한 나머지 영역 (경계에 걸친 target 도 찾을 수 있도록 target 크기만큼 겹침)
+
+    merge_regions 는 겹치는 영역의 외곽 사각형으로 합쳐서 원본 전체가 되므로 사용하지 않음
+    """
+    oh, ow = org_shape[:2]
+    th, tw = targ_shape[:2]
+
+    # regions 경계로 나눈 가로 띠마다 덮이지 않은 구간, 위아래로 이어지는 같은 구간은 합침
+    ys = sorted({0, oh, *(y for r in regions for y in (r[1], r[3]))})
+    rest: List[Region] = []
+    for y0, y1 in zip(ys, ys[1:]):
+        covered = sorted(
+            (r[0], r[2]) for r in regions if r[1] <= y0 and r[3] >= y1
+        )
+        x = 0
+        for x0, x1 in covered + [(ow, ow)]:
+            if x0 > x:
+                above = next(
+                    (
+                        i for i, r in enumerate(rest)
+                        if r[0] == x and r[2] == x0 and r[3] == y0
+                    ),
+                    None,
+                )
+                if above is None:
+                    rest.append((x, y0, x0, y1))
+                else:
+                    rest[above] = (x, rest[above][1], x0, y1)
+            x = max(x, x1)
+
+    return [
+        (max(0, x0 - tw), max(0, y0 - th), min(ow, x1 + tw), min(oh, y1 + th))
+        for x0, y0, x1, y1 in rest
+    ]
+
+
+def region_area(regions: List[Region], org_shape: tuple) -> float:
+    """원본 대비 영역 넓이 비율 (merge 된 영역 기준)"""
+    oh, ow = org_shape[:2]
+    if oh == 0 or ow == 0:
+        return 0.0
+    return sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions) / (oh * ow)
+
+
+def usable(prior: Optional[SpatialPrior], min_count: int) -> bool:
+    return prior is not None and prior.count >= min_count
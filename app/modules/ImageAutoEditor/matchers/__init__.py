@@ -2,5 +2,10 @@ from .base import BaseMatcher
 from .template import TemplateMatcher
 from .hash import HashMatcher
 from .sift import SiftMatcher
+from .sift_index import SiftIndexMatcher
+from .orb import OrbMatcher
 
-__all__ = ["BaseMatcher", "TemplateMatcher", "HashMatcher", "SiftMatcher"]
+__all__ = [
+    "BaseMatcher", "TemplateMatcher", "HashMatcher", "SiftMatcher",
+    "SiftIndexMatcher", "OrbMatcher",
+]
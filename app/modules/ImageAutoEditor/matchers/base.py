@@ -1,11 +1,12 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 from functools import wraps
 
 import numpy as np
 
-from app.modules.ImageAutoEditor.common.types import MatchResult
+from app.modules.ImageAutoEditor.common import diagnostics
+from app.modules.ImageAutoEditor.common.types import CascadeBand, MatchResult
 
 logger = logging.getLogger(__name__)
 
@@ -15,20 +16,24 @@ def preproc_match(func):
     def wrapper(self, org: np.ndarray, targ: np.ndarray):
         # validation
         if org is None or targ is None:
-            logger.debug("image is None")
+            diagnostics.record("skip", matcher=self.name, reason="image is None")
             return []
 
         orig_h, orig_w = org.shape[:2]
         targ_h, targ_w = targ.shape[:2]
 
         if targ_w > orig_w or targ_h > orig_h:
-            logger.debug(
-                f"Target Image Size Error\n    Target Image: {targ_w}x{targ_h})\nOriginal Image({orig_w}x{orig_h}"
+            diagnostics.record(
+                "skip", matcher=self.name, reason="target larger than original",
+                target=(targ_w, targ_h), original=(orig_w, orig_h),
             )
             return []
 
         if targ_w < 5 or targ_h < 5:
-            logger.debug(f"Target Image is too small: {targ_w}x{targ_h}")
+            diagnostics.record(
+                "skip", matcher=self.name, reason="target too small",
+                target=(targ_w, targ_h),
+            )
             return []
 
         try:
@@ -40,7 +45,8 @@ def preproc_match(func):
 
             return matches
         except Exception as e:
-            logger.error(f"Matching Error: {e}")
+            logger.error("Matching Error [%s]: %s", self.name, e)
+            diagnostics.dump(logger)
             return []
 
     return wrapper
@@ -48,6 +54,10 @@ def preproc_match(func):
 
 class BaseMatcher(ABC):
     name: str
+    # cascade 판정 구간 (MatcherBuilder.set_cascade_band)
+    band: Optional[CascadeBand] = None
+    # 기록 (MatcherStats) 이 없을 때 사용할 target 하나 당 예상 시간 (초, 시간 제한 매칭)
+    cost_hint: float = 1.0
 
     def __init__(self, threshold: float):
         self.threshold = threshold
@@ -71,11 +81,10 @@ class BaseMatcher(ABC):
         raise NotImplementedError
 
     def _log_result(self, matches: List[MatchResult]) -> None:
-        logger.debug(f"[{self.name}] {len(matches)}개 매칭 발견")
-        for i, match in enumerate(matches[:3]):  # 최대 3개만 출력
-            logger.debug(
-                f"  {i + 1}. ({match.x}, {match.y}) {match.w}x{match.h} "
-                f"유사도: {match.similarity:.3f}"
-            )
-        if len(matches) > 3:
-            logger.debug(f"  ... 외 {len(matches) - 3}개")
+        # 최대 3개만 기록 (포맷은 dump / sampling 될 때만)
+        diagnostics.record(
+            "result",
+            matcher=self.name,
+            count=len(matches),
+            top=[(m.x, m.y, m.w, m.h, m.similarity) for m in matches[:3]],
+        )
@@ -5,12 +5,15 @@ import numpy as np
 import logging
 
 from .base import BaseMatcher
+from app.modules.ImageAutoEditor.common import cancel, diagnostics
 from app.modules.ImageAutoEditor.common.types import HashMethod, MatchResult
 
 logger = logging.getLogger(__name__)
 
 
 class HashMatcher(BaseMatcher):
+    cost_hint = 0.2
+
     def __init__(
         self,
         threshold: float,
@@ -104,11 +107,12 @@ class HashMatcher(BaseMatcher):
         total_windows = ((orig_h - temp_h) // stride_y + 1) * (
             (orig_w - temp_w) // stride_x + 1
         )
-        logger.debug(
-            f"[{self.name}] {total_windows}개 윈도우 검사 (간격: {stride_x}x{stride_y})"
+        diagnostics.record(
+            "windows", matcher=self.name, count=total_windows, stride=(stride_x, stride_y)
         )
 
         for y in range(0, orig_h - temp_h + 1, stride_y):
+            cancel.check()
             for x in range(0, orig_w - temp_w + 1, stride_x):
                 # 윈도우 추출
                 window = original_img[y : y + temp_h, x : x + temp_w]
@@ -0,0 +1,164 @@
+import logging
+from typing import Literal
+
+import cv2
+import numpy as np
+
+from .base import BaseMatcher
+from .sift import homography_match
+from ..common import diagnostics, source_cache
+from ..common.types import MatchResult
+
+logger = logging.getLogger(__name__)
+
+FLANN_INDEX_LSH = 6
+
+BinaryDetector = Literal["ORB", "AKAZE"]
+
+
+class OrbMatcher(BaseMatcher):
+    """
+    binary descriptor (ORB, AKAZE) + Hamming LSH index 를 사용하는 특징점 매칭
+
+    SIFT (float descriptor, KD-tree) 보다 특징점 추출/매칭이 빠름.
+    원본의 특징점/LSH index 는 SiftMatcher 처럼 원본 당 한 번만 만듦
+    """
+
+    cost_hint = 0.5
+
+    def __init__(
+        self,
+        threshold: float,
+        min_match_count: int = 10,
+        detector: BinaryDetector = "ORB",
+        n_features: int = 50000,
+        max_instances: int = 1,
+    ):
+        """
+        Args:
+            threshold: lowe's ratio
+            min_match_count: homography 를 계산할 최소 매칭 수
+            detector: ORB | AKAZE
+            n_features: 원본에서 추출할 최대 특징점 수 (ORB).
+                응답이 큰 순서로 남기므로 세로로 긴 원본은 충분히 커야
+                작은 target 영역의 특징점까지 포함됨
+            max_instances: 원본에서 찾을 최대 개수
+        """
+        super().__init__(threshold)
+
+        if detector not in ("ORB", "AKAZE"):
+            raise ValueError(f"Unsupported detector: {detector}")
+
+        self.name = detector
+        self.threshold = threshold
+        self.min_match_count = min_match_count
+        self.detector = detector
+        self.n_features = n_features
+        self.max_instances = max_instances
+
+        if detector == "ORB":
+            self.extractor = cv2.ORB.create(nfeatures=n_features)
+            # ORB 는 가장자리(edgeThreshold) 에서 특징점을 만들지 않으므로
+            # 작은 target 은 padding 해서 추출함
+            self.border = self.extractor.getEdgeThreshold()
+        else:
+            # opencv 5 에서는 AKAZE 가 contrib 로 옮겨짐
+            if not hasattr(cv2, "AKAZE"):
+                raise ValueError("AKAZE is not available in this OpenCV build")
+            self.extractor = cv2.AKAZE.create()
+            self.border = 0
+
+    @staticmethod
+    def _flann() -> cv2.FlannBasedMatcher:
+        index_params = dict(
+            algorithm=FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1
+        )
+        search_params = dict(checks=50)
+        return cv2.FlannBasedMatcher(index_params, search_params)
+
+    def _source_index(self, org: np.ndarray):
+        """원본 특징점 + 학습된 LSH index (원본 당 한 번)"""
+        def build():
+            gray = source_cache.get_cached(
+                org, "gray", lambda: cv2.cvtColor(org, cv2.COLOR_BGR2GRAY)
+            )
+            kp_org, des_org = self.extractor.detectAndCompute(gray, None)
+            flann = None
+            if des_org is not None and len(des_org) >= 2:
+                flann = self._flann()
+                flann.add([des_org])
+                flann.train()
+            return kp_org, flann
+
+        return source_cache.get_cached(
+            org, ("binary_index", self.detector, self.n_features), build
+        )
+
+    def _target_features(self, targ: np.ndarray):
+        gray = cv2.cvtColor(targ, cv2.COLOR_BGR2GRAY)
+        if not self.border:
+            return self.extractor.detectAndCompute(gray, None)
+
+        b = self.border
+        padded = cv2.copyMakeBorder(gray, b, b, b, b, cv2.BORDER_REPLICATE)
+        kp, des = self.extractor.detectAndCompute(padded, None)
+        if des is None:
+            return kp, des
+
+        # padding 영역의 특징점은 제외하고 좌표를 target 기준으로 되돌림
+        h, w = gray.shape[:2]
+        keep, pts = [], []
+        for i, k in enumerate(kp):
+            x, y = k.pt[0] - b, k.pt[1] - b
+            if 0 <= x < w and 0 <= y < h:
+                keep.append(i)
+                pts.append(cv2.KeyPoint(x, y, k.size, k.angle, k.response, k.octave))
+        return pts, des[keep] if keep else None
+
+    def _match_impl(self, org: np.ndarray, targ: np.ndarray) -> list[MatchResult]:
+        kp_targ, des_targ = self._target_features(targ)
+        if des_targ is None or len(des_targ) == 0:
+            return []
+
+        kp_org, flann = self._source_index(org)
+        if flann is None:
+            return []
+
+        k = 2 if self.max_instances <= 1 else self.max_instances + 1
+        matches = flann.knnMatch(des_targ, k=k)
+
+        diagnostics.record(
+            "keypoints", matcher=self.name, original=len(kp_org), target=len(kp_targ)
+        )
+
+        # lowe's ratio test (LSH 는 이웃이 k 개보다 적게 나올 수 있음)
+        good = []
+        for pair in matches:
+            if len(pair) < 2:
+                continue
+            if self.max_instances <= 1:
+                m, n = pair[0], pair[1]
+                if m.distance < self.threshold * n.distance:
+                    good.append(m)
+            else:
+                background = pair[-1].distance
+                good.extend(
+                    m for m in pair[:-1] if m.distance < self.threshold * background
+                )
+
+        diagnostics.record("lowe", matcher=self.name, count=len(good))
+
+        if len(good) < max(self.min_match_count, 4):
+            return []
+
+        src_pts = np.float32([kp_targ[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
+        dst_pts = np.float32([kp_org[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+
+        return homography_match(
+            src_pts,
+            dst_pts,
+            targ.shape[:2],
+            method=self.detector,
+            max_instances=self.max_instances,
+            min_inliers=self.min_match_count,
+        )
@@ -3,58 +3,126 @@ import numpy as np
 import logging
 
 from .base import BaseMatcher
+from ..common import cancel, diagnostics, source_cache
 from ..common.types import MatchResult
 
 
 logger = logging.getLogger(__name__)
 
+FLANN_INDEX_KDTREE = 1
+
 
 class SiftMatcher(BaseMatcher):
     def __init__(
-        self, threshold: float, min_match_count: int = 10, knn_index: int = 2
+        self,
+        threshold: float,
+        min_match_count: int = 10,
+        knn_index: int = 2,
+        index_source: bool = True,
+        max_instances: int = 1,
     ):
+        """
+        Args:
+            threshold: lowe's ratio
+            min_match_count: homography 를 계산할 최소 매칭 수
+            knn_index: knn 의 k
+            index_source: 원본의 특징점/FLANN index 를 한 번만 만들어서
+                모든 target 에 재사용 (False 면 target 마다 새로 계산)
+            max_instances: 원본에서 찾을 최대 개수.
+                1 보다 크면 RANSAC 의 inlier 를 제거하면서 반복해서 찾음
+        """
         super().__init__(threshold)
 
         self.name = "SIFT"
         self.threshold = threshold
         self.min_match_count = min_match_count
         self.knn_index = knn_index
+        self.index_source = index_source
+        self.max_instances = max_instances
 
         self.sift = cv2.SIFT.create()
         self.bf_matcher = cv2.BFMatcher()
 
+    @staticmethod
+    def _flann() -> cv2.FlannBasedMatcher:
+        index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
+        search_params = dict(checks=50)
+        return cv2.FlannBasedMatcher(index_params, search_params)
+
+    def _source_features(self, org: np.ndarray):
+        """원본 특징점, descriptor (원본 당 한 번)"""
+        def build():
+            gray = source_cache.get_cached(
+                org, "gray", lambda: cv2.cvtColor(org, cv2.COLOR_BGR2GRAY)
+            )
+            return self.sift.detectAndCompute(gray, None)
+
+        return source_cache.get_cached(org, "sift_features", build)
+
+    def _source_index(self, org: np.ndarray):
+        """원본 특징점 + 학습된 FLANN index (원본 당 한 번)"""
+        def build():
+            kp_org, des_org = self._source_features(org)
+            flann = None
+            if des_org is not None and len(des_org) >= self.knn_index:
+                flann = self._flann()
+                flann.add([des_org])
+                flann.train()
+            return kp_org, flann
+
+        return source_cache.get_cached(org, "sift_index", build)
+
     def _match_impl(self, org: np.ndarray, targ: np.ndarray) -> list[MatchResult]:
-        org = cv2.cvtColor(org, cv2.COLOR_BGR2GRAY)
         targ = cv2.cvtColor(targ, cv2.COLOR_BGR2GRAY)
 
         # https://docs.opencv.org/4.x/d1/de0/tutorial_py_feature_homography.html
-        kp_org, des_org = self.sift.detectAndCompute(org, None)
         kp_targ, des_targ = self.sift.detectAndCompute(targ, None)
+        if des_targ is None:
+            return []
 
-        logger.debug(
-            f"original keypoint: {len(kp_org)}, target keypoint: {len(kp_targ)}"
+        # 여러 개를 찾는 경우 target 특징점 하나가 원본의 여러 위치와 대응되어야 하므로
+        # 이웃을 더 찾고 (max_instances + 1) 마지막 이웃(배경)과 비교함
+        k = self.knn_index if self.max_instances <= 1 else self.max_instances + 1
+
+        if self.index_source:
+            # target 특징점만 원본 index 에 질의
+            kp_org, flann = self._source_index(org)
+            if flann is None:
+                return []
+            matches = flann.knnMatch(des_targ, k=k)
+        else:
+            org = cv2.cvtColor(org, cv2.COLOR_BGR2GRAY)
+            kp_org, des_org = self.sift.detectAndCompute(org, None)
+            if des_org is None:
+                return []
+
+            # brute force
+            # matches = self.bf_matcher.knnMatch(des_targ, des_org, k=2)
+
+            # flann
+            matches = self._flann().knnMatch(des_targ, des_org, k=k)
+
+        diagnostics.record(
+            "keypoints", matcher=self.name, original=len(kp_org), target=len(kp_targ)
         )
 
-        # brute force
-        # matches = self.bf_matcher.knnMatch(des_targ, des_org, k=2)
-
-        # flann
-        FLANN_INDEX_KDTREE = 1
-        index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
-        search_params = dict(checks=50)
-
-        flann = cv2.FlannBasedMatcher(index_params, search_params)
-
-        matches = flann.knnMatch(des_targ, des_org, k=self.knn_index)
-
         # lowe's ratio test
         lowes_matches = []
-        for m, n in matches:
-            if m.distance < self.threshold * n.distance:
-                # if m.distance < 0.7 * n.distance:
-                lowes_matches.append(m)
-
-        logger.debug(f"Lowe's match: {len(lowes_matches)}")
+        for pair in matches:
+            if len(pair) < 2:
+                continue
+            if self.max_instances <= 1:
+                m, n = pair[0], pair[1]
+                if m.distance < self.threshold * n.distance:
+                    # if m.distance < 0.7 * n.distance:
+                    lowes_matches.append(m)
+            else:
+                background = pair[-1].distance
+                lowes_matches.extend(
+                    m for m in pair[:-1] if m.distance < self.threshold * background
+                )
+
+        diagnostics.record("lowe", matcher=self.name, count=len(lowes_matches))
 
         if len(lowes_matches) < self.min_match_count:
             return []
@@ -66,12 +134,61 @@ class SiftMatcher(BaseMatcher):
             [kp_org[m.trainIdx].pt for m in lowes_matches]
         ).reshape(-1, 1, 2)
 
-        M, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
+        return homography_match(
+            src_pts,
+            dst_pts,
+            targ.shape[:2],
+            max_instances=self.max_instances,
+            min_inliers=self.min_match_count,
+        )
+
+
+def homography_match(
+    src_pts: np.ndarray,
+    dst_pts: np.ndarray,
+    targ_shape: tuple,
+    method: str = "SIFT",
+    max_instances: int = 1,
+    min_inliers: int = 4,
+) -> list[MatchResult]:
+    """
+    target -> 원본 대응점으로 homography 를 구해서 원본에서의 영역 계산
+
+    max_instances 가 1 보다 크면 찾은 영역의 inlier 를 제거하고 남은 대응점으로
+    다시 homography 를 구함 (남은 대응점/inlier 가 min_inliers 보다 적으면 종료)
+    similarity 는 inlier 수 / 전체 대응점 수 (앞에서 제거된 대응점도 포함해서 뒤의 영역이 높아지지 않음)
+
+    Args:
+        src_pts: target 의 점 (N, 1, 2)
+        dst_pts: 원본의 점 (N, 1, 2)
+        targ_shape: target (h, w)
+        method: MatchResult.method
+        max_instances: 최대 개수
+        min_inliers: 두 번째 부터 인정할 최소 inlier 수
+    """
+    h, w = targ_shape
+    pts = np.float32(
+        [[0, 0], [0, h - 1], [w - 1, h - 1], [w - 1, 0]]
+    ).reshape(-1, 1, 2)
+
+    results: list[MatchResult] = []
+    total = len(src_pts)
+    remaining = np.ones(total, dtype=bool)
+
+    while len(results) < max_instances:
+        cancel.check()
+        idx = np.flatnonzero(remaining)
+        if len(idx) < max(4, min_inliers if results else 4):
+            break
+
+        M, mask = cv2.findHomography(src_pts[idx], dst_pts[idx], cv2.RANSAC, 5.0)
+        if M is None:
+            break
+
+        inliers = idx[mask.ravel().astype(bool)]
+        if results and len(inliers) < max(4, min_inliers):
+            break
 
-        h, w = targ.shape
-        pts = np.float32(
-            [[0, 0], [0, h - 1], [w - 1, h - 1], [w - 1, 0]]
-        ).reshape(-1, 1, 2)
         dst = cv2.perspectiveTransform(pts, M)
 
         x_axis = dst[:, 0, 0]
@@ -81,15 +198,22 @@ class SiftMatcher(BaseMatcher):
         x_max = int(np.max(x_axis))
         y_min = int(np.min(y_axis))
         y_max = int(np.max(y_axis))
-        similarity = int(mask.ravel().sum()) / len(lowes_matches)
+        similarity = len(inliers) / total
 
-        return [
+        # 뒤에서 찾은 영역이 깨진 경우 (선으로 접히는 등) 종료
+        if results and (x_max - x_min < 2 or y_max - y_min < 2):
+            break
+
+        results.append(
             MatchResult(
                 x=x_min,
                 y=y_min,
                 w=x_max - x_min,
                 h=y_max - y_min,
                 similarity=similarity,
-                method="SIFT",
+                method=method,
             )
-        ]
+        )
+        remaining[inliers] = False
+
+    return results
@@ -0,0 +1,94 @@
+import logging
+
+import cv2
+import numpy as np
+
+from .base import BaseMatcher
+from .sift import SiftMatcher, homography_match
+from ..common import diagnostics, source_cache, target_index
+from ..common.types import MatchResult
+
+logger = logging.getLogger(__name__)
+
+
+class SiftIndexMatcher(BaseMatcher):
+    """
+    전체 target 의 descriptor 를 모은 TargetIndex 를 사용하는 SIFT
+
+    원본 descriptor 를 index 에 한 번만 질의해서 target 별 투표를 받고,
+    min_match_count 이상 투표받은 target 만 homography 로 검증함.
+    index 에 없는 target 은 SiftMatcher 로 처리
+    """
+
+    cost_hint = 0.5
+
+    def __init__(
+        self,
+        threshold: float,
+        min_match_count: int = 10,
+        index_path: str = "",
+        max_instances: int = 1,
+    ):
+        """
+        Args:
+            threshold: lowe's ratio
+            min_match_count: 검증 대상이 되는 최소 투표 수
+            index_path: TargetIndex.save 로 저장된 파일
+            max_instances: 원본에서 찾을 최대 개수 (SiftMatcher 와 동일)
+        """
+        super().__init__(threshold)
+
+        self.name = "SIFT - index"
+        self.min_match_count = min_match_count
+        self.index_path = index_path
+        self.max_instances = max_instances
+
+        self.sift = cv2.SIFT.create()
+        self.fallback = SiftMatcher(
+            threshold, min_match_count, max_instances=max_instances
+        )
+
+    def _votes(self, org: np.ndarray, index: target_index.TargetIndex):
+        """원본 당 한 번 질의 (index 가 바뀌면 다시)"""
+        def source_features():
+            gray = source_cache.get_cached(
+                org, "gray", lambda: cv2.cvtColor(org, cv2.COLOR_BGR2GRAY)
+            )
+            return self.sift.detectAndCompute(gray, None)
+
+        def build():
+            kp_org, des_org = source_cache.get_cached(
+                org, "sift_features", source_features
+            )
+            return index.vote(kp_org, des_org, self.threshold)
+
+        return source_cache.get_cached(
+            org, ("sift_votes", index.generation, self.threshold), build
+        )
+
+    def _match_impl(self, org: np.ndarray, targ: np.ndarray) -> list[MatchResult]:
+        index = target_index.load_cached(self.index_path)
+        key = None
+        if index is not None:
+            key = index.digest_map().get(target_index.image_digest(targ))
+
+        if key is None:
+            diagnostics.record("index_miss", matcher=self.name)
+            return self.fallback._match_impl(org, targ)
+
+        votes = self._votes(org, index).get(key)
+        n_votes = 0 if votes is None else len(votes[0])
+        diagnostics.record("votes", matcher=self.name, target=key, count=n_votes)
+
+        if n_votes < max(self.min_match_count, 4):
+            return []
+
+        targ_pts, org_pts = votes
+        return homography_match(
+            targ_pts.reshape(-1, 1, 2),
+            org_pts.reshape(-1, 1, 2),
+            index.shape(key),
+            method="SIFT",
+            max_instances=self.max_instances,
+            min_inliers=self.min_match_count,
+        )
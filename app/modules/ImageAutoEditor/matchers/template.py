@@ -1,22 +1,60 @@
-from typing import get_args
+from typing import Optional, get_args
 import cv2
 import numpy as np
 
 from .base import BaseMatcher
-from app.modules.ImageAutoEditor.common.types import TemplateMethod, MatchResult
-from ..common import utils
+from app.modules.ImageAutoEditor.common.types import (
+    TemplateMethod, TemplateMode, MatchResult
+)
+from ..common import cancel, source_cache, timing, utils
 from ..common.config import MATCHERS_CONFIG
 
+
+def to_gray(img: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+
+def to_edge(gray: np.ndarray) -> np.ndarray:
+    """
+    gradient 크기 (Sobel, uint8)
+    색이 바뀐 워터마크도 경계 모양은 같으므로 edge 끼리 비교
+    """
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    gx = cv2.Sobel(blurred, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(blurred, cv2.CV_32F, 0, 1, ksize=3)
+    return cv2.convertScaleAbs(cv2.magnitude(gx, gy))
+
+
 class TemplateMatcher(BaseMatcher):
     cv_method: int
+    cost_hint = 0.05
 
-    def __init__(self, threshold: float, method: TemplateMethod):
+    def __init__(
+        self,
+        threshold: float,
+        method: TemplateMethod,
+        max_instances: Optional[int] = None,
+        mode: TemplateMode = "bgr",
+    ):
+        """
+        Args:
+            threshold: 유사도 기준
+            method: cv2 template matching 방법
+            max_instances: 최대 개수. 지정하면 threshold 를 넘는 위치를 모두 모으지 않고
+                가장 높은 위치부터 k 개만 찾음 (minMaxLoc + 주변 억제)
+            mode: bgr | gray | edge. gray, edge 는 1 channel 이라 bgr 보다 약 3배 빠름.
+                원본의 gray/edge 는 source_cache 로 모든 target 이 공유함
+        """
         super().__init__(threshold)
 
-        self.name = f"Template - {method}"
+        self.name = f"Template - {method}" + ("" if mode == "bgr" else f" ({mode})")
         self.method = method
+        self.max_instances = max_instances
+        self.mode = mode
         if method not in get_args(TemplateMethod):
             raise ValueError("Invalid template matching method")
+        if mode not in get_args(TemplateMode):
+            raise ValueError("Invalid template matching mode")
 
         self.cv_method = getattr(cv2, method, None)
         self.is_inverse = True if self.method == "TM_SQDIFF_NORMED" else False
@@ -24,8 +62,13 @@ class TemplateMatcher(BaseMatcher):
     def _match_impl(self, org: np.ndarray, targ: np.ndarray) -> list[MatchResult]:
         all_config = { **MATCHERS_CONFIG }
 
+        org, targ = self._planes(org, targ)
         result = cv2.matchTemplate(org, targ, getattr(cv2, self.method))
 
+        if self.max_instances:
+            with timing.span("nms"):
+                return self._top_k(result, targ.shape[:2])
+
         if self.is_inverse:
             threshold = 1 - self.threshold
             locations = np.where(result <= threshold)
@@ -36,39 +79,94 @@ class TemplateMatcher(BaseMatcher):
         best_matches: list[MatchResult] = []
         targ_h, targ_w = targ.shape[:2]
 
-        for y, x in zip(locations[0], locations[1]):  # BGR -> y,x 식으로 되어있음
-            similarity = float(result[y, x])
-            if self.is_inverse:
-                similarity = 1 - similarity
-
-            match = MatchResult(
-                x=int(x),
-                y=int(y),
-                w=targ_w,
-                h=targ_h,
-                similarity=similarity,
-                method=self.method,
-            )
+        with timing.span("nms"):
+            for y, x in zip(locations[0], locations[1]):  # BGR -> y,x 식으로 되어있음
+                similarity = float(result[y, x])
+                if self.is_inverse:
+                    similarity = 1 - similarity
 
-            if not all_config.get("except_overlap"):
-                matches.append(match)
-            else:
-                overlapped = [
-                    i
-                    for i, best_m in enumerate(best_matches)
-                    if utils.is_overlap(best_m, match)
-                ]
-
-                if not overlapped:
-                    best_matches.append(match)
+                match = MatchResult(
+                    x=int(x),
+                    y=int(y),
+                    w=targ_w,
+                    h=targ_h,
+                    similarity=similarity,
+                    method=self.method,
+                )
+
+                if not all_config.get("except_overlap"):
+                    matches.append(match)
                 else:
-                    best_idx = max(overlapped, key=lambda i: best_matches[i].similarity)
-                    if match.similarity > best_matches[best_idx].similarity:
-                        # match 가 더 높다면, 겹치는 것들 전부 제거하고 match를 추가함
-                        for i in overlapped:
-                            best_matches[i] = match
+                    overlapped = [
+                        i
+                        for i, best_m in enumerate(best_matches)
+                        if utils.is_overlap(best_m, match)
+                    ]
+
+                    if not overlapped:
+                        best_matches.append(match)
+                    else:
+                        best_idx = max(
+                            overlapped, key=lambda i: best_matches[i].similarity
+                        )
+                        if match.similarity > best_matches[best_idx].similarity:
+                            # match 가 더 높다면, 겹치는 것들 전부 제거하고 match를 추가함
+                            for i in overlapped:
+                                best_matches[i] = match
 
         if all_config.get("except_overlap"):
             matches = best_matches
 
         return matches
+
+    def _planes(self, org: np.ndarray, targ: np.ndarray):
+        """mode 에 맞는 (원본, target) - 원본 쪽은 원본 당 한 번만 계산"""
+        if self.mode == "bgr":
+            return org, targ
+
+        gray = source_cache.get_cached(org, "gray", lambda: to_gray(org))
+        if self.mode == "gray":
+            return gray, to_gray(targ)
+
+        edge = source_cache.get_cached(org, "edge", lambda: to_edge(gray))
+        return edge, to_edge(to_gray(targ))
+
+    def _top_k(self, result: np.ndarray, targ_shape: tuple) -> list[MatchResult]:
+        """
+        가장 높은 위치부터 max_instances 개 (다음 위치가 threshold 미만이면 종료)
+        찾은 위치와 겹치는 범위(target 크기)는 제외하므로 결과끼리 겹치지 않음
+        """
+        targ_h, targ_w = targ_shape
+        # 단색 영역에서 NaN 이 나올 수 있음
+        worst = np.inf if self.is_inverse else -np.inf
+        np.nan_to_num(result, copy=False, nan=worst)
+
+        matches: list[MatchResult] = []
+        while len(matches) < self.max_instances:
+            cancel.check()
+            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            if self.is_inverse:
+                similarity, (x, y) = 1 - min_val, min_loc
+            else:
+                similarity, (x, y) = max_val, max_loc
+
+            if not similarity >= self.threshold:
+                break
+
+            matches.append(
+                MatchResult(
+                    x=int(x),
+                    y=int(y),
+                    w=targ_w,
+                    h=targ_h,
+                    similarity=float(similarity),
+                    method=self.method,
+                )
+            )
+
+            result[
+                max(0, y - targ_h + 1) : y + targ_h,
+                max(0, x - targ_w + 1) : x + targ_w,
+            ] = worst
+
+        return matches
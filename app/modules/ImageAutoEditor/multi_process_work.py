@@ -1,51 +1,373 @@
 import os
 import logging
-from typing import List
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import pickle
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ProcessPoolExecutor, as_completed, wait
+)
 import numpy as np
 
-from .helper import MatcherBuilder
-from .common import types, utils
+from .helper import MatcherBuilder, SpatialPrior
+from .common import cancel, diagnostics, profiling, timing, types, utils
 
 logger = logging.getLogger(__name__)
 
+# worker process 별 캐시
+# 원본 이미지와 MatcherBuilder 를 target 마다 새로 만들지 않고 재사용해야
+# 원본 기준 계산(SIFT 특징점, FLANN index 등)이 worker 당 한 번만 수행됨
+_worker_source: dict = {}
+_worker_builder: dict = {}
+# batch 에서 target 목록은 모든 원본이 같으므로 worker 당 한 번만 로드
+_worker_targets: dict = {}
+
+# 부모 process 에서 pool 에 넣고 아직 끝나지 않은 작업 수 (metrics)
+_pending = 0
+
+# 결과를 기다리는 동안 CancelToken 을 확인하는 주기 (초)
+CANCEL_POLL_INTERVAL = 0.2
+
+
+def pending_tasks() -> int:
+    return _pending
+
+
+def _completed(
+    futures: Dict[Future, int], token: Optional[cancel.CancelToken]
+) -> Iterator[Future]:
+    """as_completed + 기다리는 동안 token 확인 (취소되면 Cancelled)"""
+    if token is None:
+        yield from as_completed(futures)
+        return
+
+    not_done = set(futures)
+    while not_done:
+        token.check()
+        done, not_done = wait(
+            not_done, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED
+        )
+        yield from done
+
+
+def worker_pool(
+    multi_process_count: int, token: Optional[cancel.CancelToken] = None
+) -> ProcessPoolExecutor:
+    """
+    매칭 worker pool - token 은 worker 에서도 확인함
+
+    여러 번의 매칭 (시간 제한 매칭의 단계) 에 같은 pool 을 넘기면 process 생성과
+    worker 캐시 (원본 이미지 등) 를 재사용함. 사용한 쪽에서 shutdown
+    """
+    return ProcessPoolExecutor(
+        max_workers=multi_process_count, initializer=cancel.install, initargs=(token,)
+    )
+
+
+def _shutdown(
+    executor: ProcessPoolExecutor,
+    futures: Dict[Future, int],
+    token: Optional[cancel.CancelToken],
+    owned: bool = True,
+) -> None:
+    """
+    시작하지 않은 작업은 취소하고, 실행 중인 worker 는 checkpoint 에서 멈추도록 함
+    owned 가 아니면 (넘겨받은 pool) pool 은 그대로 둠
+    """
+    skipped = sum(fut.cancel() for fut in futures)
+    if skipped:
+        timing.incr("cancel.skipped_tasks", skipped)
+    if token is not None and skipped:
+        token.cancel()
+    if owned:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _load_source(original_img: str | np.ndarray) -> np.ndarray:
+    if isinstance(original_img, np.ndarray):
+        return original_img
+
+    if _worker_source.get("key") != original_img:
+        _worker_source["key"] = original_img
+        with timing.span("load.source"):
+            _worker_source["img"] = utils.load_img(original_img)
+    return _worker_source["img"]
+
+
+def _load_targets(target_imgs: List[str]) -> List[np.ndarray]:
+    key = tuple(target_imgs)
+    if _worker_targets.get("key") != key:
+        _worker_targets["key"] = key
+        with timing.span("load.target"):
+            _worker_targets["imgs"] = utils.load_target_imgs(target_imgs)
+    return _worker_targets["imgs"]
+
+
+def _get_builder(builder_info) -> MatcherBuilder:
+    key = pickle.dumps(builder_info)
+    if _worker_builder.get("key") != key:
+        _worker_builder["key"] = key
+        _worker_builder["builder"] = MatcherBuilder.from_specs(builder_info)
+    return _worker_builder["builder"]
+
 
 def __work(
-    original_img: np.ndarray, target_img: np.ndarray, builder_info
-) -> List[types.MatchResult]:
-    """work"""
+    original_img: str | np.ndarray,
+    target_img: str | np.ndarray,
+    builder_info,
+    target_idx: int,
+    prior: Optional[SpatialPrior] = None,
+    collect_timing: bool = False,
+    profile_mode: Optional[profiling.ProfileMode] = None,
+):
+    """
+    work
+
+    Returns:
+        (매칭 결과, 통계 - 부모 process 의 builder 에 합침, timing 기록, profile 기록)
+    """
+    timing.set_enabled(collect_timing)
+
+    matches: List[types.MatchResult] = []
+    mbuilder = None
+    profile = None
+    diagnostics.begin_trace(target=target_idx)
     try:
-        mbuilder = MatcherBuilder.from_specs(builder_info)
-        return mbuilder.match(original_img, target_img)
+        mbuilder = _get_builder(builder_info)
+        if profile_mode is None:
+            matches = _match_one(mbuilder, original_img, target_img, prior)
+        else:
+            matches, profile = profiling.run(
+                profile_mode, _match_one, mbuilder, original_img, target_img, prior
+            )
+        for m in matches:
+            m.target = target_idx
     except Exception as e:
-        logger.error(e)
+        logger.error("target %d: %s", target_idx, e)
+        diagnostics.dump(logger)
 
-    return []
+    stats = mbuilder.pop_stats() if mbuilder is not None else None
+    return matches, stats, timing.pop(), profile
+
+
+def _match_one(
+    mbuilder: MatcherBuilder,
+    original_img: str | np.ndarray,
+    target_img: str | np.ndarray,
+    prior: Optional[SpatialPrior],
+) -> List[types.MatchResult]:
+    org = _load_source(original_img)
+    with timing.span("load.target"):
+        targ = utils.load_img(target_img)
+    return mbuilder.match(org, targ, prior)
 
 
 def find_matches_parallel(
-    original_img: str,
+    original_img: str | np.ndarray,
     target_imgs: List[str],
     mbuilder: MatcherBuilder,
     multi_process_count: int | None = None,
+    priors: Optional[List[Optional[SpatialPrior]]] = None,
+    token: Optional[cancel.CancelToken] = None,
 ) -> List[types.MatchResult]:
-    """Multi process of find_matches"""
-    original_img = utils.load_img(original_img)
-    target_imgs = utils.load_target_imgs(target_imgs)
+    """
+    Multi process of find_matches
+
+    이미지 경로는 그대로 worker 에 넘기고 worker 에서 로드함
+    (원본 이미지 배열을 target 마다 pickle 하지 않음)
+    """
+    all_matches: List[types.MatchResult] = []
+    for _, res in iter_matches_parallel(
+        original_img, target_imgs, mbuilder, multi_process_count, priors, token
+    ):
+        all_matches.extend(res)
+    return all_matches
+
+
+def iter_matches_parallel(
+    original_img: str | np.ndarray,
+    target_imgs: List[str],
+    mbuilder: MatcherBuilder,
+    multi_process_count: int | None = None,
+    priors: Optional[List[Optional[SpatialPrior]]] = None,
+    token: Optional[cancel.CancelToken] = None,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> Iterator[Tuple[int, List[types.MatchResult]]]:
+    """
+    find_matches_parallel - 끝나는 순서대로 (target index, 매칭 결과)
+
+    중간에 반복을 멈추면 시작하지 않은 작업은 취소함.
+    token 이 취소되면 Cancelled 를 raise 하고, 실행 중인 worker 는 checkpoint 에서 멈춤
 
+    Args:
+        executor: worker_pool 로 만든 pool (없으면 새로 만들고 끝나면 shutdown).
+            worker 는 pool 을 만들 때의 token 을 확인하므로 같은 token 을 넘겨야 함
+    """
     if multi_process_count is None:
         multi_process_count = os.cpu_count() or 2
 
     mbuilder_info = mbuilder.serialize()
+    if priors is None:
+        priors = [None] * len(target_imgs)
 
-    all_matches: List[types.MatchResult] = []
-    with ProcessPoolExecutor(max_workers=multi_process_count) as executor:
-        future = [
-            executor.submit(__work, original_img, targ, mbuilder_info)
-            for targ in target_imgs
-        ]
-        for fut in as_completed(future):
-            res = fut.result()
-            all_matches.extend(res)
+    global _pending
+    collect_timing = timing.is_enabled()
+    profile_mode = profiling.active_mode()
+
+    owned = executor is None
+    if owned:
+        executor = worker_pool(multi_process_count, token)
+    futures = {
+        executor.submit(
+            __work,
+            original_img,
+            targ,
+            mbuilder_info,
+            i,
+            priors[i],
+            collect_timing,
+            profile_mode,
+        ): i
+        for i, targ in enumerate(target_imgs)
+    }
+    remaining = len(futures)
+    _pending += remaining
+    try:
+        for fut in _completed(futures, token):
+            _pending -= 1
+            remaining -= 1
+            res, stats, timings, profile = fut.result()
+            timing.merge(timings)
+            if profile is not None:
+                profiling.add_worker(profile)
+            if stats is not None:
+                mbuilder.merge_stats(stats)
+            yield futures[fut], res
+    finally:
+        _pending -= remaining
+        _shutdown(executor, futures, token, owned)
 
+
+def match_source(
+    mbuilder: MatcherBuilder,
+    original_img: str | np.ndarray,
+    targets: List[np.ndarray],
+    priors: List[Optional[SpatialPrior]],
+    token: Optional[cancel.CancelToken] = None,
+) -> List[types.MatchResult]:
+    """원본 하나에 모든 target 매칭 (target 별 오류는 기록하고 계속 진행)"""
+    all_matches: List[types.MatchResult] = []
+    for _, matches in iter_match_source(mbuilder, original_img, targets, priors, token):
+        all_matches.extend(matches)
     return all_matches
+
+
+def iter_match_source(
+    mbuilder: MatcherBuilder,
+    original_img: str | np.ndarray,
+    targets: List[np.ndarray],
+    priors: List[Optional[SpatialPrior]],
+    token: Optional[cancel.CancelToken] = None,
+) -> Iterator[Tuple[int, List[types.MatchResult]]]:
+    """
+    match_source - target 하나가 끝날 때마다 (target index, 매칭 결과)
+
+    token 은 매칭하는 동안에만 현재 thread 에 설정함 (반복마다 thread 가 달라질 수 있음)
+    """
+    with timing.span("load.source"):
+        org = utils.load_img(original_img)
+    mbuilder.reload_stats()
+
+    for idx, targ in enumerate(targets):
+        diagnostics.begin_trace(target=idx)
+        matches: List[types.MatchResult] = []
+        try:
+            with cancel.scope(token):
+                cancel.check()
+                matches = mbuilder.match(org, targ, priors[idx])
+            for m in matches:
+                m.target = idx
+        except Exception as e:
+            logger.error("target %d: %s", idx, e)
+            diagnostics.dump(logger)
+        yield idx, matches
+
+
+def __work_source(
+    original_img: str,
+    target_imgs: List[str],
+    builder_info,
+    priors: List[Optional[SpatialPrior]],
+    collect_timing: bool = False,
+):
+    """
+    batch work - 원본 하나
+
+    Returns:
+        (매칭 결과 또는 오류, 통계, timing 기록, 소요 시간 (초))
+    """
+    timing.set_enabled(collect_timing)
+
+    started = time.perf_counter()
+    mbuilder = None
+    try:
+        mbuilder = _get_builder(builder_info)
+        matches = match_source(mbuilder, original_img, _load_targets(target_imgs), priors)
+    except Exception as e:
+        logger.error("source %s: %s", original_img, e)
+        diagnostics.dump(logger)
+        matches = e
+
+    stats = mbuilder.pop_stats() if mbuilder is not None else None
+    return matches, stats, timing.pop(), time.perf_counter() - started
+
+
+def find_matches_batch_parallel(
+    original_imgs: List[str],
+    target_imgs: List[str],
+    mbuilder: MatcherBuilder,
+    multi_process_count: int | None = None,
+    priors: Optional[List[Optional[SpatialPrior]]] = None,
+    token: Optional[cancel.CancelToken] = None,
+) -> Iterator[Tuple[int, List[types.MatchResult] | Exception, Optional[float]]]:
+    """
+    원본 여러 개를 하나의 pool 에서 원본 단위로 나눠서 매칭
+
+    worker 는 target 목록과 MatcherBuilder 를 한 번만 로드해서 모든 원본에 재사용함.
+    끝나는 순서대로 (원본 index, 매칭 결과 또는 오류, 원본 하나의 매칭 시간 (초)) 를 반환하고,
+    중간에 반복을 멈추면 시작하지 않은 작업은 취소함
+    """
+    global _pending
+    if multi_process_count is None:
+        multi_process_count = os.cpu_count() or 2
+
+    mbuilder_info = mbuilder.serialize()
+    if priors is None:
+        priors = [None] * len(target_imgs)
+    collect_timing = timing.is_enabled()
+
+    executor = worker_pool(multi_process_count, token)
+    futures = {
+        executor.submit(
+            __work_source, org, target_imgs, mbuilder_info, priors, collect_timing
+        ): i
+        for i, org in enumerate(original_imgs)
+    }
+    remaining = len(futures)
+    _pending += remaining
+    try:
+        for fut in _completed(futures, token):
+            _pending -= 1
+            remaining -= 1
+            try:
+                res, stats, timings, seconds = fut.result()
+            except Exception as e:
+                # worker process 가 죽은 경우 등 - 소요 시간을 알 수 없음
+                yield futures[fut], e, None
+                continue
+            timing.merge(timings)
+            if stats is not None:
+                mbuilder.merge_stats(stats)
+            yield futures[fut], res, seconds
+    finally:
+        _pending -= remaining
+        _shutdown(executor, futures, token)
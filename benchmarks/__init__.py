@@ -0,0 +1,5 @@
+"""
+매칭 엔진 benchmark (합성 이미지 기반)
+
+    uv run python -m benchmarks.orb_vs_sift
+"""
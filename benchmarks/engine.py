@@ -0,0 +1,289 @@
+"""
+엔진 성능 benchmark - find_matches / slice_image / matcher 별 latency, 처리량, peak RSS
+
+합성 상세페이지(Scenario) 를 만들어서 각 case 를 새 process 에서 실행함
+(peak RSS 는 process 단위 최대값이라 case 마다 분리해야 비교 가능)
+
+    uv run python -m benchmarks.engine --profile quick --out bench.json
+    uv run python -m benchmarks.engine --profile full --out new.json --compare bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, replace
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from app.modules.ImageAutoEditor import core
+from app.modules.ImageAutoEditor.common import utils
+from app.modules.ImageAutoEditor.helper import MatcherBuilder
+
+from .synthetic import Scenario
+
+REPORT_VERSION = 1
+
+BASE_SCENARIO = Scenario(height=1500, n_targets=8, present=3)
+
+# 단일 matcher case (matcher.match 를 target 마다 측정)
+MATCHERS: Dict[str, Callable[[MatcherBuilder], MatcherBuilder]] = {
+    "tm_bgr": lambda b: b.set_tm_matcher(0.9, "TM_CCOEFF_NORMED"),
+    "tm_gray": lambda b: b.set_tm_matcher(0.9, "TM_CCOEFF_NORMED", mode="gray"),
+    "tm_edge": lambda b: b.set_tm_matcher(0.8, "TM_CCOEFF_NORMED", mode="edge"),
+    "sift": lambda b: b.set_sift_matcher(0.8, min_match_count=10),
+    "orb": lambda b: b.set_orb_matcher(0.8, min_match_count=10),
+}
+
+
+def scenarios(profile: str) -> List[Scenario]:
+    """
+    quick: 기본 조건 하나
+    full: 기본 조건에서 한 항목씩 바꾼 조건들 (항목 별 영향 비교)
+    """
+    if profile == "quick":
+        return [BASE_SCENARIO]
+
+    return [
+        BASE_SCENARIO,
+        replace(BASE_SCENARIO, height=4000),
+        replace(BASE_SCENARIO, height=8000),
+        replace(BASE_SCENARIO, n_targets=30),
+        replace(BASE_SCENARIO, scale_range=(0.8, 1.2)),
+        replace(BASE_SCENARIO, noise=8.0),
+        replace(BASE_SCENARIO, jpeg_quality=60),
+    ]
+
+
+def default_builder() -> MatcherBuilder:
+    """/remove 와 같은 matcher 구성 (통계 파일, prior 없이)"""
+    return (
+        MatcherBuilder()
+        .set_config("early_stop", True)
+        .set_tm_matcher(0.9, "TM_CCOEFF_NORMED")
+        .set_sift_matcher(0.9, min_match_count=1000)
+    )
+
+
+# ---- 측정 ----
+def _peak_rss_mb() -> Dict[str, float]:
+    # linux 는 KB, macOS 는 byte
+    unit = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    return {
+        "self": round(own / 2**20, 1),
+        "children": round(children / 2**20, 1),
+    }
+
+
+def _summary(samples: List[float], items_per_sample: int) -> dict:
+    arr = np.asarray(samples)
+    total = float(arr.sum())
+    return {
+        "runs": len(samples),
+        "p50_ms": round(float(np.percentile(arr, 50)) * 1000, 2),
+        "p95_ms": round(float(np.percentile(arr, 95)) * 1000, 2),
+        "mean_ms": round(float(arr.mean()) * 1000, 2),
+        "throughput": round(len(samples) * items_per_sample / total, 3) if total else None,
+    }
+
+
+def _run_case(case: dict, page_path: str, target_paths: List[str], repeat: int) -> dict:
+    kind = case["kind"]
+    samples = []
+
+    if kind == "matcher":
+        matcher = MATCHERS[case["name"]](MatcherBuilder()).matchers[0]
+        targets = utils.load_target_imgs(target_paths)
+        for _ in range(repeat):
+            # 원본 당 캐시(gray, 특징점 등)도 측정에 포함되도록 매번 새로 로드
+            org = utils.load_img(page_path)
+            for targ in targets:
+                start = time.perf_counter()
+                matcher.match(org, targ)
+                samples.append(time.perf_counter() - start)
+            del org
+        return {**_summary(samples, 1), "unit": "target/s"}
+
+    workers = case.get("workers", 1)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if kind == "find_matches":
+            core.find_matches(page_path, target_paths, default_builder(), workers)
+        elif kind == "slice_image":
+            core.slice_image(
+                page_path, target_paths, default_builder(), multi_process_count=workers
+            )
+        else:
+            raise ValueError(f"Unknown case: {kind}")
+        samples.append(time.perf_counter() - start)
+
+    return {
+        **_summary(samples, 1),
+        "unit": "page/s",
+        "targets_per_s": round(len(samples) * len(target_paths) / sum(samples), 3),
+    }
+
+
+def _case_process(conn, case, page_path, target_paths, repeat):
+    try:
+        result = _run_case(case, page_path, target_paths, repeat)
+        result["peak_rss_mb"] = _peak_rss_mb()
+        conn.send(result)
+    except Exception as e:
+        conn.send({"error": repr(e)})
+    finally:
+        conn.close()
+
+
+def run_isolated(case: dict, page_path: str, target_paths: List[str], repeat: int) -> dict:
+    """case 를 spawn 한 process 에서 실행 (peak RSS, 원본 캐시를 case 마다 분리)"""
+    ctx = multiprocessing.get_context("spawn")
+    recv, send = ctx.Pipe(duplex=False)
+    proc = ctx.Process(
+        target=_case_process, args=(send, case, page_path, target_paths, repeat)
+    )
+    proc.start()
+    send.close()
+    try:
+        result = recv.recv()
+    except EOFError:
+        result = {"error": "case process exited"}
+    proc.join()
+    if proc.exitcode:
+        result.setdefault("error", f"exit code {proc.exitcode}")
+    return result
+
+
+def cases(matchers: List[str], workers: int) -> List[dict]:
+    items = [{"kind": "matcher", "name": name} for name in matchers]
+    items.append({"kind": "find_matches", "name": "serial", "workers": 1})
+    if workers > 1:
+        items.append({"kind": "find_matches", "name": "parallel", "workers": workers})
+    items.append({"kind": "slice_image", "name": "serial", "workers": 1})
+    return items
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scenario in scenarios(args.profile):
+            page_path, target_paths, _ = scenario.build(tmp)
+            for case in cases(args.matchers, args.workers):
+                name = f"{scenario.name}/{case['kind']}:{case['name']}"
+                print(f"running {name}", file=sys.stderr)
+                result = run_isolated(case, page_path, target_paths, args.repeat)
+                results.append(
+                    {
+                        "name": name,
+                        "scenario": {**asdict(scenario), "name": scenario.name},
+                        "case": case,
+                        **result,
+                    }
+                )
+
+    return {
+        "version": REPORT_VERSION,
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "profile": args.profile,
+            "repeat": args.repeat,
+            "workers": args.workers,
+        },
+        "results": results,
+    }
+
+
+# ---- 비교 ----
+def compare(report: dict, baseline: dict, tolerance: float) -> List[dict]:
+    """
+    baseline 대비 p50 변화율 - tolerance 보다 느려진 case 는 regressed
+
+    Args:
+        tolerance: 허용 비율 (0.1 = 10%)
+    """
+    base = {r["name"]: r for r in baseline.get("results", []) if "p50_ms" in r}
+    rows = []
+    for r in report["results"]:
+        b = base.get(r["name"])
+        if b is None or "p50_ms" not in r or not b["p50_ms"]:
+            continue
+        change = r["p50_ms"] / b["p50_ms"] - 1
+        rows.append(
+            {
+                "name": r["name"],
+                "baseline_p50_ms": b["p50_ms"],
+                "p50_ms": r["p50_ms"],
+                "change": round(change, 3),
+                "regressed": change > tolerance,
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--profile", default="quick", choices=["quick", "full"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--matchers", nargs="*", default=list(MATCHERS), choices=list(MATCHERS)
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--out", help="결과 JSON 파일 (없으면 stdout)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    report = run(args)
+
+    regressed = False
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+        regressed = any(r["regressed"] for r in report["comparison"])
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        for r in report["comparison"]:
+            mark = "REGRESSED" if r["regressed"] else ""
+            print(
+                f"{r['name']:<60} {r['baseline_p50_ms']:>9} -> {r['p50_ms']:>9} ms "
+                f"({r['change']:+.1%}) {mark}",
+                file=sys.stderr,
+            )
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
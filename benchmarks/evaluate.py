@@ -0,0 +1,273 @@
+"""
+matcher 구성 별 정확도/속도 평가 - precision, recall, IoU, latency 와 Pareto frontier
+
+grid 는 MatcherBuilder.serialize() 결과와 같은 형식의 목록 (JSON 파일)
+
+    [{"name": "tm+sift", "specs": {"version": 1, "items": [...]}, "config": {"early_stop": true}}]
+
+dataset 디렉토리는 labels.json 에 정답 영역을 기록
+
+    {
+        "targets": {"logo": "targets/logo.png"},
+        "pages": [{"image": "pages/1.jpg", "boxes": {"logo": [[x, y, w, h]]}}]
+    }
+
+    uv run python -m benchmarks.evaluate                       # 합성 dataset + 기본 grid
+    uv run python -m benchmarks.evaluate --dataset data/ --grid grid.json --json
+    uv run python -m benchmarks.evaluate --export-dataset data/   # 합성 dataset 저장
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from app.modules.ImageAutoEditor.common import utils
+from app.modules.ImageAutoEditor.helper import MatcherBuilder
+
+from .synthetic import Box, Scenario, make_page, make_targets, score
+
+
+@dataclass
+class Dataset:
+    target_names: List[str]
+    targets: List[np.ndarray]
+    # (원본, target 번호 -> 정답 영역)
+    pages: List[Tuple[np.ndarray, Dict[int, List[Box]]]]
+
+
+# ---- dataset ----
+def synthetic_dataset(n_pages: int, scenario: Scenario) -> Dataset:
+    """같은 target 목록에 page 마다 다른 target 을 붙여넣은 dataset"""
+    rng = np.random.default_rng(scenario.seed)
+    targets = make_targets(scenario.n_targets, seed=scenario.seed)
+    pages = []
+    for i in range(n_pages):
+        present = rng.choice(
+            scenario.n_targets,
+            size=min(scenario.present, scenario.n_targets),
+            replace=False,
+        )
+        page = make_page(
+            targets,
+            sorted(present.tolist()),
+            seed=scenario.seed + i,
+            height=scenario.height,
+            jpeg_quality=scenario.jpeg_quality,
+            scale_range=scenario.scale_range,
+            noise=scenario.noise,
+        )
+        pages.append((page.image, page.truth))
+    names = [f"target_{i}" for i in range(len(targets))]
+    return Dataset(names, targets, pages)
+
+
+def load_dataset(path: str | Path) -> Dataset:
+    path = Path(path)
+    labels = json.loads((path / "labels.json").read_text())
+
+    names = list(labels["targets"])
+    index = {name: i for i, name in enumerate(names)}
+    targets = [utils.load_img(str(path / labels["targets"][n])) for n in names]
+
+    pages = []
+    for page in labels["pages"]:
+        truth = {
+            index[name]: [tuple(box) for box in boxes]
+            for name, boxes in page.get("boxes", {}).items()
+        }
+        pages.append((utils.load_img(str(path / page["image"])), truth))
+    return Dataset(names, targets, pages)
+
+
+def export_dataset(dataset: Dataset, path: str | Path) -> None:
+    """load_dataset 으로 다시 읽을 수 있는 형식으로 저장"""
+    path = Path(path)
+    (path / "targets").mkdir(parents=True, exist_ok=True)
+    (path / "pages").mkdir(parents=True, exist_ok=True)
+
+    labels = {"targets": {}, "pages": []}
+    for name, targ in zip(dataset.target_names, dataset.targets):
+        rel = f"targets/{name}.png"
+        cv2.imwrite(str(path / rel), targ)
+        labels["targets"][name] = rel
+
+    for i, (image, truth) in enumerate(dataset.pages):
+        rel = f"pages/{i}.png"
+        cv2.imwrite(str(path / rel), image)
+        labels["pages"].append(
+            {
+                "image": rel,
+                "boxes": {
+                    dataset.target_names[t]: [list(b) for b in boxes]
+                    for t, boxes in truth.items()
+                },
+            }
+        )
+    (path / "labels.json").write_text(json.dumps(labels, indent=2))
+
+
+# ---- grid ----
+def default_grid() -> List[dict]:
+    """현재 /remove 구성과 threshold / matcher 를 바꾼 구성들"""
+    builders = {
+        "prod: tm0.9+sift(1000)": MatcherBuilder()
+        .set_config("early_stop", True)
+        .set_tm_matcher(0.9, "TM_CCOEFF_NORMED")
+        .set_sift_matcher(0.9, min_match_count=1000),
+        "tm0.9+sift(30)": MatcherBuilder()
+        .set_config("early_stop", True)
+        .set_tm_matcher(0.9, "TM_CCOEFF_NORMED")
+        .set_sift_matcher(0.8, min_match_count=30),
+        "tm_gray0.9+sift(30)": MatcherBuilder()
+        .set_config("early_stop", True)
+        .set_tm_matcher(0.9, "TM_CCOEFF_NORMED", mode="gray")
+        .set_sift_matcher(0.8, min_match_count=30),
+    }
+    for threshold in (0.8, 0.9, 0.95):
+        builders[f"tm_gray{threshold}"] = MatcherBuilder().set_tm_matcher(
+            threshold, "TM_CCOEFF_NORMED", mode="gray"
+        )
+    for count in (10, 30, 100, 1000):
+        builders[f"sift({count})"] = MatcherBuilder().set_sift_matcher(
+            0.8, min_match_count=count
+        )
+    for count in (10, 30):
+        builders[f"orb({count})"] = MatcherBuilder().set_orb_matcher(
+            0.8, min_match_count=count
+        )
+
+    grid = []
+    for name, builder in builders.items():
+        specs, config = builder.serialize()
+        grid.append({"name": name, "specs": specs, "config": config})
+    return grid
+
+
+def load_grid(path: str | Path) -> List[dict]:
+    grid = json.loads(Path(path).read_text())
+    for i, item in enumerate(grid):
+        item.setdefault("name", f"spec_{i}")
+        item.setdefault("config", {})
+    return grid
+
+
+# ---- 평가 ----
+def evaluate(item: dict, dataset: Dataset, iou_threshold: float) -> dict:
+    builder = MatcherBuilder.from_specs((item["specs"], item["config"]))
+
+    tp = fp = fn = 0
+    ious: List[float] = []
+    page_times = []
+    for image, truth in dataset.pages:
+        # 원본 당 캐시도 측정에 포함되도록 page 마다 새 배열 사용
+        org = image.copy()
+        start = time.perf_counter()
+        found = {
+            t: [(m.x, m.y, m.w, m.h) for m in builder.match(org, targ)]
+            for t, targ in enumerate(dataset.targets)
+        }
+        page_times.append(time.perf_counter() - start)
+
+        for t in range(len(dataset.targets)):
+            a, b, c, v = score(found[t], truth.get(t, []), iou_threshold)
+            tp, fp, fn = tp + a, fp + b, fn + c
+            ious.extend(v)
+
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    times = np.asarray(page_times)
+    return {
+        "name": item["name"],
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "mean_iou": round(float(np.mean(ious)), 4) if ious else None,
+        "page_p50_ms": round(float(np.percentile(times, 50)) * 1000, 1),
+        "page_p95_ms": round(float(np.percentile(times, 95)) * 1000, 1),
+        "target_mean_ms": round(
+            float(times.sum()) / (len(times) * len(dataset.targets)) * 1000, 2
+        ),
+    }
+
+
+def pareto_frontier(rows: List[dict], objective: str) -> List[str]:
+    """
+    latency(page p50) 가 같거나 작으면서 objective 가 더 높은 구성이 없는 것들
+    latency 순으로 보면서 objective 가 이전보다 높아지는 구성만 남김
+    """
+    frontier, best = [], -1.0
+    for r in sorted(rows, key=lambda r: (r["page_p50_ms"], -r[objective])):
+        if r[objective] > best:
+            frontier.append(r["name"])
+            best = r[objective]
+    return frontier
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--dataset", help="labels.json 이 있는 디렉토리 (없으면 합성)")
+    parser.add_argument("--grid", help="matcher specs 목록 JSON (없으면 기본 grid)")
+    parser.add_argument("--pages", type=int, default=3, help="합성 page 수")
+    parser.add_argument("--targets", type=int, default=8, help="합성 target 수")
+    parser.add_argument("--height", type=int, default=1500, help="합성 page 높이")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--export-dataset", help="합성 dataset 을 저장하고 종료")
+    parser.add_argument("--iou", type=float, default=0.5, help="정답으로 인정할 IoU")
+    parser.add_argument(
+        "--objective", default="f1", choices=["f1", "recall", "precision"]
+    )
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.dataset:
+        dataset = load_dataset(args.dataset)
+    else:
+        scenario = replace(
+            Scenario(), height=args.height, n_targets=args.targets, seed=args.seed
+        )
+        dataset = synthetic_dataset(args.pages, scenario)
+
+    if args.export_dataset:
+        export_dataset(dataset, args.export_dataset)
+        print(f"saved {len(dataset.pages)} pages to {args.export_dataset}")
+        return
+
+    grid = load_grid(args.grid) if args.grid else default_grid()
+    rows = []
+    for item in grid:
+        print(f"evaluating {item['name']}", file=sys.stderr)
+        rows.append(evaluate(item, dataset, args.iou))
+    frontier = pareto_frontier(rows, args.objective)
+
+    if args.json:
+        report = {"objective": args.objective, "frontier": frontier, "results": rows}
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"  {'spec':<26} {'p50 ms':>9} {'p95 ms':>9} {'precision':>10} "
+        f"{'recall':>7} {'f1':>6} {'iou':>6}"
+    )
+    for r in sorted(rows, key=lambda r: r["page_p50_ms"]):
+        mark = "*" if r["name"] in frontier else " "
+        print(
+            f"{mark} {r['name']:<26} {r['page_p50_ms']:>9} {r['page_p95_ms']:>9} "
+            f"{r['precision']:>10} {r['recall']:>7} {r['f1']:>6} {r['mean_iou']!s:>6}"
+        )
+    print(f"\n* Pareto frontier (page p50 latency vs {args.objective})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+SiftMatcher vs OrbMatcher (ORB, AKAZE) 속도/재현율 비교
+
+    uv run python -m benchmarks.orb_vs_sift --pages 10 --targets 20
+"""
+import argparse
+import json
+import time
+from statistics import median
+
+import numpy as np
+
+from app.modules.ImageAutoEditor.matchers import OrbMatcher, SiftMatcher
+
+from .synthetic import make_page, make_targets, score
+
+
+def build_matchers(ratio: float, min_match_count: int):
+    matchers = {
+        "sift": SiftMatcher(ratio, min_match_count),
+        "orb": OrbMatcher(ratio, min_match_count, "ORB"),
+    }
+    try:
+        matchers["akaze"] = OrbMatcher(ratio, min_match_count, "AKAZE")
+    except ValueError as e:
+        print(f"skip akaze: {e}")
+    return matchers
+
+
+def run(args) -> dict:
+    rng = np.random.default_rng(args.seed)
+    targets = make_targets(args.targets, seed=args.seed)
+    pages = []
+    for i in range(args.pages):
+        present = rng.choice(args.targets, size=args.present, replace=False)
+        pages.append(make_page(targets, list(present), seed=args.seed + i))
+
+    report = {}
+    for name, matcher in build_matchers(args.ratio, args.min_match_count).items():
+        tp = fp = fn = 0
+        page_times = []
+        for page in pages:
+            # 원본 당 캐시(특징점, index)가 생기므로 원본 마다 새 배열로 측정
+            org = page.image.copy()
+            start = time.perf_counter()
+            found = {
+                t: [(m.x, m.y, m.w, m.h) for m in matcher.match(org, targ)]
+                for t, targ in enumerate(targets)
+            }
+            page_times.append(time.perf_counter() - start)
+
+            for t in range(len(targets)):
+                a, b, c, _ = score(found[t], page.truth.get(t, []))
+                tp, fp, fn = tp + a, fp + b, fn + c
+
+        report[name] = {
+            "page_ms_median": round(median(page_times) * 1000, 1),
+            "target_ms_mean": round(
+                sum(page_times) / (len(pages) * len(targets)) * 1000, 2
+            ),
+            "recall": round(tp / (tp + fn), 3) if tp + fn else None,
+            "precision": round(tp / (tp + fp), 3) if tp + fp else None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--targets", type=int, default=20)
+    parser.add_argument("--present", type=int, default=4)
+    parser.add_argument("--ratio", type=float, default=0.8)
+    parser.add_argument("--min-match-count", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'matcher':<8} {'page ms':>9} {'target ms':>10} {'recall':>7} {'precision':>10}")
+    for name, r in report.items():
+        print(
+            f"{name:<8} {r['page_ms_median']:>9} {r['target_ms_mean']:>10} "
+            f"{r['recall']!s:>7} {r['precision']!s:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Prefilter score 분포 - threshold 별 재현율/제외율
+
+    uv run python -m benchmarks.prefilter --method hist
+"""
+import argparse
+import json
+
+import numpy as np
+
+from app.modules.ImageAutoEditor.helper import Prefilter
+
+from .synthetic import make_page, make_targets
+
+
+def run(args) -> dict:
+    rng = np.random.default_rng(args.seed)
+    targets = make_targets(args.targets, seed=args.seed)
+    prefilter = Prefilter(0.0, args.method)
+
+    present_scores, absent_scores = [], []
+    for i in range(args.pages):
+        present = set(rng.choice(args.targets, size=args.present, replace=False).tolist())
+        page = make_page(targets, sorted(present), seed=args.seed + i)
+        for t, targ in enumerate(targets):
+            score = prefilter.score(page.image, targ)
+            (present_scores if t in present else absent_scores).append(score)
+
+    present_scores = np.asarray(present_scores)
+    absent_scores = np.asarray(absent_scores)
+    rows = []
+    for threshold in np.round(np.arange(0.0, 1.0001, 0.05), 2):
+        rows.append(
+            {
+                "min_score": float(threshold),
+                "recall": float((present_scores >= threshold).mean()),
+                "rejection_rate": float((absent_scores < threshold).mean()),
+            }
+        )
+    return {
+        "method": args.method,
+        "present_min_score": float(present_scores.min()),
+        "absent_median_score": float(np.median(absent_scores)),
+        "thresholds": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--method", default="hist", choices=["hist", "thumb"])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--targets", type=int, default=30)
+    parser.add_argument("--present", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{args.method}: present min score {report['present_min_score']:.3f}, "
+        f"absent median score {report['absent_median_score']:.3f}"
+    )
+    print(f"{'min_score':>9} {'recall':>7} {'rejected':>9}")
+    for r in report["thresholds"]:
+        print(f"{r['min_score']:>9} {r['recall']:>7.3f} {r['rejection_rate']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
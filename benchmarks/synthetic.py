@@ -0,0 +1,223 @@
+"""상세페이지와 비슷한 합성 이미지 + 정답 영역 생성"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+
+@dataclass
+class Page:
+    image: np.ndarray
+    # target 번호 -> 원본에 붙여넣은 영역들
+    truth: dict = field(default_factory=dict)
+
+
+def _random_text(rng: np.random.Generator, n: int) -> str:
+    return "".join(chr(int(c)) for c in rng.integers(65, 91, n))
+
+
+def make_targets(
+    n: int, seed: int = 0, size_range: Tuple[int, int] = (60, 160)
+) -> List[np.ndarray]:
+    """로고/배지/워터마크 형태의 target 이미지"""
+    rng = np.random.default_rng(seed)
+    targets = []
+    for _ in range(n):
+        h = int(rng.integers(size_range[0] // 2, size_range[1] // 2 + 1))
+        w = int(rng.integers(size_range[0], size_range[1] + 1))
+        targ = np.empty((h, w, 3), np.uint8)
+        targ[:] = tuple(int(c) for c in rng.integers(0, 256, 3))
+
+        for _ in range(int(rng.integers(1, 4))):
+            cx, cy = int(rng.integers(0, w)), int(rng.integers(0, h))
+            r = int(rng.integers(4, max(5, h // 3)))
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            cv2.circle(targ, (cx, cy), r, color, -1)
+
+        scale = h / 60
+        cv2.putText(
+            targ,
+            _random_text(rng, int(rng.integers(2, 5))),
+            (4, int(h * 0.7)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            scale,
+            (255, 255, 255),
+            max(1, int(scale * 2)),
+        )
+        cv2.rectangle(targ, (0, 0), (w - 1, h - 1), (20, 20, 20), 1)
+        targets.append(targ)
+    return targets
+
+
+def make_page(
+    targets: Sequence[np.ndarray],
+    present: Sequence[int],
+    seed: int = 0,
+    height: int = 2000,
+    width: int = 860,
+    instances: int = 1,
+    jpeg_quality: int = 90,
+    scale_range: Tuple[float, float] = (1.0, 1.0),
+    noise: float = 0.0,
+) -> Page:
+    """
+    Args:
+        targets: make_targets 결과
+        present: 원본에 붙여넣을 target 번호
+        instances: target 당 붙여넣을 개수
+        jpeg_quality: 0 이면 재압축하지 않음
+        scale_range: 붙여넣을 때 target 크기 배율 범위
+        noise: 가우시안 noise 표준편차 (붙여넣은 뒤 전체에 적용)
+    """
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 250, np.uint8)
+
+    # 사진 영역 (blur 된 noise)
+    for _ in range(max(1, height // 500)):
+        ph, pw = int(rng.integers(150, 400)), int(rng.integers(200, width))
+        y, x = int(rng.integers(0, height - ph)), int(rng.integers(0, width - pw + 1))
+        blob = rng.integers(0, 256, (ph // 8 + 1, pw // 8 + 1, 3), dtype=np.uint8)
+        page[y : y + ph, x : x + pw] = cv2.resize(blob, (pw, ph))[:ph, :pw]
+
+    # 도형, 텍스트
+    for _ in range(height // 30):
+        x, y = int(rng.integers(0, width - 60)), int(rng.integers(0, height - 60))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.rectangle(
+            page, (x, y), (x + int(rng.integers(10, 80)), y + int(rng.integers(10, 80))),
+            color, -1,
+        )
+    for i in range(height // 30):
+        cv2.putText(
+            page, _random_text(rng, 30), (10, 20 + i * 30),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (40, 40, 40), 1,
+        )
+
+    # target 붙여넣기 (겹치지 않도록 세로로 나눠서 배치)
+    slots = [(t, k) for t in present for k in range(instances)]
+    truth: dict = {}
+    if slots:
+        band = height // len(slots)
+        for i, (t, _) in enumerate(slots):
+            targ = targets[t]
+            factor = float(rng.uniform(*scale_range))
+            if factor != 1.0:
+                targ = cv2.resize(
+                    targ, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA
+                )
+            th, tw = targ.shape[:2]
+            if th > band or tw > width:
+                continue
+            y = i * band + int(rng.integers(0, band - th + 1))
+            x = int(rng.integers(0, width - tw + 1))
+            page[y : y + th, x : x + tw] = targ
+            truth.setdefault(t, []).append((x, y, tw, th))
+
+    if noise:
+        page = np.clip(
+            page.astype(np.float32) + rng.normal(0, noise, page.shape), 0, 255
+        ).astype(np.uint8)
+
+    if jpeg_quality:
+        ok, buf = cv2.imencode(".jpg", page, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        page = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+    return Page(page, truth)
+
+
+def iou(a: Box, b: Box) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def score(
+    predicted: Sequence[Box], truth: Sequence[Box], iou_threshold: float = 0.5
+) -> Tuple[int, int, int, List[float]]:
+    """
+    한 target 의 (true positive, false positive, false negative, 매칭된 iou 목록)
+    정답 하나에는 예측 하나만 대응시킴 (iou 가 큰 순서)
+    """
+    pairs = sorted(
+        (
+            (iou(p, t), i, j)
+            for i, p in enumerate(predicted)
+            for j, t in enumerate(truth)
+        ),
+        reverse=True,
+    )
+    used_p, used_t, ious = set(), set(), []
+    for v, i, j in pairs:
+        if v < iou_threshold or i in used_p or j in used_t:
+            continue
+        used_p.add(i)
+        used_t.add(j)
+        ious.append(v)
+
+    tp = len(ious)
+    return tp, len(predicted) - tp, len(truth) - tp, ious
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """benchmark 한 조건 (같은 값이면 같은 이미지가 생성됨)"""
+
+    height: int = 2000
+    n_targets: int = 10
+    present: int = 3
+    scale_range: Tuple[float, float] = (1.0, 1.0)
+    noise: float = 0.0
+    jpeg_quality: int = 90
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        lo, hi = self.scale_range
+        return (
+            f"h{self.height}-t{self.n_targets}-s{lo:g}_{hi:g}"
+            f"-n{self.noise:g}-q{self.jpeg_quality}"
+        )
+
+    def build(self, out_dir: str | Path) -> Tuple[str, List[str], dict]:
+        """
+        이미지 파일 생성
+
+        Returns:
+            (원본 경로, target 경로, 정답 {target 번호: [box]})
+        """
+        out_dir = Path(out_dir) / self.name
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        rng = np.random.default_rng(self.seed)
+        targets = make_targets(self.n_targets, seed=self.seed)
+        n_present = min(self.present, self.n_targets)
+        present = sorted(
+            rng.choice(self.n_targets, size=n_present, replace=False).tolist()
+        )
+        page = make_page(
+            targets,
+            present,
+            seed=self.seed,
+            height=self.height,
+            jpeg_quality=self.jpeg_quality,
+            scale_range=self.scale_range,
+            noise=self.noise,
+        )
+
+        page_path = out_dir / "page.png"
+        cv2.imwrite(str(page_path), page.image)
+        target_paths = []
+        for i, targ in enumerate(targets):
+            path = out_dir / f"target_{i}.png"
+            cv2.imwrite(str(path), targ)
+            target_paths.append(str(path))
+
+        return str(page_path), target_paths, page.truth
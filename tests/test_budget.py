@@ -0,0 +1,116 @@
+"""
+find_matches_budgeted 테스트 - 단계 순서, 시간이 부족할 때 skip / partial, prefilter
+
+target 이미지는 target 번호로 채운 배열이고, stub matcher 는 호출된 target 번호를 기록함
+"""
+import time
+
+import numpy as np
+import pytest
+
+from app.modules.ImageAutoEditor import MatcherBuilder, find_matches_budgeted
+from app.modules.ImageAutoEditor.common import cancel
+from app.modules.ImageAutoEditor.common.types import MatchResult
+from app.modules.ImageAutoEditor.matchers import TemplateMatcher
+
+ORG = np.zeros((100, 100, 3), dtype=np.uint8)
+
+
+def targets(n):
+    return [np.full((10, 10, 3), i, dtype=np.uint8) for i in range(n)]
+
+
+class Stub(TemplateMatcher):
+    """cost_hint 와 찾을 target 을 정해 둔 matcher"""
+
+    def __init__(self, name, cost, hits=(), sleep=0.0):
+        # serialize (matcher_costs) 를 위해 TemplateMatcher 를 상속, threshold 로 구분
+        super().__init__(cost, "TM_CCOEFF_NORMED")
+        self.name = name
+        self.cost_hint = cost
+        self.hits = set(hits)
+        self.sleep = sleep
+        self.calls = []
+
+    def match(self, org, targ):
+        t = int(targ[0, 0, 0])
+        self.calls.append(t)
+        if self.sleep:
+            time.sleep(self.sleep)
+        if t in self.hits:
+            return [MatchResult(t * 10, 0, 10, 10, 1.0, self.name)]
+        return []
+
+
+def builder(*matchers, early_stop=True):
+    mbuilder = MatcherBuilder().set_config("early_stop", early_stop)
+    mbuilder.matchers.extend(matchers)
+    return mbuilder
+
+
+def test_phases_run_cheapest_first():
+    slow = Stub("slow", 0.5, hits={2})
+    fast = Stub("fast", 0.01, hits={0, 1})
+    result = find_matches_budgeted(ORG, targets(4), builder(slow, fast), budget=10)
+
+    # 빠른 matcher 를 모든 target 에 먼저, 느린 matcher 는 찾지 못한 target 에만
+    assert fast.calls == [0, 1, 2, 3]
+    assert slow.calls == [2, 3]
+    assert sorted(m.target for m in result.matches) == [0, 1, 2]
+    assert not result.partial and result.skipped == []
+
+
+def test_skip_when_over_budget():
+    fast = Stub("fast", 0.01)
+    slow = Stub("slow", 0.4)
+    result = find_matches_budgeted(ORG, targets(4), builder(fast, slow), budget=1.0)
+
+    # 남은 시간 (1초 미만) 안에 느린 matcher 는 2개만
+    assert slow.calls == [0, 1]
+    assert result.partial
+    assert sorted(result.skipped) == [(2, "slow"), (3, "slow")]
+
+
+def test_first_phase_skip_applies_to_all_phases():
+    fast = Stub("fast", 0.3)
+    slow = Stub("slow", 0.5)
+    result = find_matches_budgeted(ORG, targets(4), builder(fast, slow), budget=1.0)
+
+    assert fast.calls == [0, 1, 2]
+    # 첫 단계에서 빠진 target 3 은 다음 단계에서도 실행하지 않음
+    assert slow.calls == [0]
+    assert sorted(result.skipped) == [(1, "slow"), (2, "slow"), (3, "fast"), (3, "slow")]
+
+
+def test_prefilter_runs_once():
+    fast = Stub("fast", 0.01)
+    slow = Stub("slow", 0.02)
+    mbuilder = builder(fast, slow).set_prefilter(0.5)
+    # target 1 만 원본에 없는 것으로 판단
+    mbuilder.prefilter.score = lambda org, targ: 0.0 if targ[0, 0, 0] == 1 else 1.0
+
+    result = find_matches_budgeted(ORG, targets(3), mbuilder, budget=10)
+
+    assert fast.calls == [0, 2]
+    # 첫 단계에서 제외된 target 은 다음 단계로 넘기지 않고, prefilter 는 target 마다 한 번
+    assert slow.calls == [0, 2]
+    assert (mbuilder.prefilter.stats.checked, mbuilder.prefilter.stats.rejected) == (3, 1)
+    assert not result.partial
+
+
+def test_deadline_stops_running_phase():
+    slow = Stub("slow", 0.01, hits={0}, sleep=0.3)
+    result = find_matches_budgeted(ORG, targets(4), builder(slow), budget=0.45)
+
+    # target 1 이 끝나면 deadline 이 지나서 나머지는 실행하지 않고 그때까지의 결과를 반환
+    assert slow.calls == [0, 1]
+    assert [m.target for m in result.matches] == [0]
+    assert result.partial
+    assert sorted(result.skipped) == [(2, "slow"), (3, "slow")]
+
+
+def test_request_cancel_is_raised():
+    token = cancel.CancelToken()
+    token.cancel("disconnect")
+    with pytest.raises(cancel.Cancelled):
+        find_matches_budgeted(ORG, targets(2), builder(Stub("fast", 0.01)), 10, token=token)
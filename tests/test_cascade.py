@@ -0,0 +1,107 @@
+"""
+cascade_match / merge_regions 테스트
+
+stub matcher 는 정해 둔 결과 (받은 이미지 기준 좌표) 를 반환하고, 받은 이미지 크기를 기록함
+"""
+import numpy as np
+import pytest
+
+from app.modules.ImageAutoEditor.common.types import CascadeBand, MatchResult
+from app.modules.ImageAutoEditor.helper.cascade import cascade_match, merge_regions
+from app.modules.ImageAutoEditor.matchers import BaseMatcher
+
+ORG = np.zeros((200, 200, 3), dtype=np.uint8)
+TARG = np.zeros((10, 10, 3), dtype=np.uint8)
+
+
+class Stub(BaseMatcher):
+    def __init__(self, name, results=(), band=None):
+        super().__init__(0.0)
+        self.name = name
+        self.results = list(results)
+        self.band = band
+        self.calls = []
+
+    def _match_impl(self, org, targ):
+        self.calls.append(org.shape[:2])
+        # match_in_regions 가 좌표를 바꾸므로 매번 새로 만듦
+        return [MatchResult(x, y, 10, 10, sim, self.name) for x, y, sim in self.results]
+
+
+def boxes(matches):
+    return sorted((m.x, m.y, m.method) for m in matches)
+
+
+def test_accept_reject_ambiguous():
+    first = Stub(
+        "first",
+        [(0, 0, 0.95), (50, 50, 0.7), (100, 100, 0.3)],
+        band=CascadeBand(accept=0.9, reject=0.5, margin=0.5),
+    )
+    second = Stub("second", [(2, 3, 0.99)])
+
+    result = cascade_match([first, second], ORG, TARG)
+
+    # 확정은 그대로, 제외는 버림, 보류 영역 (여백 5px) 만 다음 matcher 로
+    assert first.calls == [(200, 200)]
+    assert second.calls == [(20, 20)]
+    # ROI 안의 좌표를 원본 기준으로 되돌림 (45 + 2, 45 + 3)
+    assert boxes(result) == [(0, 0, "first"), (47, 48, "second")]
+
+
+def test_last_stage_drops_ambiguous():
+    band = CascadeBand(accept=0.9, reject=0.5)
+    first = Stub("first", [(50, 50, 0.7)], band=band)
+    second = Stub("second", [(5, 5, 0.7)], band=band)
+
+    assert cascade_match([first, second], ORG, TARG) == []
+    assert len(second.calls) == 1
+
+
+def test_accepted_overlap_is_removed():
+    first = Stub(
+        "first", [(50, 50, 0.95), (55, 55, 0.7)], band=CascadeBand(accept=0.9, reject=0.5)
+    )
+    # 보류 영역 (45~75) 에서 이미 확정된 영역과 겹치는 결과
+    second = Stub("second", [(5, 5, 0.99)])
+
+    result = cascade_match([first, second], ORG, TARG)
+    assert boxes(result) == [(50, 50, "first")]
+
+
+@pytest.mark.parametrize("full_on_empty", [True, False])
+def test_full_on_empty(full_on_empty):
+    first = Stub("first", band=CascadeBand(0.9, 0.5, full_on_empty=full_on_empty))
+    second = Stub("second", [(30, 40, 0.99)])
+
+    result = cascade_match([first, second], ORG, TARG)
+
+    if full_on_empty:
+        # 결과가 없으면 다음 matcher 는 원본 전체를 검색
+        assert second.calls == [(200, 200)]
+        assert boxes(result) == [(30, 40, "second")]
+    else:
+        assert second.calls == [] and result == []
+
+
+def test_regions_offset_and_no_full_fallback():
+    only = Stub("only", [(1, 2, 0.99)])
+    result = cascade_match([only], ORG, TARG, regions=[(10, 20, 60, 70), (100, 100, 150, 130)])
+
+    assert only.calls == [(50, 50), (30, 50)]
+    assert boxes(result) == [(11, 22, "only"), (101, 102, "only")]
+
+    # 처음부터 영역이 주어지면 결과가 없어도 원본 전체를 검색하지 않음
+    first = Stub("first", band=CascadeBand(0.9, 0.5, full_on_empty=True))
+    second = Stub("second", [(0, 0, 0.99)])
+    assert cascade_match([first, second], ORG, TARG, regions=[(0, 0, 50, 50)]) == []
+    assert second.calls == []
+
+
+def test_merge_regions():
+    # 연쇄로 겹치는 영역은 하나로, 변만 닿는 영역은 그대로
+    regions = [(0, 0, 10, 10), (5, 5, 20, 20), (15, 15, 30, 30), (30, 0, 40, 10)]
+    assert sorted(merge_regions(regions)) == [(0, 0, 30, 30), (30, 0, 40, 10)]
+    assert merge_regions([]) == []
+    # 입력은 변경하지 않음
+    assert regions[0] == (0, 0, 10, 10)
@@ -0,0 +1,60 @@
+"""
+diagnostics 테스트 - 요청마다 기록이 분리되는지 확인
+"""
+import logging
+import threading
+
+from app.modules.ImageAutoEditor.common import diagnostics
+
+
+def test_scope_per_request(caplog):
+    # 다른 테스트가 기본 Ring 에 남긴 기록
+    before = diagnostics.snapshot()
+    barrier = threading.Barrier(2)
+    rings = {}
+
+    def run(name, fail):
+        with diagnostics.scope() as ring:
+            rings[name] = ring
+            diagnostics.begin_trace(target=name)
+            barrier.wait()
+            diagnostics.record("step", request=name)
+            barrier.wait()
+            if fail:
+                diagnostics.dump()
+
+    threads = [
+        threading.Thread(target=run, args=("a", True)),
+        threading.Thread(target=run, args=("b", False)),
+    ]
+    with caplog.at_level(logging.ERROR):
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    # a 의 dump 는 a 의 기록만 남기고 b 의 기록은 그대로
+    assert "'request': 'a'" in caplog.text
+    assert "'request': 'b'" not in caplog.text
+    assert rings["a"].snapshot() == []
+    assert [e[2] for e in rings["b"].snapshot()] == [{"target": "b"}, {"request": "b"}]
+    # 기본 Ring 에는 기록하지 않음
+    assert diagnostics.snapshot() == before
+
+
+def test_sampling_per_context():
+    diagnostics.configure(sample_rate=1.0)
+    try:
+        with diagnostics.scope():
+            assert diagnostics.begin_trace(target=0)
+            assert diagnostics.is_sampled()
+
+            seen = []
+            t = threading.Thread(target=lambda: seen.append(diagnostics.is_sampled()))
+            t.start()
+            t.join()
+            # 다른 thread (context) 에는 영향 없음
+            assert seen == [False]
+    finally:
+        diagnostics.configure()
+    assert not diagnostics.is_sampled()
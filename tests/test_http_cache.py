@@ -0,0 +1,120 @@
+"""
+이미지 route 의 ETag / 304 / Range 응답 테스트
+
+DB 는 조회 결과 한 행만 돌려주는 session 으로 대체하고, 파일은 tmp_path 의 PNG
+"""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+CREATED_AT = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+class RowSession:
+    """select 결과로 정해 둔 행을 반환"""
+
+    def __init__(self, row):
+        self.row = row
+
+    async def execute(self, query):
+        return self
+
+    def first(self):
+        return self.row
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql+asyncpg://u:p@localhost/db")
+    from app.api import get_image
+    from app.db.database import get_db
+
+    path = tmp_path / "target.png"
+    Image.new("RGB", (32, 32), (200, 10, 10)).save(path)
+    row = (str(path), "local", "image/png", "hash-" + tmp_path.name, CREATED_AT)
+
+    app = FastAPI()
+    app.include_router(get_image.router, prefix="/api/image")
+    app.dependency_overrides[get_db] = lambda: RowSession(row)
+    return TestClient(app)
+
+
+def test_not_found(client):
+    from app.db.database import get_db
+
+    client.app.dependency_overrides[get_db] = lambda: RowSession(None)
+    assert client.get("/api/image/target/none").status_code == 404
+
+
+@pytest.mark.parametrize("query", ["", "?format=png"])
+def test_conditional_get(client, query):
+    url = "/api/image/target/abc" + query
+    res = client.get(url)
+    assert res.status_code == 200
+    etag = res.headers["etag"]
+    assert res.headers["last-modified"] == "Tue, 02 Jan 2024 03:04:05 GMT"
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    # weak 비교
+    assert client.get(url, headers={"If-None-Match": f'"x", W/{etag}'}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+    res = client.get(url, headers={"If-Modified-Since": res.headers["last-modified"]})
+    assert res.status_code == 304 and res.headers["etag"] == etag
+
+    # 파생 파라미터가 다르면 다른 ETag
+    assert client.get(url + ("&" if query else "?") + "blur=2").headers["etag"] != etag
+
+
+def test_range(client):
+    url = "/api/image/target/abc?format=png"
+    full = client.get(url).content
+    total = len(full)
+
+    res = client.get(url, headers={"Range": "bytes=0-9"})
+    assert res.status_code == 206
+    assert res.headers["content-range"] == f"bytes 0-9/{total}"
+    assert res.content == full[:10]
+
+    # 끝이 전체 크기를 넘으면 마지막 byte 까지
+    res = client.get(url, headers={"Range": f"bytes=10-{total + 100}"})
+    assert res.status_code == 206 and res.content == full[10:]
+
+    # suffix range
+    res = client.get(url, headers={"Range": "bytes=-5"})
+    assert res.status_code == 206 and res.content == full[-5:]
+
+    res = client.get(url, headers={"Range": f"bytes={total}-"})
+    assert res.status_code == 416
+    assert res.headers["content-range"] == f"bytes */{total}"
+    assert client.get(url, headers={"Range": "bytes=-0"}).status_code == 416
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"Range": "bytes=5-3"},  # first > last
+        {"Range": "bytes=-"},
+        {"Range": "bytes=0-1,3-4"},  # multi range
+        {"Range": "items=0-1"},
+        {"Range": "bytes=0-9", "If-Range": '"stale"'},
+    ],
+)
+def test_range_ignored(client, headers):
+    url = "/api/image/target/abc?format=png"
+    full = client.get(url).content
+
+    res = client.get(url, headers=headers)
+    assert res.status_code == 200
+    assert res.content == full
+    assert "content-range" not in res.headers
+
+
+def test_if_range_matches(client):
+    url = "/api/image/target/abc?format=png"
+    etag = client.get(url).headers["etag"]
+
+    res = client.get(url, headers={"Range": "bytes=0-3", "If-Range": etag})
+    assert res.status_code == 206 and len(res.content) == 4
@@ -0,0 +1,51 @@
+"""
+profiling 테스트 - 한 번에 한 요청만 profiling
+"""
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.common import settings
+from app.common.depends.depends_profile import profile_depends
+from app.modules.ImageAutoEditor.common import profiling
+
+
+def test_reserve_is_exclusive():
+    with profiling.reserve():
+        with pytest.raises(profiling.ProfilerBusy):
+            with profiling.reserve():
+                pass
+    # 해제 후에는 다시 선점 가능
+    with profiling.reserve():
+        pass
+
+
+def test_capture_is_scoped_to_context():
+    # worker process 에서 profiling.run 으로 만든 기록
+    _, worker = profiling.run("cprofile", sorted, [3, 1, 2])
+
+    assert profiling.active_mode() is None
+    with profiling.reserve(), profiling.capture("cprofile") as prof:
+        assert profiling.active_mode() == "cprofile"
+        profiling.add_worker(worker)
+    assert profiling.active_mode() is None
+    assert prof.workers == [worker]
+    data, ext = prof.dump()
+    assert ext == "prof" and data
+
+
+def test_busy_request_gets_429(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    app = FastAPI()
+
+    @app.get("/")
+    def index(profile=Depends(profile_depends)):
+        return {"profile": profile}
+
+    client = TestClient(app)
+    assert client.get("/", headers={"X-Profile": "cprofile"}).json() == {"profile": "cprofile"}
+    with profiling.reserve():
+        res = client.get("/", headers={"X-Profile": "cprofile"})
+        assert res.status_code == 429
+        # profiling 하지 않는 요청은 영향 없음
+        assert client.get("/").status_code == 200
@@ -0,0 +1,156 @@
+"""
+RemoteImageFetcher 테스트 - 로컬 http server (stand-in) 사용
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import httpx
+import numpy as np
+import pytest
+
+from app.modules.ImageAutoEditor.common.remote import (
+    BlockedURL, RemoteImageFetcher, decode_img,
+)
+
+PNG = cv2.imencode(".png", np.full((8, 8, 3), 127, np.uint8))[1].tobytes()
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", headers: dict = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if body:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+
+        if self.path == "/img.png":
+            if self.headers.get("If-None-Match") == ETAG:
+                self._send(304, headers={"ETag": ETAG})
+            else:
+                self._send(200, PNG, {"ETag": ETAG, "Content-Type": "image/png"})
+        elif self.path == "/big":
+            self._send(200, b"x" * 2048)
+        elif self.path == "/big-stream":
+            # Content-Length 없이 연결 종료까지 전송
+            self.send_response(200)
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for _ in range(4):
+                self.wfile.write(b"x" * 1024)
+            self.close_connection = True
+        elif self.path == "/text":
+            self._send(200, b"not an image", {"Content-Type": "text/plain"})
+        elif self.path == "/redirect":
+            self._send(302, headers={"Location": "/img.png"})
+        elif self.path == "/redirect-metadata":
+            self._send(302, headers={"Location": "http://169.254.169.254/latest/"})
+        elif self.path == "/redirect-loopback":
+            port = self.server.server_address[1]
+            self._send(302, headers={"Location": f"http://127.0.0.2:{port}/img.png"})
+        else:
+            self._send(404)
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    Handler.hits.clear()
+    # stand-in server 주소만 예외로 허용
+    return RemoteImageFetcher(
+        tmp_path, max_bytes=1024, allowed_networks=["127.0.0.1/32"]
+    )
+
+
+def test_fetch_and_cache(server, fetcher):
+    data = fetcher.fetch_sync(f"{server}/img.png")
+    assert bytes(data) == PNG
+    assert decode_img(data).shape == (8, 8, 3)
+
+    # max_age 안에서는 요청하지 않음
+    assert bytes(fetcher.fetch_sync(f"{server}/img.png")) == PNG
+    assert Handler.hits["/img.png"] == 1
+    assert (fetcher.downloads, fetcher.hits) == (1, 1)
+
+
+def test_revalidate_304(server, fetcher):
+    fetcher.max_age = 0
+    fetcher.fetch_sync(f"{server}/img.png")
+
+    assert bytes(fetcher.fetch_sync(f"{server}/img.png")) == PNG
+    assert Handler.hits["/img.png"] == 2
+    assert (fetcher.downloads, fetcher.revalidated) == (1, 1)
+
+
+@pytest.mark.parametrize("path", ["/big", "/big-stream"])
+def test_size_limit(server, fetcher, path):
+    with pytest.raises(ValueError, match="too large"):
+        fetcher.fetch_sync(f"{server}{path}")
+    assert not list(fetcher.cache_dir.glob("*/*.bin"))
+
+
+def test_bad_content(server, fetcher):
+    data = fetcher.fetch_sync(f"{server}/text")
+    with pytest.raises(ValueError):
+        decode_img(data)
+
+
+def test_http_error(server, fetcher):
+    with pytest.raises(httpx.HTTPStatusError):
+        fetcher.fetch_sync(f"{server}/missing")
+
+
+def test_redirect(server, fetcher):
+    assert bytes(fetcher.fetch_sync(f"{server}/redirect")) == PNG
+
+
+@pytest.mark.parametrize("path", ["/redirect-metadata", "/redirect-loopback"])
+def test_redirect_to_internal_address(server, fetcher, path):
+    with pytest.raises(BlockedURL):
+        fetcher.fetch_sync(f"{server}{path}")
+    assert "/img.png" not in Handler.hits
+
+
+@pytest.mark.parametrize(
+    "url", ["file:///etc/passwd", "ftp://example.com/a.png", "http:///a.png"]
+)
+def test_scheme_not_allowed(fetcher, url):
+    with pytest.raises(BlockedURL):
+        fetcher.fetch_sync(url)
+
+
+def test_loopback_blocked_by_default(server, tmp_path):
+    fetcher = RemoteImageFetcher(tmp_path)
+    with pytest.raises(BlockedURL):
+        fetcher.fetch_sync(f"{server}/img.png")
+    assert not Handler.hits
+
+
+def test_cache_eviction(server, tmp_path):
+    fetcher = RemoteImageFetcher(
+        tmp_path, max_cache_bytes=len(PNG), allowed_networks=["127.0.0.1/32"]
+    )
+    fetcher.fetch_sync(f"{server}/img.png")
+    fetcher.fetch_sync(f"{server}/redirect")
+
+    assert sum(p.stat().st_size for p in tmp_path.glob("*/*.bin")) <= len(PNG)
+    assert len(list(tmp_path.glob("*/*.json"))) == len(list(tmp_path.glob("*/*.bin")))
@@ -0,0 +1,69 @@
+"""
+scheduler 테스트 - slot 할당, client 가 보낸 우선순위 / tenant 처리
+"""
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.common import settings
+from app.common.depends.depends_sched import SchedParams, sched_depends
+from app.common.scheduler import CpuScheduler
+
+
+def test_slots_per_job():
+    with pytest.raises(ValueError):
+        CpuScheduler(4, 4, slots_per_job=0)
+
+    async def run():
+        scheduler = CpuScheduler(4, 4, slots_per_job=2)
+        first = await scheduler.acquire()
+        second = await scheduler.acquire()
+        # 요청 하나가 전체 slot 을 차지하지 않음
+        assert (first.slots, second.slots) == (2, 2)
+
+    asyncio.run(run())
+
+
+def test_running_tenants_are_removed():
+    async def run():
+        scheduler = CpuScheduler(2, 4)
+        leases = [await scheduler.acquire(tenant=t) for t in ("a", "b")]
+        assert scheduler._running == {"a": 1, "b": 1}
+        for lease in leases:
+            lease.release()
+        # 실행 중인 작업이 없는 tenant 는 남지 않음
+        assert scheduler._running == {}
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "SCHED_TRUST_KEY", "secret")
+    monkeypatch.setattr(settings, "SCHED_DEFAULT_PRIORITY", "batch")
+    app = FastAPI()
+
+    @app.get("/")
+    def index(sched: SchedParams = Depends(sched_depends)):
+        return {"priority": sched.priority, "tenant": sched.tenant}
+
+    return TestClient(app)
+
+
+def test_untrusted_is_clamped(client):
+    res = client.get("/", headers={"X-Priority": "interactive", "X-Tenant-Id": "other"})
+    # 기본 우선순위보다 올릴 수 없고 tenant 는 client 주소
+    assert res.json() == {"priority": "batch", "tenant": "testclient"}
+
+    res = client.get("/", headers={"X-Priority": "nope"})
+    assert res.status_code == 400
+
+
+def test_trusted_keeps_headers(client):
+    headers = {"X-Priority": "interactive", "X-Tenant-Id": "shop", "X-Sched-Key": "secret"}
+    assert client.get("/", headers=headers).json() == {"priority": "interactive", "tenant": "shop"}
+
+    headers["X-Sched-Key"] = "wrong"
+    assert client.get("/", headers=headers).json() == {"priority": "batch", "tenant": "testclient"}
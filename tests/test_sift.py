@@ -0,0 +1,38 @@
+"""
+homography_match 테스트 - 같은 로고가 여러 번 있을 때 영역마다 similarity 가 같은지 확인
+"""
+import numpy as np
+import pytest
+
+from app.modules.ImageAutoEditor.matchers.sift import homography_match
+
+OFFSETS = [(0, 0), (200, 40), (60, 300)]
+
+
+def correspondences(n=30, seed=0):
+    """target 의 같은 점들이 원본의 OFFSETS 위치마다 대응 (로고 반복)"""
+    rng = np.random.default_rng(seed)
+    targ = rng.uniform(0, 50, size=(n, 2)).astype(np.float32)
+    src = np.concatenate([targ] * len(OFFSETS))
+    dst = np.concatenate([targ + np.float32(offset) for offset in OFFSETS])
+    return src.reshape(-1, 1, 2), dst.reshape(-1, 1, 2)
+
+
+def test_repeated_logos_share_similarity():
+    src, dst = correspondences()
+    results = homography_match(src, dst, (50, 50), max_instances=len(OFFSETS))
+
+    found = sorted((r.x, r.y) for r in results)
+    # 좌표는 int 로 자르므로 1px 까지 허용
+    assert np.abs(np.subtract(found, sorted(OFFSETS))).max() <= 1
+    # 앞에서 찾은 영역의 대응점이 빠져도 뒤의 영역 similarity 가 커지지 않음
+    for r in results:
+        assert r.similarity == pytest.approx(1 / len(OFFSETS), abs=0.02)
+
+
+def test_single_instance_uses_all_points():
+    src, dst = correspondences()
+    results = homography_match(src, dst, (50, 50))
+
+    assert len(results) == 1
+    assert results[0].similarity == pytest.approx(1 / len(OFFSETS), abs=0.02)
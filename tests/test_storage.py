@@ -0,0 +1,172 @@
+"""
+storage backend 테스트
+
+LocalStorage 와 object store stand-in (메모리 bucket) 에 같은 동작을 확인함
+"""
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import AsyncIterator, Dict
+
+import pytest
+
+from app.common.storage import (
+    BaseStorage, LocalStorage, StoredFile, get_storage, register_storage,
+)
+
+
+class StandInObjectStorage(BaseStorage):
+    """
+    object store stand-in - key 는 kind/hash.ext, 참조 수는 object metadata 처럼 따로 보관
+    local_path 는 다운로드 캐시 경로
+    """
+
+    file_type = "stand_in"
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.objects: Dict[str, bytes] = {}
+        self.refs: Dict[str, int] = {}
+
+    async def save_stream(
+        self, kind: str, chunks: AsyncIterator[bytes], ext: str
+    ) -> StoredFile:
+        data = b"".join([chunk async for chunk in chunks])
+        file_hash = hashlib.sha256(data).hexdigest()
+        key = f"{kind}/{file_hash}.{ext.lower()}"
+
+        deduped = key in self.objects
+        self.objects[key] = data
+        self.refs[key] = self.refs.get(key, 0) + 1
+        return StoredFile(key, self.file_type, len(data), file_hash, deduped)
+
+    def local_path(self, path: str) -> Path:
+        local = self.cache_dir / path
+        if not local.exists():
+            local.parent.mkdir(parents=True, exist_ok=True)
+            local.write_bytes(self.objects[path])
+        return local
+
+    async def exists(self, path: str) -> bool:
+        return path in self.objects
+
+    async def delete(self, path: str) -> None:
+        self.refs[path] = self.refs.get(path, 1) - 1
+        if self.refs[path] <= 0:
+            self.objects.pop(path, None)
+            self.refs.pop(path, None)
+
+
+@pytest.fixture(params=["local", "stand_in"])
+def storage(request, tmp_path, monkeypatch) -> BaseStorage:
+    if request.param == "local":
+        monkeypatch.setenv("SAVED_IMG_DIR", str(tmp_path / "saved"))
+        # 캐시된 instance 를 비우고 SAVED_IMG_DIR 로 다시 생성
+        register_storage("local", LocalStorage)
+    else:
+        class Backend(StandInObjectStorage):
+            def __init__(self):
+                super().__init__(tmp_path / "cache")
+
+        register_storage("stand_in", Backend)
+    return get_storage(request.param)
+
+
+def test_save_and_read(storage):
+    stored = asyncio.run(storage.save_bytes("oimg", b"image-a", "PNG"))
+
+    assert stored.file_type == storage.file_type
+    assert stored.file_size == 7
+    assert stored.file_hash == hashlib.sha256(b"image-a").hexdigest()
+    assert not stored.deduped
+    assert asyncio.run(storage.exists(stored.path))
+    assert storage.local_path(stored.path).read_bytes() == b"image-a"
+
+
+def test_dedupe_and_shared_delete(storage):
+    first = asyncio.run(storage.save_bytes("oimg", b"same", "jpg"))
+    second = asyncio.run(storage.save_bytes("oimg", b"same", "jpg"))
+
+    assert second.deduped
+    assert second.path == first.path
+
+    # 다른 row 가 아직 참조 중이면 지우지 않음
+    asyncio.run(storage.delete(first.path))
+    assert asyncio.run(storage.exists(second.path))
+    assert storage.local_path(second.path).read_bytes() == b"same"
+
+    asyncio.run(storage.delete(second.path))
+    assert not asyncio.run(storage.exists(second.path))
+
+
+def test_resave_after_delete(storage):
+    stored = asyncio.run(storage.save_bytes("eimg", b"again", "png"))
+    asyncio.run(storage.delete(stored.path))
+
+    stored = asyncio.run(storage.save_bytes("eimg", b"again", "png"))
+    assert not stored.deduped
+    assert asyncio.run(storage.exists(stored.path))
+
+
+class FailingSession:
+    """commit 이 실패하는 session (file_hash unique 위반 등)"""
+
+    def __init__(self):
+        self.rolled_back = False
+
+    def add_all(self, rows):
+        pass
+
+    async def commit(self):
+        raise RuntimeError("duplicate key value violates unique constraint")
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+def test_release_on_failed_commit(storage, monkeypatch):
+    """이미 있는 파일을 다시 올리고 DB 저장이 실패하면 올라간 참조 수를 되돌림"""
+    monkeypatch.setenv("DATABASE_URL", "postgresql+asyncpg://u:p@localhost/db")
+    monkeypatch.setenv("STORAGE_BACKEND", storage.file_type)
+    from app.api.proc_image import save_sources
+
+    first = asyncio.run(storage.save_bytes("oimg", b"existing", "png"))
+    again = asyncio.run(storage.save_bytes("oimg", b"existing", "png"))
+    assert again.deduped
+
+    db = FailingSession()
+    with pytest.raises(RuntimeError):
+        asyncio.run(save_sources(db, [], [again]))
+    assert db.rolled_back
+
+    # 기존 row 의 참조 하나만 남아서 한 번 지우면 파일도 지워짐
+    assert asyncio.run(storage.exists(first.path))
+    asyncio.run(storage.delete(first.path))
+    assert not asyncio.run(storage.exists(first.path))
+
+
+def test_local_sharded_layout(tmp_path):
+    storage = LocalStorage(tmp_path)
+    stored = asyncio.run(storage.save_bytes("oimg", b"shard", "png"))
+
+    h = stored.file_hash
+    assert Path(stored.path) == (tmp_path / "oimg" / h[:2] / h[2:4] / f"{h}.png").absolute()
+    assert not any((tmp_path / "oimg" / ".tmp").iterdir())
+
+
+def test_local_legacy_file_without_refs(tmp_path):
+    """참조 수 기록이 없는 기존 파일은 참조 1 로 봄"""
+    storage = LocalStorage(tmp_path)
+    stored = asyncio.run(storage.save_bytes("oimg", b"legacy", "png"))
+    storage.refs_path(Path(stored.path)).unlink()
+
+    assert asyncio.run(storage.save_bytes("oimg", b"legacy", "png")).deduped
+    asyncio.run(storage.delete(stored.path))
+    assert Path(stored.path).exists()
+    asyncio.run(storage.delete(stored.path))
+    assert not Path(stored.path).exists()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_storage("nope")
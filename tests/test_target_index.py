@@ -0,0 +1,90 @@
+"""
+TargetIndex 테스트 - 합성 상세페이지 (benchmarks.synthetic) 사용
+"""
+import cv2
+import pytest
+
+from benchmarks.synthetic import Scenario
+from app.modules.ImageAutoEditor.common.target_index import TargetIndex, load_cached
+
+
+@pytest.fixture(scope="module")
+def scenario(tmp_path_factory):
+    page, targets, truth = Scenario(1200, 6, 3, (1.0, 1.0), 1).build(
+        tmp_path_factory.mktemp("scenario")
+    )
+    org = cv2.imread(page)
+    kp, des = cv2.SIFT.create().detectAndCompute(
+        cv2.cvtColor(org, cv2.COLOR_BGR2GRAY), None
+    )
+    return targets, truth, kp, des
+
+
+def build(targets, extra=()):
+    index = TargetIndex()
+    index.sync([(str(i), "h", t) for i, t in enumerate(targets)] + list(extra))
+    return index
+
+
+def counts(index, scenario):
+    _, _, kp, des = scenario
+    return {k: len(v[0]) for k, v in index.vote(kp, des, 0.75).items()}
+
+
+def test_duplicate_targets_keep_votes(scenario):
+    targets, truth, _, _ = scenario
+    key = str(next(iter(truth)))
+
+    votes = counts(build(targets), scenario)
+    dup_votes = counts(build(targets, [("dup", "h", targets[int(key)])]), scenario)
+
+    # FLANN 은 근사 검색이므로 몇 개 차이는 허용
+    assert votes[key] >= 10
+    assert dup_votes[key] >= 0.8 * votes[key]
+    assert dup_votes["dup"] >= 0.8 * votes[key]
+
+
+def test_incremental_changes_keep_base(scenario):
+    targets, _, _, _ = scenario
+    index = build(targets)
+    counts(index, scenario)
+    base = index._base
+
+    index.add("new", cv2.imread(targets[0]))
+    index.remove("1")
+    votes = counts(index, scenario)
+
+    assert index._base is base
+    assert index._delta.keys == ["new"]
+    assert "1" not in votes
+    assert votes.get("new") == votes.get("0")
+
+    # delta 가 기준을 넘으면 base 를 다시 학습
+    index.DELTA_MIN = 0
+    index.add("new2", cv2.imread(targets[2]))
+    counts(index, scenario)
+    assert index._base is not base
+    assert index._delta is None and not index._dead
+
+
+def test_load_cached_merges_changes(scenario, tmp_path):
+    targets, _, _, _ = scenario
+    path = str(tmp_path / "index.npz")
+    index = build(targets)
+    index.save(path)
+
+    cached = load_cached(path)
+    counts(cached, scenario)
+    base = cached._base
+    generation = cached.generation
+    # 투표 cache 의 key - 다른 index 와 겹치지 않음
+    assert generation != index.generation
+
+    index.remove("2")
+    index.save(path)
+    reloaded = load_cached(path)
+    counts(reloaded, scenario)
+
+    assert reloaded is cached and reloaded._base is base
+    assert reloaded.generation > generation
+    assert "2" not in reloaded and "2" in reloaded._dead
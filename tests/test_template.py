@@ -0,0 +1,65 @@
+"""
+TemplateMatcher._top_k 테스트 - matchTemplate 결과 배열을 직접 만들어서 확인
+
+target 은 4x4, 결과 배열은 (y, x) 위치의 유사도
+"""
+import numpy as np
+import pytest
+
+from app.modules.ImageAutoEditor.matchers import TemplateMatcher
+
+TARG = (4, 4)
+
+
+def result_map(peaks, fill=0.0):
+    result = np.full((20, 20), fill, dtype=np.float32)
+    for (x, y), value in peaks.items():
+        result[y, x] = value
+    return result
+
+
+def found(matches):
+    return [(m.x, m.y, round(m.similarity, 3)) for m in matches]
+
+
+def test_suppression_window():
+    matcher = TemplateMatcher(0.5, "TM_CCOEFF_NORMED", max_instances=5)
+    result = result_map({
+        (10, 10): 1.0,
+        (13, 10): 0.9,  # 찾은 위치와 겹침 (x + 3)
+        (10, 13): 0.85,  # 찾은 위치와 겹침 (y + 3)
+        (14, 10): 0.8,  # 겹치지 않음 (x + 4)
+        (1, 1): 0.95,  # 가장자리 - 억제 범위가 0 에서 잘림
+    })
+
+    assert found(matcher._top_k(result, TARG)) == [
+        (10, 10, 1.0), (1, 1, 0.95), (14, 10, 0.8),
+    ]
+
+
+def test_max_instances():
+    matcher = TemplateMatcher(0.5, "TM_CCOEFF_NORMED", max_instances=1)
+    result = result_map({(10, 10): 1.0, (1, 1): 0.95})
+
+    assert found(matcher._top_k(result, TARG)) == [(10, 10, 1.0)]
+
+
+def test_sqdiff_is_inverted():
+    matcher = TemplateMatcher(0.8, "TM_SQDIFF_NORMED", max_instances=5)
+    # SQDIFF 는 작을수록 비슷함 - similarity 는 1 - 값
+    result = result_map({(4, 3): 0.05, (12, 12): 0.1, (2, 15): 0.3}, fill=1.0)
+
+    assert found(matcher._top_k(result, TARG)) == [(4, 3, 0.95), (12, 12, 0.9)]
+
+
+@pytest.mark.parametrize(
+    "method, peak, fill",
+    [("TM_CCOEFF_NORMED", 0.9, 0.0), ("TM_SQDIFF_NORMED", 0.1, 1.0)],
+)
+def test_nan_is_ignored(method, peak, fill):
+    matcher = TemplateMatcher(0.5, method, max_instances=3)
+    result = result_map({(15, 15): peak}, fill=fill)
+    # 단색 영역
+    result[0:8, 0:8] = np.nan
+
+    assert found(matcher._top_k(result, TARG)) == [(15, 15, 0.9)]
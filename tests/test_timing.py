@@ -0,0 +1,67 @@
+"""
+timing 테스트 - 동시에 처리 중인 요청의 기록이 섞이지 않는지 확인
+"""
+import threading
+
+import pytest
+
+from app.modules.ImageAutoEditor.common import timing
+
+
+@pytest.fixture(autouse=True)
+def enabled():
+    prev = timing.is_enabled()
+    timing.set_enabled(True)
+    # 다른 테스트가 기본 Collector 에 남긴 기록
+    timing.pop()
+    yield
+    timing.set_enabled(prev)
+    timing.pop()
+
+
+def test_collect_per_thread():
+    collectors = [timing.Collector() for _ in range(4)]
+    barrier = threading.Barrier(len(collectors))
+
+    def run(i):
+        with timing.collect(collectors[i]):
+            barrier.wait()
+            for _ in range(50):
+                timing.incr(f"req{i}")
+                timing.record("span", 0.001)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(collectors))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for i, collector in enumerate(collectors):
+        data = collector.pop()
+        assert data["counters"] == {f"req{i}": 50}
+        assert data["spans"]["span"][0] == 50
+    # 기본 Collector 에는 아무것도 남지 않음
+    assert timing.pop() == {"spans": {}, "counters": {}}
+
+
+def test_collecting_across_threads():
+    collector = timing.Collector()
+
+    def engine():
+        try:
+            for _ in range(3):
+                timing.incr("step")
+                yield
+        finally:
+            timing.incr("closed")
+
+    it = timing.collecting(collector, engine())
+    # iterate_in_threadpool 처럼 단계마다 다른 thread 에서 실행
+    for _ in range(2):
+        t = threading.Thread(target=next, args=(it,))
+        t.start()
+        t.join()
+    it.close()
+
+    assert collector.pop()["counters"] == {"step": 2, "closed": 1}
+    assert timing.pop()["counters"] == {}